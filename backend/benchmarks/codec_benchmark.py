@@ -0,0 +1,71 @@
+"""Compares the decode throughput of stored sampling results.
+
+A result is stored as the JSON object of a count histogram, e.g. {"00": 5020, "11": 4980}.
+This script decodes histograms of increasing size with `ast.literal_eval` (the
+previous decoder), the standard json module and orjson (if installed).
+
+Usage:
+    poetry run python benchmarks/codec_benchmark.py [--qubits 10 16 20] [--repeat 5]
+"""
+
+import argparse
+import json
+import random
+import timeit
+from ast import literal_eval
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+
+
+def make_histogram(n_qubits: int, n_shots: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    n_bitstrings = min(2**n_qubits, n_shots)
+    counts: dict[str, int] = {}
+    for bits in rng.sample(range(2**n_qubits), n_bitstrings):
+        counts[format(bits, f"0{n_qubits}b")] = rng.randint(1, 1000)
+    return json.dumps(counts)
+
+
+def decoders() -> dict[str, Callable[[str], Any]]:
+    result: dict[str, Callable[[str], Any]] = {
+        "literal_eval": literal_eval,
+        "json": json.loads,
+    }
+    if orjson is not None:
+        result["orjson"] = orjson.loads
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--qubits", type=int, nargs="+", default=[10, 16, 20])
+    parser.add_argument("--shots", type=int, default=2**20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{'qubits':>6} {'bitstrings':>10} {'size [MB]':>9} {'decoder':>12} {'time [ms]':>10} {'MB/s':>8}"
+    )
+    for n_qubits in args.qubits:
+        payload = make_histogram(n_qubits, args.shots)
+        n_bitstrings = len(json.loads(payload))
+        size = len(payload) / 1e6
+        for name, decode in decoders().items():
+            best = min(
+                timeit.repeat(
+                    lambda decode=decode, payload=payload: decode(payload),
+                    number=1,
+                    repeat=args.repeat,
+                )
+            )
+            print(
+                f"{n_qubits:>6} {n_bitstrings:>10} {size:>9.2f} {name:>12} {best * 1e3:>10.1f} {size / best:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
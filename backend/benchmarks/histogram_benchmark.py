@@ -0,0 +1,78 @@
+"""Compares the compact histogram format with JSON text for sampling results.
+
+For histograms of increasing size, this script reports the stored size, the encode
+time and the decode time of the JSON text previously stored in results.result and
+of the compact format stored in results.packed_result with each compression.
+
+Usage:
+    poetry run python benchmarks/histogram_benchmark.py [--qubits 10 20 30] [--repeat 3]
+"""
+
+import argparse
+import json
+import random
+import timeit
+from typing import Any, Callable
+
+from oqtopus_cloud.common.histogram import (
+    decode_histogram,
+    encode_histogram,
+    zstandard,
+)
+
+
+def make_counts(n_qubits: int, n_shots: int, seed: int = 0) -> dict[str, int]:
+    rng = random.Random(seed)
+    n_bitstrings = min(2**n_qubits, n_shots)
+    counts: dict[str, int] = {}
+    for bits in rng.sample(range(2**n_qubits), n_bitstrings):
+        counts[format(bits, f"0{n_qubits}b")] = rng.randint(1, 1000)
+    return counts
+
+
+def formats() -> dict[str, tuple[Callable[[Any], Any], Callable[[Any], Any]]]:
+    result: dict[str, tuple[Callable[[Any], Any], Callable[[Any], Any]]] = {
+        "json": (lambda counts: json.dumps(counts).encode(), json.loads),
+    }
+    compressions = ["none", "zlib"] if zstandard is None else ["none", "zlib", "zstd"]
+    for compression in compressions:
+        result[f"packed/{compression}"] = (
+            lambda counts, compression=compression: encode_histogram(
+                counts, compression=compression
+            ),
+            decode_histogram,
+        )
+    return result
+
+
+def best(func: Callable[[], Any], repeat: int) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--qubits", type=int, nargs="+", default=[10, 20, 30])
+    parser.add_argument("--shots", type=int, default=2**20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"{'qubits':>6} {'bitstrings':>10} {'format':>12} {'size [MB]':>9} {'encode [ms]':>11} {'decode [ms]':>11}"
+    )
+    for n_qubits in args.qubits:
+        counts = make_counts(n_qubits, args.shots)
+        for name, (encode, decode) in formats().items():
+            data = encode(counts)
+            encode_time = best(
+                lambda encode=encode, counts=counts: encode(counts), args.repeat
+            )
+            decode_time = best(
+                lambda decode=decode, data=data: decode(data), args.repeat
+            )
+            print(
+                f"{n_qubits:>6} {len(counts):>10} {name:>12} {len(data) / 1e6:>9.2f} {encode_time * 1e3:>11.1f} {decode_time * 1e3:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
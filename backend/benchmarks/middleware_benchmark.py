@@ -0,0 +1,134 @@
+"""Compares the per-request overhead of the user API middleware implementations.
+
+The same FastAPI application with a trivial route is called directly through ASGI,
+without a middleware, with the previous `BaseHTTPMiddleware` implementation of
+`CustomMiddleware` (copied below for reference), and with the current pure ASGI
+implementation. The requests look like requests from API Gateway, i.e. they have an
+`aws.event` with the authorizer claims.
+
+Usage:
+    poetry run python benchmarks/middleware_benchmark.py [--requests 20000] [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+from typing import Any
+
+from aws_lambda_powertools.utilities.data_classes import APIGatewayProxyEvent
+from fastapi import FastAPI, Request
+from fastapi.exceptions import HTTPException
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp
+
+from oqtopus_cloud.user.conf import logger
+from oqtopus_cloud.user.middleware import CustomMiddleware
+
+
+class BaseHTTPCustomMiddleware(BaseHTTPMiddleware):
+    # the previous implementation of CustomMiddleware
+    async def dispatch(self, request: Request, call_next):
+        corr_id = request.headers.get("x-correlation-id")
+        if os.getenv("ENV") == "local":
+            logger.info("Running in local environment")
+            corr_id = "local-correlation-id"
+        if not corr_id:
+            corr_id = request.scope["aws.context"].aws_request_id
+
+        logger.set_correlation_id(corr_id)
+
+        try:
+            if os.getenv("ENV") == "local":
+                request.state.owner = "admin"
+            else:
+                owner = APIGatewayProxyEvent(
+                    request.scope["aws.event"]
+                ).request_context.authorizer.claims["cognito:username"]
+                request.state.owner = owner
+        except KeyError:
+            logger.error("No AWS event found in request scope")
+            raise HTTPException(
+                status_code=500, detail="No AWS event found in request scope"
+            )
+
+        response = await call_next(request)
+        response.headers["X-Correlation-Id"] = corr_id
+        return response
+
+
+def make_app(middleware: Any) -> ASGIApp:
+    app = FastAPI()
+    if middleware is not None:
+        app.add_middleware(middleware)
+
+    @app.get("/status")
+    def get_status(request: Request) -> dict[str, str]:
+        return {"owner": getattr(request.state, "owner", "")}
+
+    return app
+
+
+def make_scope() -> dict[str, Any]:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "https",
+        "path": "/status",
+        "raw_path": b"/status",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("localhost", 443),
+        "aws.event": {
+            "requestContext": {"authorizer": {"claims": {"cognito:username": "admin"}}}
+        },
+        "aws.context": SimpleNamespace(aws_request_id="request-id"),
+    }
+
+
+async def run(app: ASGIApp, n_requests: int) -> float:
+    async def receive() -> dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict[str, Any]) -> None:
+        pass
+
+    start = time.perf_counter()
+    for _ in range(n_requests):
+        await app(make_scope(), receive, send)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if os.getenv("ENV") == "local":
+        raise SystemExit("unset ENV, the local mode logs every request")
+
+    variants = {
+        "none": None,
+        "BaseHTTPMiddleware": BaseHTTPCustomMiddleware,
+        "pure ASGI": CustomMiddleware,
+    }
+    results: dict[str, float] = {}
+    print(f"{'middleware':>18} {'per request [us]':>16} {'overhead [us]':>13}")
+    for name, middleware in variants.items():
+        app = make_app(middleware)
+        # warm up
+        asyncio.run(run(app, 100))
+        elapsed = min(asyncio.run(run(app, args.requests)) for _ in range(args.repeat))
+        results[name] = elapsed / args.requests * 1e6
+        overhead = results[name] - results["none"]
+        print(f"{name:>18} {results[name]:>16.1f} {overhead:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
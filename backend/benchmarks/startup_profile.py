@@ -0,0 +1,115 @@
+"""Records the import time breakdown of the Lambda entry points.
+
+Each entry point is imported in a fresh interpreter with `python -X importtime`, like
+a cold start of its Lambda container. The number of imported modules, the total
+import time and the modules taking the most time (including their own imports) are
+printed. With `--max-modules` or `--max-ms`, the script exits with an error when an
+entry point exceeds the budget.
+
+Usage:
+    poetry run python benchmarks/startup_profile.py [--entry-point user] [--top 20]
+        [--repeat 3] [--max-modules 800] [--max-ms 3000] [--env ENV=local]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import NamedTuple
+
+ENTRY_POINTS = {
+    "user": "oqtopus_cloud.user.lambda_function",
+    "provider": "oqtopus_cloud.provider.lambda_function",
+}
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    depth: int
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(stderr: str) -> list[ImportRecord]:
+    records = []
+    for line in stderr.splitlines():
+        # import time:       self [us] |  cumulative | imported package
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        records.append(
+            ImportRecord(
+                module=name.strip(),
+                depth=(len(name) - len(name.lstrip()) - 1) // 2,
+                self_us=int(self_us),
+                cumulative_us=int(cumulative_us),
+            )
+        )
+    return records
+
+
+def profile(module: str, env: dict[str, str]) -> list[ImportRecord]:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(completed.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--entry-point", choices=sorted(ENTRY_POINTS), action="append", default=None
+    )
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-modules", type=int, default=None)
+    parser.add_argument("--max-ms", type=float, default=None)
+    parser.add_argument(
+        "--env",
+        action="append",
+        default=["ENV=local"],
+        help="KEY=VALUE set in the environment of the entry point",
+    )
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    # outside of Lambda, as the local environment and the tests
+    env.pop("LAMBDA_TASK_ROOT", None)
+    env.update(item.split("=", 1) for item in args.env)
+
+    over_budget = []
+    for name in args.entry_point or sorted(ENTRY_POINTS):
+        module = ENTRY_POINTS[name]
+        # the fastest run, the others are slowed down by the page cache or the CPU
+        records = min(
+            (profile(module, env) for _ in range(args.repeat)),
+            key=lambda records: sum(record.self_us for record in records),
+        )
+        total_ms = sum(record.self_us for record in records) / 1e3
+        entry_ms = next(r.cumulative_us for r in records if r.module == module) / 1e3
+        print(f"{name} ({module})")
+        print(f"  modules: {len(records)}")
+        print(f"  total: {total_ms:.1f} ms (entry point: {entry_ms:.1f} ms)")
+        print(f"  {'self [ms]':>10} {'cumulative [ms]':>16}  module")
+        top = sorted(records, key=lambda record: -record.cumulative_us)
+        for record in top[: args.top]:
+            print(
+                f"  {record.self_us / 1e3:>10.1f} {record.cumulative_us / 1e3:>16.1f}"
+                f"  {'  ' * record.depth}{record.module}"
+            )
+        print()
+        if args.max_modules is not None and len(records) > args.max_modules:
+            over_budget.append(f"{name}: {len(records)} > {args.max_modules} modules")
+        if args.max_ms is not None and entry_ms > args.max_ms:
+            over_budget.append(f"{name}: {entry_ms:.1f} > {args.max_ms} ms")
+
+    if over_budget:
+        raise SystemExit("over the startup budget:\n" + "\n".join(over_budget))
+
+
+if __name__ == "__main__":
+    main()
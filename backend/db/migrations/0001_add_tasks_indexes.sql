@@ -0,0 +1,13 @@
+-- Adds composite indexes for the task query shapes of the user and provider APIs.
+--
+-- user API:     WHERE owner = ? AND action = ? [AND status = ?] ORDER BY created_at, id
+-- provider API: WHERE device = ? [AND status = ?] [AND created_at > ?]
+--
+-- idx_tasks_device_status_created_at also serves the foreign key on tasks.device.
+-- Databases created from db/init/01.schema.sql already have these indexes.
+
+ALTER TABLE main.tasks
+  ADD INDEX idx_tasks_owner_action_created_at (owner, action, created_at),
+  ADD INDEX idx_tasks_device_status_created_at (device, status, created_at),
+  ALGORITHM = INPLACE,
+  LOCK = NONE;
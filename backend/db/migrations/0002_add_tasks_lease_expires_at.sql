@@ -0,0 +1,12 @@
+-- Adds the lease expiry of tasks claimed through POST /tasks/claim of the provider API.
+--
+-- A claimed task is RUNNING until lease_expires_at, which its worker renews with
+-- PATCH /tasks/{taskId}. Tasks whose lease has expired are put back to QUEUED by
+-- the next claim for the same device, found with the index on lease_expires_at.
+-- Databases created from db/init/01.schema.sql already have this column.
+
+ALTER TABLE main.tasks
+  ADD COLUMN lease_expires_at TIMESTAMP NULL AFTER created_at,
+  ADD INDEX idx_tasks_device_status_lease_expires_at (device, status, lease_expires_at),
+  ALGORITHM = INPLACE,
+  LOCK = NONE;
@@ -0,0 +1,11 @@
+-- Adds the compact binary column for the count histograms of sampling results.
+--
+-- New sampling results with bitstring keys are stored in packed_result
+-- (see oqtopus_cloud/common/histogram.py) and leave result NULL. Existing rows
+-- keep their JSON text in result and are decoded as before.
+-- Databases created from db/init/01.schema.sql already have this column.
+
+ALTER TABLE main.results
+  ADD COLUMN packed_result LONGBLOB AFTER result,
+  ALGORITHM = INPLACE,
+  LOCK = NONE;
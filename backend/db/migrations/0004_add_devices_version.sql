@@ -0,0 +1,10 @@
+-- Adds the version of the device rows used by the device catalog cache.
+--
+-- The provider API increments the version on every update of a device, and the
+-- user API compares the versions with its cached devices to rebuild only the
+-- devices that have changed (see oqtopus_cloud/common/device_cache.py).
+-- Databases created from db/init/01.schema.sql already have this column.
+
+ALTER TABLE main.devices
+  ADD COLUMN version INT DEFAULT 0 NOT NULL AFTER description,
+  ALGORITHM = INSTANT;
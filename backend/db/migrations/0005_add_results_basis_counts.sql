@@ -0,0 +1,12 @@
+-- Adds the count histograms from which estimation results are estimated.
+--
+-- Providers may upload the histograms measured in the bases of an estimation
+-- task instead of its expectation value, which is then estimated by
+-- oqtopus_cloud/common/estimation.py. The histograms are kept so that the
+-- value can be estimated again without running the task again.
+-- Databases created from db/init/01.schema.sql already have this column.
+
+ALTER TABLE main.results
+  ADD COLUMN basis_counts LONGTEXT AFTER packed_result,
+  ALGORITHM = INPLACE,
+  LOCK = NONE;
@@ -0,0 +1,12 @@
+-- Adds the compact binary column for the operators of estimation tasks.
+--
+-- New estimation tasks store their operator in packed_operator (see
+-- oqtopus_cloud/common/pauli.py) and leave operator NULL, so operators are no
+-- longer limited to the 1024 characters of operator. Existing rows keep their
+-- JSON text in operator and are decoded as before.
+-- Databases created from db/init/01.schema.sql already have this column.
+
+ALTER TABLE main.tasks
+  ADD COLUMN packed_operator LONGBLOB AFTER operator,
+  ALGORITHM = INPLACE,
+  LOCK = NONE;
@@ -0,0 +1,67 @@
+-- Stores the code of tasks once per distinct code, in the task_codes table.
+--
+-- New tasks reference their code by its SHA-256 digest in code_hash (see
+-- oqtopus_cloud/common/code_store.py) and leave code NULL, so the circuits of
+-- parameter sweeps and repeated benchmarks are stored once. Tasks whose
+-- code_hash is NULL keep their code in code and are read as before.
+-- Databases created from db/init/01.schema.sql already have these changes.
+
+CREATE TABLE IF NOT EXISTS main.task_codes (
+  hash VARBINARY(32) PRIMARY KEY,
+  code TEXT NOT NULL
+);
+
+ALTER TABLE main.tasks
+  MODIFY COLUMN code TEXT,
+  ADD COLUMN code_hash VARBINARY(32) AFTER code,
+  ALGORITHM = INPLACE,
+  LOCK = NONE;
+
+-- code_hash is NULL in every row yet, so the foreign key is added in place
+SET foreign_key_checks = 0;
+ALTER TABLE main.tasks
+  ADD CONSTRAINT fk_tasks_code_hash FOREIGN KEY (code_hash) REFERENCES main.task_codes (hash),
+  ALGORITHM = INPLACE,
+  LOCK = NONE;
+SET foreign_key_checks = 1;
+
+-- Moves the code of existing tasks to task_codes. Run this after the API is
+-- deployed, so that no task is created with a NULL code_hash meanwhile; it can
+-- be run again. The tasks are processed in 256 batches by the first byte of
+-- their id, each batch in its own transactions: the codes are inserted first,
+-- so that every code_hash that is set references a row of task_codes.
+-- SHA2() hashes the utf8mb4 bytes of the code, as hash_code() does.
+
+delimiter $$
+
+CREATE PROCEDURE main.backfill_task_codes()
+BEGIN
+  DECLARE prefix INT DEFAULT 0;
+  DECLARE range_start, range_end VARBINARY(16);
+  WHILE prefix < 256 DO
+    SET range_start = UNHEX(LPAD(HEX(prefix), 2, '0'));
+    SET range_end = IF(prefix = 255, NULL, UNHEX(LPAD(HEX(prefix + 1), 2, '0')));
+
+    INSERT IGNORE INTO main.task_codes (hash, code)
+      SELECT UNHEX(SHA2(code, 256)), code FROM main.tasks
+      WHERE id >= range_start AND (range_end IS NULL OR id < range_end)
+        AND code_hash IS NULL AND code IS NOT NULL;
+
+    UPDATE main.tasks
+      SET code_hash = UNHEX(SHA2(code, 256))
+      WHERE id >= range_start AND (range_end IS NULL OR id < range_end)
+        AND code_hash IS NULL AND code IS NOT NULL;
+
+    UPDATE main.tasks
+      SET code = NULL
+      WHERE id >= range_start AND (range_end IS NULL OR id < range_end)
+        AND code_hash IS NOT NULL AND code IS NOT NULL;
+
+    SET prefix = prefix + 1;
+  END WHILE;
+END$$
+
+delimiter ;
+
+CALL main.backfill_task_codes();
+DROP PROCEDURE main.backfill_task_codes;
@@ -0,0 +1,18 @@
+-- Adds the append-only log of the tasks put in the queue of each device.
+--
+-- New and requeued tasks are appended with their transaction (see
+-- oqtopus_cloud/common/task_feed.py), and provider workers follow the log with
+-- GET /tasks/feed instead of polling GET /tasks. Tasks queued before this
+-- migration are not in the log and are still returned by POST /tasks/claim.
+-- The entries of a device are read after a cursor with
+-- idx_task_events_device_seq, and the entries older than a day are deleted
+-- from the head of the log by POST /tasks/claim.
+-- Databases created from db/init/01.schema.sql already have this table.
+
+CREATE TABLE IF NOT EXISTS main.task_events (
+  seq BIGINT AUTO_INCREMENT PRIMARY KEY,
+  task_id VARBINARY(16) NOT NULL,
+  device VARCHAR(64) NOT NULL,
+  created_at TIMESTAMP NOT NULL,
+  INDEX idx_task_events_device_seq (device, seq)
+);
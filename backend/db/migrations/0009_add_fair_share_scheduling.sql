@@ -0,0 +1,23 @@
+-- Adds the priority of tasks and the fair share of each device between owners.
+--
+-- POST /tasks/claim and GET /tasks?status=QUEUED take the queued tasks of a
+-- device by stride scheduling over their owners (see
+-- oqtopus_cloud/common/scheduler.py), with the weights and virtual times in
+-- fair_shares, and the tasks of an owner by descending priority, then by age.
+-- Owners without a row in fair_shares get a weight of 1; a row is added the
+-- first time one of their tasks is claimed. Set weight to 0 to suspend an owner.
+-- Databases created from db/init/01.schema.sql already have these changes.
+
+ALTER TABLE main.tasks
+  ADD COLUMN priority INT DEFAULT 0 NOT NULL AFTER note,
+  ADD INDEX idx_tasks_device_status_owner_priority (device, status, owner, priority DESC, created_at, id),
+  ALGORITHM = INPLACE,
+  LOCK = NONE;
+
+CREATE TABLE IF NOT EXISTS main.fair_shares (
+  device VARCHAR(64) NOT NULL,
+  owner VARCHAR(64) NOT NULL,
+  weight DOUBLE DEFAULT 1 NOT NULL,
+  virtual_time DOUBLE,
+  PRIMARY KEY (device, owner)
+);
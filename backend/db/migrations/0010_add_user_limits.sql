@@ -0,0 +1,44 @@
+-- Adds the limits on the task submissions of each owner, in the user_limits table.
+--
+-- POST /tasks/sampling and POST /tasks/estimation (and their batch versions)
+-- check the limits of the owner against the counters of its row (see
+-- oqtopus_cloud/common/quota.py), and return 429 with a Retry-After header when
+-- a limit is exceeded. The counters of QUEUED and RUNNING tasks are updated by
+-- the API at each change of status, so tasks updated directly in the database
+-- are not counted: run the UPDATE below again after such changes.
+-- A row is created at the first submission of an owner, with the defaults of
+-- the table, i.e. no limit. Set default limits with e.g.
+--   ALTER TABLE main.user_limits ALTER max_queued_tasks SET DEFAULT 10000;
+-- Submissions are rate limited if both rate (tasks per second) and burst are set.
+-- Databases created from db/init/01.schema.sql already have this table.
+
+CREATE TABLE IF NOT EXISTS main.user_limits (
+  owner VARCHAR(64) PRIMARY KEY,
+  max_queued_tasks INT,
+  max_active_tasks INT,
+  rate DOUBLE,
+  burst DOUBLE,
+  tokens DOUBLE,
+  refilled_at TIMESTAMP NULL,
+  queued_tasks INT DEFAULT 0 NOT NULL,
+  running_tasks INT DEFAULT 0 NOT NULL
+);
+
+-- Counts the tasks submitted before this migration. Run this after the API is
+-- deployed, while no task is submitted or claimed.
+
+INSERT INTO main.user_limits (owner)
+  SELECT DISTINCT owner FROM main.tasks
+  WHERE status IN ('QUEUED', 'RUNNING', 'CANCELLING')
+  ON DUPLICATE KEY UPDATE owner = owner;
+
+UPDATE main.user_limits AS l
+  SET
+    queued_tasks = (
+      SELECT COUNT(*) FROM main.tasks AS t
+      WHERE t.owner = l.owner AND t.status = 'QUEUED'
+    ),
+    running_tasks = (
+      SELECT COUNT(*) FROM main.tasks AS t
+      WHERE t.owner = l.owner AND t.status IN ('RUNNING', 'CANCELLING')
+    );
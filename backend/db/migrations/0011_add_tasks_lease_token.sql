@@ -0,0 +1,15 @@
+-- Adds the token of the lease of tasks claimed through POST /tasks/claim of the
+-- provider API.
+--
+-- POST /tasks/claim returns a new leaseToken with each claimed task, and
+-- PATCH /tasks/{taskId} renews the lease only with that token and before the
+-- lease expires, so a worker whose task was requeued and claimed by another
+-- worker cannot extend the lease of the other worker. Tasks claimed before this
+-- migration have no token: their lease is not renewed and they are requeued
+-- when it expires.
+-- Databases created from db/init/01.schema.sql already have this column.
+
+ALTER TABLE main.tasks
+  ADD COLUMN lease_token VARBINARY(16) NULL AFTER lease_expires_at,
+  ALGORITHM = INPLACE,
+  LOCK = NONE;
@@ -0,0 +1,86 @@
+import hashlib
+from typing import Iterable, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from oqtopus_cloud.common.models.task import Task
+from oqtopus_cloud.common.models.task_code import TaskCode
+
+
+def hash_code(code: str) -> bytes:
+    """Returns the key of a code in the task_codes table.
+
+    Args:
+        code (str): The code of a task.
+
+    Returns:
+        bytes: The SHA-256 digest of the code encoded in UTF-8, as UNHEX(SHA2(code, 256))
+            in MySQL.
+    """
+    return hashlib.sha256(code.encode()).digest()
+
+
+def store_task_codes(db: Session, tasks: Iterable[Task]) -> None:
+    """Moves the code of new tasks to the task_codes table.
+
+    The code of each task is replaced with its hash in code_hash. The codes already
+    stored are looked up first, so the repeated circuits of a parameter sweep are
+    neither sent to the database nor written again. The others are inserted with
+    INSERT IGNORE, as another request may store the same code concurrently. The rows
+    are written with the transaction of the session.
+
+    Args:
+        db (Session): The database session.
+        tasks (Iterable[Task]): The tasks, before they are added to the session.
+    """
+    new_codes = {}
+    for task in tasks:
+        if task.code is None:
+            continue
+        task.code_hash = hash_code(task.code)
+        new_codes[task.code_hash] = task.code
+        task.code = None  # type: ignore
+    if len(new_codes) == 0:
+        return
+    for stored in db.scalars(
+        select(TaskCode.hash).filter(TaskCode.hash.in_(new_codes))
+    ).all():
+        del new_codes[stored]
+    if len(new_codes) > 0:
+        db.execute(
+            insert(TaskCode)
+            .prefix_with("IGNORE", dialect="mysql")
+            .prefix_with("OR IGNORE", dialect="sqlite"),
+            [{"hash": hash, "code": code} for hash, code in new_codes.items()],
+        )
+
+
+def task_code_hash(task: Task) -> bytes:
+    """Returns the hash of the code of a task, including tasks submitted before code_hash.
+
+    Args:
+        task (Task): The task.
+
+    Returns:
+        bytes: The hash of the code.
+    """
+    return task.code_hash if task.code_hash is not None else hash_code(task.code)
+
+
+def task_code(task: Task) -> Optional[str]:
+    """Returns the code of a task.
+
+    The code of a task referencing the task_codes table is loaded with its first
+    access, unless the query loaded it with `selectinload(Task.task_code)`, which
+    fetches each distinct code of a list of tasks once.
+
+    Args:
+        task (Task): The task.
+
+    Returns:
+        Optional[str]: The code, or None if it is missing from the task_codes table.
+    """
+    if task.code is not None:
+        return task.code
+    return task.task_code.code if task.task_code is not None else None
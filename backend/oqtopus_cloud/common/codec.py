@@ -0,0 +1,108 @@
+import json
+import re
+from ast import literal_eval
+from typing import Any, Iterator, cast
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+BACKEND = "json" if orjson is None else "orjson"
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+
+def dumps(value: Any) -> str:
+    """Encodes a value stored in a JSON column (results, operators, qubit allocations, ...).
+
+    Uses orjson if it is installed, and the standard json module otherwise.
+
+    Args:
+        value (Any): The value to encode.
+
+    Returns:
+        str: The JSON string.
+    """
+    if orjson is not None:
+        return cast(str, orjson.dumps(value).decode())
+    return json.dumps(value, separators=(",", ":"))
+
+
+def loads(value: str | bytes) -> Any:
+    """Decodes a value stored in a JSON column.
+
+    Values written before the columns were stored as JSON may be Python literals
+    (e.g. operators stored as `str(list)`). They are decoded with `ast.literal_eval`
+    only if they are not valid JSON.
+
+    Args:
+        value (str | bytes): The stored value.
+
+    Raises:
+        ValueError: If the value is neither JSON nor a Python literal.
+
+    Returns:
+        Any: The decoded value.
+    """
+    try:
+        if orjson is not None:
+            return orjson.loads(value)
+        return json.loads(value)
+    except ValueError:
+        pass
+    try:
+        if isinstance(value, bytes):
+            value = value.decode()
+        return literal_eval(value)
+    except (SyntaxError, ValueError, UnicodeDecodeError):
+        raise ValueError(f"malformed value: {value[:100]!r}")
+
+
+def iter_items(value: str) -> Iterator[tuple[str, Any]]:
+    """Iterates over the members of an object stored in a JSON column.
+
+    The members are decoded one at a time, so only the stored text and the current
+    member are in memory, instead of the text and the whole decoded object. Values
+    that are not JSON objects are decoded at once with `loads`.
+
+    Args:
+        value (str): The stored value, a JSON object or null.
+
+    Raises:
+        ValueError: If the value is malformed.
+
+    Yields:
+        tuple[str, Any]: The keys and values of the members, in stored order.
+    """
+
+    def skip(index: int) -> int:
+        match = _WHITESPACE.match(value, index)
+        return index if match is None else match.end()
+
+    index = skip(0)
+    if not value.startswith("{", index):
+        yield from (loads(value) or {}).items()
+        return
+    index = skip(index + 1)
+    if value.startswith("}", index):
+        return
+    try:
+        key, index = _DECODER.raw_decode(value, index)
+    except ValueError:
+        # not JSON, e.g. a Python literal written before the column was JSON
+        yield from loads(value).items()
+        return
+    while True:
+        index = skip(index)
+        if not value.startswith(":", index):
+            raise ValueError(f"malformed value at {index}")
+        member, index = _DECODER.raw_decode(value, skip(index + 1))
+        yield key, member
+        index = skip(index)
+        if value.startswith("}", index):
+            return
+        if not value.startswith(",", index):
+            raise ValueError(f"malformed value at {index}")
+        key, index = _DECODER.raw_decode(value, skip(index + 1))
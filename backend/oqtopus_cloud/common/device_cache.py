@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Generic,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from oqtopus_cloud.common.models.device import Device
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+T = TypeVar("T")
+
+VERSIONS_QUERY = select(Device.id, Device.version).order_by(Device.id)
+
+
+class DeviceCatalogCache(Generic[T]):
+    """
+    Caches the devices built from the `devices` table (e.g. `DeviceInfo` schemas).
+
+    The cached devices are returned as they are for `ttl` seconds. After that, the
+    next read revalidates them by selecting only the ids and versions of the
+    devices, and rebuilds only the devices whose version has changed. The provider
+    API increments the version of a device on every update, and calls `invalidate`
+    so that the update is visible at once to the reads in the same process.
+
+    Args:
+        ttl (float): The number of seconds the devices are returned without revalidation.
+        clock (Callable[[], float]): The monotonic clock used to measure the TTL.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 5,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: dict[str, tuple[int, T]] = {}
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def list(self, db: Session, build: Callable[[Device], T]) -> list[T]:
+        """Returns all devices, in ascending order of their ids.
+
+        Args:
+            db (Session): The database session used for the revalidation.
+            build (Callable[[Device], T]): Builds the cached object from a device row.
+
+        Returns:
+            list[T]: The devices.
+        """
+        return [value for _, value in self.entries(db, build).values()]
+
+    def get(
+        self, db: Session, device_id: str, build: Callable[[Device], T]
+    ) -> Optional[T]:
+        """Returns a device.
+
+        Args:
+            db (Session): The database session used for the revalidation.
+            device_id (str): The id of the device.
+            build (Callable[[Device], T]): Builds the cached object from a device row.
+
+        Returns:
+            Optional[T]: The device, or None if it does not exist.
+        """
+        entry = self.entries(db, build).get(device_id)
+        return None if entry is None else entry[1]
+
+    def invalidate(self, device_id: Optional[str] = None) -> None:
+        """Discards a cached device, or all of them, and forces the next read to revalidate.
+
+        Args:
+            device_id (Optional[str]): The id of the updated device. Discards all devices if None.
+        """
+        with self._lock:
+            if device_id is None:
+                self._entries = {}
+            else:
+                self._entries = {
+                    id: entry for id, entry in self._entries.items() if id != device_id
+                }
+            self._expires_at = 0.0
+
+    def entries(
+        self, db: Session, build: Callable[[Device], T]
+    ) -> dict[str, tuple[int, T]]:
+        """Returns the versions and the devices, revalidating them if the TTL has passed.
+
+        Args:
+            db (Session): The database session used for the revalidation.
+            build (Callable[[Device], T]): Builds the cached object from a device row.
+
+        Returns:
+            dict[str, tuple[int, T]]: The versions and the devices by id, in ascending order of the ids.
+        """
+        entries = self._entries
+        if self.clock() < self._expires_at:
+            return entries
+        versions = {id: version for id, version in db.execute(VERSIONS_QUERY)}
+        changed = self._changed(entries, versions)
+        devices = (
+            db.scalars(select(Device).where(Device.id.in_(changed))).all()
+            if len(changed) > 0
+            else []
+        )
+        return self._revalidate(entries, versions, changed, devices, build)
+
+    async def async_entries(
+        self, db: "AsyncSession", build: Callable[[Device], T]
+    ) -> dict[str, tuple[int, T]]:
+        """Same as `entries`, with an async database session.
+
+        Args:
+            db (AsyncSession): The async database session used for the revalidation.
+            build (Callable[[Device], T]): Builds the cached object from a device row.
+
+        Returns:
+            dict[str, tuple[int, T]]: The versions and the devices by id, in ascending order of the ids.
+        """
+        entries = self._entries
+        if self.clock() < self._expires_at:
+            return entries
+        versions = {id: version for id, version in await db.execute(VERSIONS_QUERY)}
+        changed = self._changed(entries, versions)
+        devices = (
+            (await db.scalars(select(Device).where(Device.id.in_(changed)))).all()
+            if len(changed) > 0
+            else []
+        )
+        return self._revalidate(entries, versions, changed, devices, build)
+
+    @staticmethod
+    def _changed(
+        entries: dict[str, tuple[int, T]], versions: dict[str, int]
+    ) -> set[str]:
+        return {
+            id
+            for id, version in versions.items()
+            if id not in entries or entries[id][0] != version
+        }
+
+    def _revalidate(
+        self,
+        entries: dict[str, tuple[int, T]],
+        versions: dict[str, int],
+        changed: set[str],
+        devices: Sequence[Device],
+        build: Callable[[Device], T],
+    ) -> dict[str, tuple[int, T]]:
+        # the rows may have been updated after the versions were selected
+        rebuilt = {device.id: (device.version, build(device)) for device in devices}
+        revalidated = {
+            id: rebuilt[id] if id in rebuilt else entries[id]
+            for id in versions
+            if id in rebuilt or id not in changed
+        }
+        with self._lock:
+            # an invalidation during the revalidation wins, the next read revalidates
+            if self._entries is entries:
+                self._entries = revalidated
+                self._expires_at = self.clock() + self.ttl
+        return revalidated
+
+
+device_cache: DeviceCatalogCache = DeviceCatalogCache(
+    ttl=float(os.getenv("DEVICE_CACHE_TTL", "5"))
+)
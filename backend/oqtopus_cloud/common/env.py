@@ -0,0 +1,22 @@
+def strtobool(value: str) -> bool:
+    """Converts a string representation of truth to a bool.
+
+    Same as the `strtobool` of distutils, which is only available through
+    setuptools since Python 3.12 and takes a noticeable time to import.
+
+    Args:
+        value (str): y, yes, t, true, on and 1 are true, n, no, f, false, off and 0
+            are false (case-insensitive).
+
+    Raises:
+        ValueError: If the value is anything else.
+
+    Returns:
+        bool: The truth value.
+    """
+    lowered = value.lower()
+    if lowered in ("y", "yes", "t", "true", "on", "1"):
+        return True
+    if lowered in ("n", "no", "f", "false", "off", "0"):
+        return False
+    raise ValueError(f"invalid truth value {value!r}")
@@ -0,0 +1,163 @@
+from typing import TYPE_CHECKING, Mapping, NamedTuple, Sequence
+
+from oqtopus_cloud.common.histogram import HistogramFormatError, histogram_arrays
+from oqtopus_cloud.common.pauli import (
+    OperatorFormatError,
+    PauliTerm,
+    format_pauli_string,
+    parse_pauli_string,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+    from numpy.typing import NDArray
+
+_MAX_BITS = 64
+
+
+class EstimationError(ValueError):
+    """Exception raised when an expectation value cannot be estimated."""
+
+
+class MeasurementBasis(NamedTuple):
+    """A measurement basis shared by qubit-wise commuting terms.
+
+    `x` and `z` are the Pauli measured on each qubit (as in `PauliTerm`), and `terms`
+    the indices of the terms measured in this basis.
+    """
+
+    x: int
+    z: int
+    terms: list[int]
+
+
+def _compatible(x: int, z: int, basis_x: int, basis_z: int) -> bool:
+    # qubit-wise commuting: the Paulis are equal on the qubits both act on
+    common = (x | z) & (basis_x | basis_z)
+    return ((x ^ basis_x) | (z ^ basis_z)) & common == 0
+
+
+def group_commuting_terms(terms: Sequence[PauliTerm]) -> list[MeasurementBasis]:
+    """Groups qubit-wise commuting terms, so that each group is measured with one circuit.
+
+    The terms are assigned greedily, in descending order of their weight, to the
+    first group they commute qubit-wise with. The identity needs no measurement and
+    is not assigned to a group.
+
+    Args:
+        terms (Sequence[PauliTerm]): The terms of the operator.
+
+    Returns:
+        list[MeasurementBasis]: The bases, each with the indices of its terms.
+    """
+    order = sorted(
+        (index for index, term in enumerate(terms) if term.x | term.z),
+        key=lambda index: -(terms[index].x | terms[index].z).bit_count(),
+    )
+    bases: list[MeasurementBasis] = []
+    for index in order:
+        x, z, _ = terms[index]
+        for position, basis in enumerate(bases):
+            if _compatible(x, z, basis.x, basis.z):
+                basis.terms.append(index)
+                bases[position] = MeasurementBasis(
+                    basis.x | x, basis.z | z, basis.terms
+                )
+                break
+        else:
+            bases.append(MeasurementBasis(x, z, [index]))
+    return bases
+
+
+def measurement_bases(terms: Sequence[PauliTerm]) -> list[str]:
+    """Returns the bases to measure to estimate an operator with the sampling method.
+
+    Args:
+        terms (Sequence[PauliTerm]): The terms of the operator.
+
+    Returns:
+        list[str]: The bases, as Pauli strings of the qubit-wise commuting groups.
+    """
+    return [
+        format_pauli_string(basis.x, basis.z) for basis in group_commuting_terms(terms)
+    ]
+
+
+def _parity(values: "NDArray[np.uint64]") -> "NDArray[np.uint64]":
+    # the parity of the popcount of each uint64, by folding the halves with XOR
+    for shift in (32, 16, 8, 4, 2, 1):
+        values = values ^ (values >> values.dtype.type(shift))
+    return values & values.dtype.type(1)
+
+
+def _to_arrays(
+    counts: Mapping[str, int],
+) -> tuple["NDArray[np.uint64]", "NDArray[np.float64]"]:
+    try:
+        keys, values = histogram_arrays(counts)
+    except HistogramFormatError as e:
+        raise EstimationError(str(e)) from e
+    if len(values) == 0 or values.sum() <= 0:
+        raise EstimationError("a histogram has no shots")
+    return keys, values
+
+
+def estimate_expectation(
+    terms: Sequence[PauliTerm], basis_counts: Mapping[str, Mapping[str, int]]
+) -> complex:
+    """Estimates the expectation value of an operator from measured count histograms.
+
+    The keys of `basis_counts` are the measured bases as Pauli strings (e.g. those
+    returned by `measurement_bases`), and the values the histograms measured in them,
+    the rightmost bit of a bitstring being qubit 0. Each term is estimated from a
+    basis that measures all of its qubits in its Pauli: the parity of the bits of
+    its support gives its eigenvalue for each bitstring, for all bitstrings at once.
+
+    Args:
+        terms (Sequence[PauliTerm]): The terms of the operator.
+        basis_counts (Mapping[str, Mapping[str, int]]): The histograms by basis.
+
+    Raises:
+        EstimationError: If a term is not measured in any of the bases, acts on more
+            than 64 qubits, or a basis or a histogram is malformed.
+
+    Returns:
+        complex: The expectation value.
+    """
+    import numpy as np
+
+    try:
+        bases = [
+            (*parse_pauli_string(basis), counts)
+            for basis, counts in basis_counts.items()
+        ]
+    except OperatorFormatError as e:
+        raise EstimationError(f"malformed basis: {str(e)}")
+    arrays: dict[int, tuple[NDArray[np.uint64], NDArray[np.float64]]] = {}
+    expectation = 0j
+    for x, z, coef in terms:
+        support = x | z
+        if support == 0:
+            expectation += coef
+            continue
+        if support.bit_length() > _MAX_BITS:
+            raise EstimationError(f"at most {_MAX_BITS} qubits are supported")
+        position = next(
+            (
+                position
+                for position, (basis_x, basis_z, _) in enumerate(bases)
+                if (support & ~(basis_x | basis_z)) == 0
+                and _compatible(x, z, basis_x, basis_z)
+            ),
+            None,
+        )
+        if position is None:
+            raise EstimationError(
+                f"no histogram measured in a basis of: {format_pauli_string(x, z)}"
+            )
+        if position not in arrays:
+            arrays[position] = _to_arrays(bases[position][2])
+        keys, values = arrays[position]
+        signs = 1.0 - 2.0 * _parity(keys & np.uint64(support))
+        expectation += coef * float(signs @ values / values.sum())
+    return expectation
@@ -0,0 +1,68 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Response
+
+
+def make_etag(*parts: str | bytes | int | None) -> str:
+    """Builds a strong ETag from the parts identifying a version of a resource.
+
+    The parts are e.g. a row version or the stored content of a row. They are
+    hashed, so the ETag does not depend on how the response is serialized.
+
+    Args:
+        *parts (str | bytes | int | None): The parts of the version.
+
+    Returns:
+        str: The quoted ETag.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if part is None:
+            digest.update(b"\x00")
+            continue
+        data = part if isinstance(part, bytes) else str(part).encode()
+        digest.update(b"\x01" + len(data).to_bytes(8, "little") + data)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Checks whether an If-None-Match header matches the current ETag.
+
+    As required for If-None-Match, the comparison is weak, i.e. a `W/` prefix of
+    the ETags sent by the client is ignored.
+
+    Args:
+        if_none_match (Optional[str]): The If-None-Match header, if any.
+        etag (str): The current ETag built by `make_etag`.
+
+    Returns:
+        bool: True if the client already has the current version.
+    """
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
+def check_not_modified(
+    response: Response, if_none_match: Optional[str], etag: str
+) -> Optional[Response]:
+    """Sets the ETag of a response, and checks whether the client already has it.
+
+    Args:
+        response (Response): The response of the route, whose headers are set.
+        if_none_match (Optional[str]): The If-None-Match header, if any.
+        etag (str): The current ETag built by `make_etag`.
+
+    Returns:
+        Optional[Response]: A 304 Not Modified response to return instead of the
+            resource, or None if the resource has to be returned.
+    """
+    response.headers["ETag"] = etag
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
@@ -0,0 +1,245 @@
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate, repeat
+from operator import gt, sub
+from typing import TYPE_CHECKING, Iterator, Literal, Mapping, Optional
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore
+
+if TYPE_CHECKING:
+    import numpy as np
+    from numpy.typing import NDArray
+
+Compression = Literal["none", "zlib", "zstd"]
+
+MAGIC = b"OQH"
+VERSION = 1
+DEFAULT_COMPRESSION: Compression = "zlib" if zstandard is None else "zstd"
+
+# header: magic, version, compression
+_HEADER = struct.Struct("<3sBB")
+# body header: number of bits of a key, number of entries, key width, count width
+_BODY_HEADER = struct.Struct("<HIBB")
+_COMPRESSION_IDS: dict[str, int] = {"none": 0, "zlib": 1, "zstd": 2}
+_TYPECODES = {
+    array(typecode).itemsize: typecode for typecode in ("Q", "L", "I", "H", "B")
+}
+_MAX_BITS = 64
+_DECODE_ERRORS: tuple[type[Exception], ...] = (struct.error, zlib.error, KeyError)
+if zstandard is not None:
+    _DECODE_ERRORS += (zstandard.ZstdError,)
+
+
+class HistogramFormatError(ValueError):
+    """Exception raised when a histogram cannot be encoded or decoded."""
+
+
+def _width(value: int) -> int:
+    for width in (1, 2, 4, 8):
+        if value < 1 << (8 * width):
+            return width
+    raise HistogramFormatError(f"value out of range: {value}")
+
+
+def _pack(values: list[int], width: int) -> bytes:
+    packed = array(_TYPECODES[width], values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpack(data: bytes | memoryview, width: int) -> array:
+    unpacked = array(_TYPECODES[width])
+    unpacked.frombytes(data)
+    if sys.byteorder == "big":
+        unpacked.byteswap()
+    return unpacked
+
+
+def encode_histogram(
+    counts: dict[str, int], compression: Optional[Compression] = None
+) -> bytes:
+    """Encodes a count histogram with bitstring keys into the compact binary format.
+
+    The keys are sorted and stored as the differences of their integer values, and the
+    counts are stored in the same order. Each of the two columns uses the narrowest
+    integer width (1, 2, 4 or 8 bytes) that fits its largest value, so both decode
+    with `array` instead of a Python loop. The body is then optionally compressed.
+
+    Args:
+        counts (dict[str, int]): The histogram, e.g. {"00": 5020, "11": 4980}.
+        compression (Optional[Compression]): The compression of the body. Defaults to zstd if
+            zstandard is installed, and zlib otherwise.
+
+    Raises:
+        HistogramFormatError: If the keys are not bitstrings of the same length (at most 64 bits)
+            or a count is negative. Such histograms should be stored as JSON instead.
+
+    Returns:
+        bytes: The encoded histogram.
+    """
+    if compression is None:
+        compression = DEFAULT_COMPRESSION
+    n_bits = len(next(iter(counts))) if len(counts) > 0 else 0
+    if n_bits > _MAX_BITS or (n_bits == 0 and len(counts) > 0):
+        raise HistogramFormatError(f"unsupported key length: {n_bits}")
+    if set(map(len, counts)) - {n_bits}:
+        raise HistogramFormatError(f"keys are not {n_bits}-bit bitstrings")
+    # int(key, 2) also accepts signs, underscores and whitespace
+    if "".join(counts).encode().translate(None, b"01"):
+        raise HistogramFormatError("keys are not bitstrings")
+    keys = list(map(int, counts, repeat(2)))
+    values = list(counts.values())
+    if any(map(gt, keys, keys[1:])):
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        keys = list(map(keys.__getitem__, order))
+        values = list(map(values.__getitem__, order))
+    if min(values, default=0) < 0:
+        raise HistogramFormatError("negative count")
+    deltas = list(map(sub, keys, [0] + keys[:-1]))
+    key_width = _width(max(deltas, default=0))
+    count_width = _width(max(values, default=0))
+    body = b"".join(
+        [
+            _BODY_HEADER.pack(n_bits, len(keys), key_width, count_width),
+            _pack(deltas, key_width),
+            _pack(values, count_width),
+        ]
+    )
+    if compression == "zlib":
+        body = zlib.compress(body)
+    elif compression == "zstd":
+        if zstandard is None:
+            raise HistogramFormatError("zstd compression requires zstandard")
+        body = zstandard.ZstdCompressor().compress(body)
+    elif compression != "none":
+        raise HistogramFormatError(f"unknown compression: {compression}")
+    return _HEADER.pack(MAGIC, VERSION, _COMPRESSION_IDS[compression]) + body
+
+
+def _read_body(data: bytes, size: Optional[int] = None) -> bytes | memoryview:
+    # checks the header and decompresses the body, or only its first `size` bytes
+    magic, version, compression = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise HistogramFormatError(f"unsupported histogram: {magic!r} v{version}")
+    body: bytes | memoryview = memoryview(data)[_HEADER.size :]
+    if compression == _COMPRESSION_IDS["zlib"]:
+        if size is None:
+            return zlib.decompress(body)
+        return zlib.decompressobj().decompress(body, size)
+    elif compression == _COMPRESSION_IDS["zstd"]:
+        if zstandard is None:
+            raise HistogramFormatError("zstd compression requires zstandard")
+        if size is None:
+            return zstandard.ZstdDecompressor().decompress(body)
+        with zstandard.ZstdDecompressor().stream_reader(body) as reader:
+            return reader.read(size)
+    elif compression != _COMPRESSION_IDS["none"]:
+        raise HistogramFormatError(f"unknown compression: {compression}")
+    return body
+
+
+def iter_histogram(data: bytes) -> Iterator[tuple[str, int]]:
+    """Iterates over the entries of a histogram encoded by `encode_histogram`.
+
+    Only the decompressed body is kept in memory, the bitstring keys are created
+    one at a time. Use this instead of `decode_histogram` for large histograms.
+
+    Args:
+        data (bytes): The encoded histogram.
+
+    Raises:
+        HistogramFormatError: If the data is not a histogram of a supported version.
+
+    Returns:
+        Iterator[tuple[str, int]]: The bitstrings and counts, in ascending key order.
+    """
+    try:
+        body = _read_body(data)
+        n_bits, n_entries, key_width, count_width = _BODY_HEADER.unpack_from(body)
+        offset = _BODY_HEADER.size
+        counts_offset = offset + n_entries * key_width
+        end = counts_offset + n_entries * count_width
+        if len(body) != end:
+            raise HistogramFormatError("truncated histogram")
+        deltas = _unpack(body[offset:counts_offset], key_width)
+        values = _unpack(body[counts_offset:end], count_width)
+    except _DECODE_ERRORS as e:
+        raise HistogramFormatError(f"malformed histogram: {str(e)}")
+    keys = map(format, accumulate(deltas), repeat(f"0{n_bits}b"))
+    return zip(keys, values)
+
+
+def histogram_length(data: bytes) -> int:
+    """Returns the number of entries of a histogram encoded by `encode_histogram`.
+
+    Only the body header is decompressed, so this is cheap even for large histograms.
+
+    Args:
+        data (bytes): The encoded histogram.
+
+    Raises:
+        HistogramFormatError: If the data is not a histogram of a supported version.
+
+    Returns:
+        int: The number of entries.
+    """
+    try:
+        _, n_entries, _, _ = _BODY_HEADER.unpack_from(
+            _read_body(data, _BODY_HEADER.size)
+        )
+    except _DECODE_ERRORS as e:
+        raise HistogramFormatError(f"malformed histogram: {str(e)}")
+    return int(n_entries)
+
+
+def decode_histogram(data: bytes) -> dict[str, int]:
+    """Decodes a histogram encoded by `encode_histogram`.
+
+    Args:
+        data (bytes): The encoded histogram.
+
+    Raises:
+        HistogramFormatError: If the data is not a histogram of a supported version.
+
+    Returns:
+        dict[str, int]: The histogram with bitstring keys, in ascending key order.
+    """
+    return dict(iter_histogram(data))
+
+
+def histogram_arrays(
+    counts: Mapping[str, int],
+) -> tuple["NDArray[np.uint64]", "NDArray[np.float64]"]:
+    """Converts a count histogram to arrays of its keys and its counts.
+
+    The keys are converted to the integer values of the bitstrings, the rightmost bit
+    being bit 0, and the counts to floats, in the order of the histogram.
+
+    Args:
+        counts (Mapping[str, int]): The histogram, e.g. {"00": 5020, "11": 4980}.
+
+    Raises:
+        HistogramFormatError: If a key is not a bitstring of at most 64 bits.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The uint64 keys and the float64 counts.
+    """
+    # imported on first use, numpy takes a noticeable part of the cold start
+    import numpy as np
+
+    if any(len(key) > _MAX_BITS for key in counts):
+        raise HistogramFormatError(f"at most {_MAX_BITS} bits are supported")
+    try:
+        keys = np.fromiter(
+            (int(key, 2) for key in counts), dtype=np.uint64, count=len(counts)
+        )
+    except ValueError as e:
+        raise HistogramFormatError("the keys must be bitstrings") from e
+    values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+    return keys, values
@@ -0,0 +1,36 @@
+import time
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_TIMEOUT = 20.0
+# API Gateway closes the connection after 29 seconds
+MAX_TIMEOUT = 25.0
+INITIAL_INTERVAL = 0.25
+MAX_INTERVAL = 2.0
+
+
+def poll(check: Callable[[], T], done: Callable[[T], bool], timeout: float) -> T:
+    """Repeats a check until its value is done or the timeout passes.
+
+    The check is repeated with an exponential backoff from INITIAL_INTERVAL to
+    MAX_INTERVAL seconds. A check reading the database has to end its transaction,
+    otherwise MySQL (REPEATABLE READ) would keep reading the first snapshot.
+
+    Args:
+        check (Callable[[], T]): The check, called at least once.
+        done (Callable[[T], bool]): Whether a value of the check ends the wait.
+        timeout (float): The maximum number of seconds to wait.
+
+    Returns:
+        T: The last value of the check.
+    """
+    deadline = time.monotonic() + timeout
+    interval = INITIAL_INTERVAL
+    while True:
+        value = check()
+        remaining = deadline - time.monotonic()
+        if done(value) or remaining <= 0:
+            return value
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, MAX_INTERVAL)
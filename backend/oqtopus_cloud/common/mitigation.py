@@ -0,0 +1,208 @@
+from typing import Literal, Mapping, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+from oqtopus_cloud.common.histogram import HistogramFormatError, histogram_arrays
+
+Method = Literal["pseudo_inverse", "least_square"]
+
+# the number of entries kept while the inverse is applied, which bounds the memory
+# used for results with many qubits (about 200 MB including the temporary arrays)
+DEFAULT_MAX_ENTRIES = 1 << 21
+# entries whose absolute mitigated count is at most this fraction of the shots are
+# dropped while the inverse is applied
+DEFAULT_CUTOFF = 1e-7
+
+
+class MitigationError(ValueError):
+    """Exception raised when readout errors cannot be mitigated."""
+
+
+def readout_matrices(
+    calibration_data: Mapping[str, Optional[Mapping[str, float]]],
+    physical_qubits: list[int],
+) -> NDArray[np.float64]:
+    """Builds the readout assignment matrix of each measured qubit.
+
+    The matrix of a qubit is [[1 - p01, p10], [p01, 1 - p10]], where p01 (measProb0As1)
+    is the probability of measuring 1 when the qubit is prepared in 0 and p10
+    (measProb1As0) the probability of measuring 0 when it is prepared in 1. The
+    columns are the prepared states and the rows the measured states.
+
+    Args:
+        calibration_data (Mapping[str, Optional[Mapping[str, float]]]): The calibration
+            data of the device, with measProb0As1 and measProb1As0 by physical qubit.
+        physical_qubits (list[int]): The physical qubit measured into each classical
+            bit, the first one for the rightmost bit of the bitstrings.
+
+    Raises:
+        MitigationError: If the probabilities of a measured qubit are missing or make
+            its matrix singular.
+
+    Returns:
+        np.ndarray: The matrices, with shape (number of bits, 2, 2).
+    """
+    prob_0_as_1 = calibration_data.get("measProb0As1") or {}
+    prob_1_as_0 = calibration_data.get("measProb1As0") or {}
+    matrices = np.empty((len(physical_qubits), 2, 2))
+    for bit, qubit in enumerate(physical_qubits):
+        p01 = prob_0_as_1.get(str(qubit))
+        p10 = prob_1_as_0.get(str(qubit))
+        if p01 is None or p10 is None:
+            raise MitigationError(f"no readout calibration for qubit {qubit}")
+        if p01 + p10 >= 1:
+            raise MitigationError(f"readout matrix of qubit {qubit} is not invertible")
+        matrices[bit] = [[1 - p01, p10], [p01, 1 - p10]]
+    return matrices
+
+
+def _to_arrays(
+    counts: Mapping[str, int],
+) -> tuple[int, NDArray[np.uint64], NDArray[np.float64]]:
+    n_bits = len(next(iter(counts), ""))
+    if any(len(key) != n_bits for key in counts):
+        raise MitigationError("the keys must be bitstrings of the same length")
+    try:
+        keys, values = histogram_arrays(counts)
+    except HistogramFormatError as e:
+        raise MitigationError(str(e)) from e
+    return n_bits, keys, values
+
+
+def _to_counts(
+    n_bits: int, keys: NDArray[np.uint64], values: NDArray[np.float64]
+) -> dict[str, float]:
+    order = np.argsort(keys)
+    return {
+        format(key, f"0{n_bits}b"): value
+        for key, value in zip(keys[order].tolist(), values[order].tolist())
+    }
+
+
+def _sum_duplicates(
+    keys: NDArray[np.uint64], values: NDArray[np.float64]
+) -> tuple[NDArray[np.uint64], NDArray[np.float64]]:
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return keys[starts], np.add.reduceat(values[order], starts)
+
+
+def apply_inverse(
+    keys: NDArray[np.uint64],
+    values: NDArray[np.float64],
+    matrices: NDArray[np.float64],
+    cutoff: float = 0.0,
+    max_entries: int = DEFAULT_MAX_ENTRIES,
+) -> tuple[NDArray[np.uint64], NDArray[np.float64]]:
+    """Applies the inverse of the tensor product of the readout matrices to a histogram.
+
+    The inverse of each 2x2 matrix is applied to its bit in turn, so neither the
+    2^n x 2^n matrix nor a dense vector of 2^n entries is built: each step at most
+    doubles the number of entries, and the entries whose absolute value is at most
+    `cutoff` are dropped after each step. If more than `max_entries` entries remain,
+    only the largest ones are kept.
+
+    Args:
+        keys (np.ndarray): The bitstrings as unsigned integers (uint64), without duplicates.
+        values (np.ndarray): The counts of the bitstrings (float64).
+        matrices (np.ndarray): The readout matrices built by `readout_matrices`.
+        cutoff (float): The absolute value below which entries are dropped.
+        max_entries (int): The maximum number of entries kept after each step.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The bitstrings and their mitigated (quasi) counts.
+    """
+    inverses = np.linalg.inv(matrices)
+    one = np.uint64(1)
+    for bit, inverse in enumerate(inverses):
+        if np.array_equal(inverse, np.eye(2)):
+            continue
+        mask = one << np.uint64(bit)
+        measured = ((keys & mask) != 0).astype(np.intp)
+        cleared = keys & ~mask
+        keys, values = _sum_duplicates(
+            np.concatenate([cleared, cleared | mask]),
+            np.concatenate(
+                [inverse[0, measured] * values, inverse[1, measured] * values]
+            ),
+        )
+        kept = np.abs(values) > cutoff
+        keys, values = keys[kept], values[kept]
+        if len(keys) > max_entries:
+            largest = np.argpartition(np.abs(values), -max_entries)[-max_entries:]
+            keys, values = keys[largest], values[largest]
+    return keys, values
+
+
+def nearest_probabilities(
+    quasi_probabilities: NDArray[np.float64],
+) -> NDArray[np.float64]:
+    """Finds the probability distribution nearest to a quasi-probability distribution.
+
+    This is the Euclidean projection onto the probability simplex, which is the
+    maximum likelihood estimate of Smolin, Gambetta and Smith (PRL 108, 070502) for
+    quasi-probabilities summing to 1. It takes O(k log k) for k entries.
+
+    Args:
+        quasi_probabilities (np.ndarray): The quasi-probabilities, which may be negative.
+
+    Returns:
+        np.ndarray: The non-negative probabilities summing to 1, in the same order.
+    """
+    descending = np.sort(quasi_probabilities)[::-1]
+    excess = np.cumsum(descending) - 1
+    ranks = np.arange(1, len(descending) + 1)
+    rho = np.flatnonzero(descending - excess / ranks > 0)[-1]
+    threshold: float = excess[rho] / (rho + 1)
+    return np.maximum(quasi_probabilities - threshold, 0)
+
+
+def mitigate_counts(
+    counts: Mapping[str, int],
+    matrices: NDArray[np.float64],
+    method: Method,
+    cutoff: float = DEFAULT_CUTOFF,
+    max_entries: int = DEFAULT_MAX_ENTRIES,
+) -> dict[str, float]:
+    """Mitigates the readout errors of a count histogram.
+
+    With `pseudo_inverse`, the inverse of the readout matrices is applied to the
+    histogram, and the mitigated counts may be negative. With `least_square`, the
+    result of `pseudo_inverse` is replaced with the nearest non-negative histogram
+    with the same number of shots, see `nearest_probabilities`.
+
+    Args:
+        counts (Mapping[str, int]): The histogram, e.g. {"00": 5020, "11": 4980}.
+        matrices (np.ndarray): The readout matrices built by `readout_matrices`, the
+            first one for the rightmost bit of the bitstrings.
+        method (Method): pseudo_inverse or least_square.
+        cutoff (float): The fraction of the shots below which mitigated counts are dropped.
+        max_entries (int): The maximum number of bitstrings kept during the mitigation.
+
+    Raises:
+        MitigationError: If the keys are not bitstrings of the same length (at most 64
+            bits) or do not match the number of matrices.
+
+    Returns:
+        dict[str, float]: The mitigated counts by bitstring, in ascending order.
+    """
+    if method not in ("pseudo_inverse", "least_square"):
+        raise MitigationError(f"unknown mitigation method: {method}")
+    if len(counts) == 0:
+        return {}
+    n_bits, keys, values = _to_arrays(counts)
+    if n_bits != len(matrices):
+        raise MitigationError(
+            f"{len(matrices)} readout matrices for bitstrings of {n_bits} bits"
+        )
+    shots = values.sum()
+    keys, values = apply_inverse(
+        keys, values, matrices, cutoff=cutoff * shots, max_entries=max_entries
+    )
+    if method == "least_square" and len(values) > 0:
+        values = nearest_probabilities(values / values.sum()) * shots
+        kept = values > 0
+        keys, values = keys[kept], values[kept]
+    return _to_counts(n_bits, keys, values)
@@ -2,9 +2,12 @@ from typing import Any, Dict
 
 
 def model_to_dict(model: Any) -> Dict[Any, Any]:
-    dict_obj: Dict[Any, Any] = model.__dict__
-    if "_sa_instance_state" in dict_obj:
-        del dict_obj["_sa_instance_state"]
+    # a copy, deleting the instance state from the model detaches it from its session
+    dict_obj: Dict[Any, Any] = {
+        key: value
+        for key, value in model.__dict__.items()
+        if key != "_sa_instance_state"
+    }
     return dict_obj
 
 
@@ -31,6 +31,7 @@ class Device(Base):
         calibration_data (str): The calibration data of the device.
         calibrated_at (datetime): The date and time when the device was last calibrated.
         description (str): The description of the device.
+        version (int): The version of the device, incremented on every update.
     """
 
     __tablename__ = "devices"
@@ -81,3 +82,7 @@ class Device(Base):
         String(128),
         nullable=False,
     )
+    version: Mapped[int] = mapped_column(
+        nullable=False,
+        default=0,
+    )
@@ -0,0 +1,43 @@
+from typing import Optional
+
+from sqlalchemy import (
+    Float,
+    String,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from oqtopus_cloud.common.models.base import (
+    Base,
+)
+
+
+class FairShare(Base):
+    """
+    Represents the share of a device given to the tasks of an owner.
+
+    Attributes:
+        device (str): The device.
+        owner (str): The owner of the tasks.
+        weight (float): The share of the owner relative to the other owners with queued tasks. A weight of 0 suspends the dispatch of the tasks of the owner.
+        virtual_time (float): The sum of 1 / weight over the tasks of the owner dispatched so far, see `oqtopus_cloud.common.scheduler`, or None before the first claim.
+    """
+
+    __tablename__ = "fair_shares"
+
+    device: Mapped[str] = mapped_column(
+        String(64),
+        primary_key=True,
+    )
+    owner: Mapped[str] = mapped_column(
+        String(64),
+        primary_key=True,
+    )
+    weight: Mapped[float] = mapped_column(
+        Float,
+        nullable=False,
+        default=1.0,
+    )
+    virtual_time: Mapped[Optional[float]] = mapped_column(
+        Float,
+        nullable=True,
+    )
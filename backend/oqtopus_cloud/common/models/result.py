@@ -1,11 +1,12 @@
-import enum
-import uuid
-
 from sqlalchemy import (
     Enum,
     ForeignKey,
+    LargeBinary,
+    Text,
 )
 from sqlalchemy.dialects.mysql import (
+    LONGBLOB,
+    LONGTEXT,
     VARBINARY,
 )
 from sqlalchemy.orm import Mapped, mapped_column
@@ -24,7 +25,9 @@ class Result(Base):
     Attributes:
         task_id (bytes): The ID of the task associated with this result.
         status (str): The status of the result (SUCCESS, FAILURE, CANCELLED).
-        result (str): The result of the task execution.
+        result (str): The result of the task execution, as JSON.
+        packed_result (bytes): The count histogram of a sampling task, in the compact format of `oqtopus_cloud.common.histogram`. If set, result is NULL.
+        basis_counts (str): The count histograms by measurement basis from which the result of an estimation task was estimated, as JSON.
         reason (str): The reason for the result (if any).
         transpiled_code (str): The transpiled code generated during execution.
         qubit_allocation (str): The allocation of qubits used during execution.
@@ -32,7 +35,7 @@ class Result(Base):
 
     __tablename__ = "results"
 
-    task_id: Mapped[uuid.UUID] = mapped_column(
+    task_id: Mapped[bytes] = mapped_column(
         VARBINARY(16),
         ForeignKey(
             "tasks.id",
@@ -40,7 +43,7 @@ class Result(Base):
         ),
         primary_key=True,
     )
-    status: Mapped[enum.Enum] = mapped_column(
+    status: Mapped[str] = mapped_column(
         Enum(
             "SUCCESS",
             "FAILURE",
@@ -51,10 +54,20 @@ class Result(Base):
     result: Mapped[str] = mapped_column(
         nullable=True,
     )
+    packed_result: Mapped[bytes] = mapped_column(
+        LargeBinary().with_variant(LONGBLOB(), "mysql"),
+        nullable=True,
+    )
+    basis_counts: Mapped[str] = mapped_column(
+        Text().with_variant(LONGTEXT(), "mysql"),
+        nullable=True,
+    )
     reason: Mapped[str] = mapped_column(
         nullable=True,
     )
-    transpiled_code: Mapped[str]
+    transpiled_code: Mapped[str] = mapped_column(
+        nullable=True,
+    )
     qubit_allocation: Mapped[str] = mapped_column(
         nullable=True,
     )
@@ -1,17 +1,28 @@
 import datetime
-import enum
-import uuid
-from typing import Any, Literal
+from typing import Any, Literal, Optional
 
-from sqlalchemy import JSON, TIMESTAMP, Boolean, Enum, ForeignKey, Integer, String
+from sqlalchemy import (
+    JSON,
+    TIMESTAMP,
+    Boolean,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    text,
+)
 from sqlalchemy.dialects.mysql import (
+    LONGBLOB,
     VARBINARY,
 )
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from oqtopus_cloud.common.models.base import (
     Base,
 )
+from oqtopus_cloud.common.models.task_code import TaskCode
 
 
 class Task(Base):
@@ -21,17 +32,20 @@ class Task(Base):
     See https://github.com/sqlalchemy/sqlalchemy/issues/5613 for the reason why we need to use nullable=True for some columns.
 
     Attributes:
-        id (UUID): The unique identifier of the task.
+        id (bytes): The unique identifier of the task.
         owner (str): The owner of the task.
         name (str): The name of the task.
         device (str): The device used for the task.
         n_qubits (int): The number of qubits used in the task.
         n_nodes (int): The number of nodes used in the task.
-        code (str): The code associated with the task.
+        code (str): The code of a task submitted before code_hash was added.
+        code_hash (bytes): The hash of the code of the task in the task_codes table. If set, code is NULL.
+        task_code (TaskCode): The row of the task_codes table referenced by code_hash.
         action (str): The action to be performed by the task (sampling or estimation).
         method (str): The method used for the task (state_vector or sampling).
         shots (int): The number of shots for the task.
-        operator (str): The operator used in the task.
+        operator (str): The operator of a task submitted before packed_operator was added, as JSON.
+        packed_operator (bytes): The operator of an estimation task, in the compact format of `oqtopus_cloud.common.pauli`. If set, operator is NULL.
         qubit_allocation (str): The qubit allocation for the task.
         skip_transpilation (bool): Flag indicating whether transpilation should be skipped.
         seed_transpilation (int): The seed used for transpilation.
@@ -40,13 +54,39 @@ class Task(Base):
         simulation_opt (str): The simulation optimization used for the task.
         ro_error_mitigation (str): The error mitigation method used for readout errors.
         note (str): Additional notes for the task.
+        priority (int): The dispatch priority of the task among the tasks of its owner on its device (0 to 9, highest first).
         status (str): The status of the task (QUEUED, RUNNING, COMPLETED, FAILED, CANCELLING, CANCELLED).
         created_at (datetime): The timestamp when the task was created.
+        lease_expires_at (datetime): The timestamp when the lease of a claimed task expires and it is requeued.
+        lease_token (bytes): The token of the lease of a claimed task, which its worker sends to renew the lease.
     """
 
     __tablename__ = "tasks"
+    __table_args__ = (
+        # user API: tasks of an owner per action, ordered by creation time
+        Index("idx_tasks_owner_action_created_at", "owner", "action", "created_at"),
+        # provider API: queued tasks of a device, ordered by creation time
+        Index("idx_tasks_device_status_created_at", "device", "status", "created_at"),
+        # provider API: claimed tasks of a device whose lease has expired
+        Index(
+            "idx_tasks_device_status_lease_expires_at",
+            "device",
+            "status",
+            "lease_expires_at",
+        ),
+        # scheduler: queued tasks of an owner on a device, in dispatch order
+        Index(
+            "idx_tasks_device_status_owner_priority",
+            "device",
+            "status",
+            "owner",
+            text("priority DESC"),
+            "created_at",
+            "id",
+        ),
+    )
 
-    id: Mapped[uuid.UUID] = mapped_column(
+    id: Mapped[bytes] = mapped_column(
         VARBINARY(16),
         primary_key=True,
     )
@@ -67,16 +107,22 @@ class Task(Base):
         nullable=True,
     )
     code: Mapped[str] = mapped_column(
-        nullable=False,
+        nullable=True,
+    )
+    code_hash: Mapped[bytes] = mapped_column(
+        VARBINARY(32),
+        ForeignKey("task_codes.hash"),
+        nullable=True,
     )
-    action: Mapped[enum.Enum] = mapped_column(
+    task_code: Mapped[Optional[TaskCode]] = relationship(lazy="select")
+    action: Mapped[str] = mapped_column(
         Enum(
             "sampling",
             "estimation",
         ),
         nullable=False,
     )
-    method: Mapped[enum.Enum] = mapped_column(
+    method: Mapped[str] = mapped_column(
         Enum(
             "state_vector",
             "sampling",
@@ -90,6 +136,10 @@ class Task(Base):
         String(1024),
         nullable=True,
     )
+    packed_operator: Mapped[bytes] = mapped_column(
+        LargeBinary().with_variant(LONGBLOB(), "mysql"),
+        nullable=True,
+    )
     qubit_allocation: Mapped[dict[str, int]] = mapped_column(JSON)
     skip_transpilation: Mapped[bool] = mapped_column(
         Boolean,
@@ -118,7 +168,12 @@ class Task(Base):
         nullable=True,
     )
     note: Mapped[str] = mapped_column(String(1024), nullable=True)
-    status: Mapped[enum.Enum] = mapped_column(
+    priority: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+    )
+    status: Mapped[str] = mapped_column(
         Enum(
             "QUEUED",
             "RUNNING",
@@ -134,6 +189,14 @@ class Task(Base):
         TIMESTAMP,
         default="CURRENT_TIMESTAMP",
     )
+    lease_expires_at: Mapped[Optional[datetime.datetime]] = mapped_column(
+        TIMESTAMP,
+        nullable=True,
+    )
+    lease_token: Mapped[Optional[bytes]] = mapped_column(
+        VARBINARY(16),
+        nullable=True,
+    )
 
 
 class Error(Exception):
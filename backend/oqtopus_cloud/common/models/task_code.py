@@ -0,0 +1,30 @@
+from sqlalchemy import Text
+from sqlalchemy.dialects.mysql import (
+    VARBINARY,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from oqtopus_cloud.common.models.base import (
+    Base,
+)
+
+
+class TaskCode(Base):
+    """
+    Represents the code of tasks, stored once for all the tasks with the same code.
+
+    Attributes:
+        hash (bytes): The SHA-256 digest of the code encoded in UTF-8.
+        code (str): The code.
+    """
+
+    __tablename__ = "task_codes"
+
+    hash: Mapped[bytes] = mapped_column(
+        VARBINARY(32),
+        primary_key=True,
+    )
+    code: Mapped[str] = mapped_column(
+        Text,
+        nullable=False,
+    )
@@ -0,0 +1,54 @@
+import datetime
+
+from sqlalchemy import (
+    TIMESTAMP,
+    BigInteger,
+    Index,
+    Integer,
+    String,
+)
+from sqlalchemy.dialects.mysql import (
+    VARBINARY,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from oqtopus_cloud.common.models.base import (
+    Base,
+)
+
+
+class TaskEvent(Base):
+    """
+    Represents an entry of the append-only log of the tasks put in the queue of a device.
+
+    Attributes:
+        seq (int): The position of the entry in the log, increasing with each entry.
+        task_id (bytes): The ID of the task.
+        device (str): The device of the task.
+        created_at (datetime): The timestamp when the entry was written.
+    """
+
+    __tablename__ = "task_events"
+    __table_args__ = (
+        # the feed reads the entries of a device after a cursor
+        Index("idx_task_events_device_seq", "device", "seq"),
+    )
+
+    seq: Mapped[int] = mapped_column(
+        # SQLite only generates INTEGER PRIMARY KEY values
+        BigInteger().with_variant(Integer, "sqlite"),
+        primary_key=True,
+        autoincrement=True,
+    )
+    task_id: Mapped[bytes] = mapped_column(
+        VARBINARY(16),
+        nullable=False,
+    )
+    device: Mapped[str] = mapped_column(
+        String(64),
+        nullable=False,
+    )
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP,
+        nullable=False,
+    )
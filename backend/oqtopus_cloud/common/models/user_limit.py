@@ -0,0 +1,71 @@
+import datetime
+
+from sqlalchemy import (
+    TIMESTAMP,
+    Float,
+    Integer,
+    String,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from oqtopus_cloud.common.models.base import (
+    Base,
+)
+
+
+class UserLimit(Base):
+    """
+    Represents the limits on the tasks of an owner, and the usage they are checked against.
+
+    Attributes:
+        owner (str): The owner of the tasks.
+        max_queued_tasks (int): The maximum number of QUEUED tasks, or None for no limit.
+        max_active_tasks (int): The maximum number of QUEUED, RUNNING and CANCELLING tasks, or None for no limit.
+        rate (float): The number of tasks that can be submitted per second on average, or None for no limit.
+        burst (float): The number of tasks that can be submitted at once, the capacity of the token bucket. Submissions are only rate limited if both rate and burst are set.
+        tokens (float): The tokens left in the bucket at refilled_at, or None for a full bucket.
+        refilled_at (datetime): The timestamp when tokens was last updated.
+        queued_tasks (int): The number of QUEUED tasks, see `oqtopus_cloud.common.quota`.
+        running_tasks (int): The number of RUNNING and CANCELLING tasks.
+    """
+
+    __tablename__ = "user_limits"
+
+    owner: Mapped[str] = mapped_column(
+        String(64),
+        primary_key=True,
+    )
+    max_queued_tasks: Mapped[int] = mapped_column(
+        Integer,
+        nullable=True,
+    )
+    max_active_tasks: Mapped[int] = mapped_column(
+        Integer,
+        nullable=True,
+    )
+    rate: Mapped[float] = mapped_column(
+        Float,
+        nullable=True,
+    )
+    burst: Mapped[float] = mapped_column(
+        Float,
+        nullable=True,
+    )
+    tokens: Mapped[float] = mapped_column(
+        Float,
+        nullable=True,
+    )
+    refilled_at: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP,
+        nullable=True,
+    )
+    queued_tasks: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+    )
+    running_tasks: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+    )
@@ -0,0 +1,42 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+
+class InvalidCursor(ValueError):
+    """Exception raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(created_at: datetime, id: bytes) -> str:
+    """Encodes the sort key of the last row of a page into an opaque cursor.
+
+    Args:
+        created_at (datetime): The creation timestamp of the last row.
+        id (bytes): The binary id of the last row.
+
+    Returns:
+        str: The URL-safe cursor.
+    """
+    payload = json.dumps({"c": created_at.isoformat(), "i": id.hex()})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, bytes]:
+    """Decodes a cursor created by `encode_cursor`.
+
+    Args:
+        cursor (str): The cursor received from the client.
+
+    Raises:
+        InvalidCursor: If the cursor is malformed.
+
+    Returns:
+        tuple[datetime, bytes]: The creation timestamp and the binary id of the last row.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["c"]), bytes.fromhex(payload["i"])
+    except (binascii.Error, UnicodeDecodeError, TypeError, KeyError, ValueError):
+        raise InvalidCursor(f"invalid cursor: {cursor}")
@@ -0,0 +1,257 @@
+import struct
+import sys
+from array import array
+from numbers import Real
+from typing import Any, NamedTuple, Optional, Sequence
+
+from oqtopus_cloud.common import codec
+
+MAGIC = b"OQP"
+VERSION = 1
+
+# header: magic, version
+_HEADER = struct.Struct("<3sB")
+# body header: number of terms, width of the bitmasks in bytes
+_BODY_HEADER = struct.Struct("<IH")
+_PAULI_BITS = {"I": (0, 0), "X": (1, 0), "Y": (1, 1), "Z": (0, 1)}
+# the bitmasks of larger qubit indices would take more memory than the operator
+MAX_QUBITS = 1 << 16
+
+
+class OperatorFormatError(ValueError):
+    """Exception raised when an operator cannot be parsed, encoded or decoded."""
+
+
+class PauliTerm(NamedTuple):
+    """A Pauli string with its coefficient, in the symplectic representation.
+
+    The bit i of `x` and `z` is the Pauli of qubit i: I (0, 0), X (1, 0), Y (1, 1)
+    or Z (0, 1).
+    """
+
+    x: int
+    z: int
+    coef: complex
+
+
+def parse_pauli_string(pauli_string: str) -> tuple[int, int]:
+    """Parses a Pauli string, e.g. "X 0 Y 1 Z 5 I 2", into its x and z bitmasks.
+
+    Args:
+        pauli_string (str): Pairs of a Pauli (I, X, Y or Z) and a qubit index.
+
+    Raises:
+        OperatorFormatError: If the Pauli string is malformed, a qubit appears twice or
+            its index is not less than MAX_QUBITS.
+
+    Returns:
+        tuple[int, int]: The x and z bitmasks.
+    """
+    tokens = pauli_string.split()
+    if len(tokens) == 0 or len(tokens) % 2 != 0:
+        raise OperatorFormatError(f"malformed Pauli string: {pauli_string}")
+    x = z = seen = 0
+    for pauli, index in zip(tokens[::2], tokens[1::2]):
+        bits = _PAULI_BITS.get(pauli)
+        if bits is None or not index.isdecimal() or not index.isascii():
+            raise OperatorFormatError(f"malformed Pauli string: {pauli_string}")
+        if len(index) > 5 or int(index) >= MAX_QUBITS:
+            raise OperatorFormatError(f"qubit index out of range: {pauli_string}")
+        bit = 1 << int(index)
+        if seen & bit:
+            raise OperatorFormatError(f"qubit {index} appears twice in: {pauli_string}")
+        seen |= bit
+        x |= bit * bits[0]
+        z |= bit * bits[1]
+    return x, z
+
+
+def format_pauli_string(x: int, z: int) -> str:
+    """Formats x and z bitmasks as a Pauli string, e.g. "X 0 Y 1", without identities.
+
+    Args:
+        x (int): The x bitmask.
+        z (int): The z bitmask.
+
+    Returns:
+        str: The Pauli string, or "" for the identity.
+    """
+    paulis = []
+    support = x | z
+    while support:
+        bit = support & -support
+        index = bit.bit_length() - 1
+        paulis.append(f"{'IXZY'[bool(x & bit) + 2 * bool(z & bit)]} {index}")
+        support ^= bit
+    return " ".join(paulis)
+
+
+def _parse_coef(coef: Any) -> Optional[complex]:
+    # a number, or a list of its real part and optionally its imaginary part
+    if isinstance(coef, list) and 1 <= len(coef) <= 2:
+        parts = coef
+    elif not isinstance(coef, list):
+        parts = [coef]
+    else:
+        return None
+    if not all(isinstance(part, Real) and not isinstance(part, bool) for part in parts):
+        return None
+    return complex(*map(float, parts))
+
+
+def compile_operator(operator: Sequence[Any]) -> list[PauliTerm]:
+    """Parses an operator, e.g. [["X 0 X 1", [1.5, 2.8]], ["Z 0", 0.5]], into its terms.
+
+    The terms with the same Pauli string (e.g. "X 0 Z 1" and "Z 1 X 0") are merged
+    by adding their coefficients, in the order of their first occurrence.
+
+    Args:
+        operator (Sequence[Any]): The terms, as Pauli strings and coefficients. A
+            coefficient is a number, or a list of its real and imaginary parts.
+
+    Raises:
+        OperatorFormatError: If the operator is empty or a term is malformed.
+
+    Returns:
+        list[PauliTerm]: The terms.
+    """
+    if not isinstance(operator, list) or len(operator) == 0:
+        raise OperatorFormatError(str(operator))
+    coefs: dict[tuple[int, int], complex] = {}
+    for term in operator:
+        if not isinstance(term, list) or len(term) != 2:
+            raise OperatorFormatError(str(term))
+        pauli_string, coef = term
+        if not isinstance(pauli_string, str):
+            raise OperatorFormatError(f"malformed Pauli string: {str(term)}")
+        try:
+            key = parse_pauli_string(pauli_string)
+        except OperatorFormatError:
+            raise OperatorFormatError(f"malformed Pauli string: {str(term)}")
+        value = _parse_coef(coef)
+        if value is None:
+            raise OperatorFormatError(f"malformed coef value: {str(term)}")
+        coefs[key] = coefs.get(key, 0j) + value
+    return [PauliTerm(x, z, coef) for (x, z), coef in coefs.items()]
+
+
+def operator_to_list(terms: Sequence[PauliTerm]) -> list[list[Any]]:
+    """Converts terms into the operator format of the APIs, e.g. [["X 0 X 1", [1.5, 2.8]]].
+
+    Args:
+        terms (Sequence[PauliTerm]): The terms.
+
+    Returns:
+        list[list[Any]]: The Pauli strings, in ascending qubit order ("I 0" for the
+            identity), and the real and imaginary parts of the coefficients.
+    """
+    return [
+        [format_pauli_string(x, z) or "I 0", [coef.real, coef.imag]]
+        for x, z, coef in terms
+    ]
+
+
+def _pack(masks: list[int], width: int) -> bytes:
+    return b"".join(mask.to_bytes(width, "little") for mask in masks)
+
+
+def encode_operator(terms: Sequence[PauliTerm]) -> bytes:
+    """Encodes terms into the compact binary format.
+
+    The x bitmasks, the z bitmasks and the coefficients are stored as three columns.
+    The bitmasks use the number of bytes of the highest qubit, so an operator of n
+    terms on q qubits takes about n * (q / 4 + 16) bytes, with no limit on either.
+
+    Args:
+        terms (Sequence[PauliTerm]): The terms, e.g. returned by `compile_operator`.
+
+    Returns:
+        bytes: The encoded operator.
+    """
+    x_masks = [term.x for term in terms]
+    z_masks = [term.z for term in terms]
+    width = (max(x_masks + z_masks, default=0).bit_length() + 7) // 8
+    coefs = array(
+        "d", (part for term in terms for part in (term.coef.real, term.coef.imag))
+    )
+    if sys.byteorder == "big":
+        coefs.byteswap()
+    return b"".join(
+        [
+            _HEADER.pack(MAGIC, VERSION),
+            _BODY_HEADER.pack(len(terms), width),
+            _pack(x_masks, width),
+            _pack(z_masks, width),
+            coefs.tobytes(),
+        ]
+    )
+
+
+def decode_operator(data: bytes) -> list[PauliTerm]:
+    """Decodes an operator encoded by `encode_operator`.
+
+    Args:
+        data (bytes): The encoded operator.
+
+    Raises:
+        OperatorFormatError: If the data is not an operator of a supported version.
+
+    Returns:
+        list[PauliTerm]: The terms.
+    """
+    try:
+        magic, version = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise OperatorFormatError(f"unsupported operator: {magic!r} v{version}")
+        n_terms, width = _BODY_HEADER.unpack_from(data, _HEADER.size)
+    except struct.error as e:
+        raise OperatorFormatError(f"malformed operator: {str(e)}")
+    x_offset = _HEADER.size + _BODY_HEADER.size
+    z_offset = x_offset + n_terms * width
+    coefs_offset = z_offset + n_terms * width
+    if len(data) != coefs_offset + n_terms * 16:
+        raise OperatorFormatError("truncated operator")
+    view = memoryview(data)
+    if width == 0:
+        masks = [0] * (2 * n_terms)
+    else:
+        masks = [
+            int.from_bytes(view[offset : offset + width], "little")
+            for offset in range(x_offset, coefs_offset, width)
+        ]
+    coefs = array("d")
+    coefs.frombytes(view[coefs_offset:])
+    if sys.byteorder == "big":
+        coefs.byteswap()
+    return [
+        PauliTerm(masks[i], masks[n_terms + i], complex(coefs[2 * i], coefs[2 * i + 1]))
+        for i in range(n_terms)
+    ]
+
+
+def load_operator(
+    packed_operator: Optional[bytes], operator: Optional[str]
+) -> list[PauliTerm]:
+    """Loads the operator of an estimation task from the columns of the tasks table.
+
+    Args:
+        packed_operator (Optional[bytes]): The value of packed_operator, in the format of
+            `encode_operator`.
+        operator (Optional[str]): The value of operator, for tasks submitted before the
+            operators were packed.
+
+    Raises:
+        OperatorFormatError: If neither column holds a well-formed operator.
+
+    Returns:
+        list[PauliTerm]: The terms.
+    """
+    if packed_operator is not None:
+        return decode_operator(packed_operator)
+    if operator is None:
+        raise OperatorFormatError("the task has no operator")
+    try:
+        loaded = codec.loads(operator)
+    except (SyntaxError, ValueError) as e:
+        raise OperatorFormatError(f"malformed operator: {str(e)}")
+    return compile_operator(loaded)
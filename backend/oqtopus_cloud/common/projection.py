@@ -0,0 +1,125 @@
+from typing import Any, Callable, Mapping, NamedTuple, Optional, Sequence, TypeVar
+
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy.orm import load_only
+from sqlalchemy.orm.interfaces import LoaderOption
+
+# the field always returned, so that the projected objects can be told apart
+KEY_FIELD = "taskId"
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class InvalidFields(ValueError):
+    """Exception raised when the fields query parameter names an unknown field."""
+
+
+class FieldSpec(NamedTuple):
+    """How a field of a response is built from a row.
+
+    `columns` are the mapped columns read by `get`, so that the columns of the fields
+    that are not requested are neither selected nor decoded.
+    """
+
+    columns: tuple[Any, ...]
+    get: Callable[[Any], Any]
+
+
+def parse_fields(
+    fields: Optional[str], specs: Mapping[str, FieldSpec]
+) -> Optional[list[str]]:
+    """Parses the fields query parameter, e.g. "taskId,status,createdAt".
+
+    Args:
+        fields (Optional[str]): The comma-separated field names, or None for all fields.
+        specs (Mapping[str, FieldSpec]): The fields of the response.
+
+    Raises:
+        InvalidFields: If a field is not a field of the response.
+
+    Returns:
+        Optional[list[str]]: The requested fields including KEY_FIELD, in the order of
+            `specs`, or None for all fields.
+    """
+    if fields is None:
+        return None
+    names = {name.strip() for name in fields.split(",")} - {""}
+    unknown = sorted(names - specs.keys())
+    if len(unknown) > 0:
+        raise InvalidFields(f"unknown fields: {','.join(unknown)}")
+    names.add(KEY_FIELD)
+    return [name for name in specs if name in names]
+
+
+def load_fields(
+    specs: Mapping[str, FieldSpec], fields: Optional[Sequence[str]], *columns: Any
+) -> list[LoaderOption]:
+    """Returns the loader options selecting only the columns of the requested fields.
+
+    Args:
+        specs (Mapping[str, FieldSpec]): The fields of the response.
+        fields (Optional[Sequence[str]]): The fields returned by `parse_fields`.
+        *columns (Any): Other columns read by the caller, e.g. the sort key of a page.
+
+    Returns:
+        list[LoaderOption]: The options for `Select.options`, none for all fields.
+    """
+    if fields is None:
+        return []
+    selected = dict.fromkeys(
+        [column for name in fields for column in specs[name].columns] + list(columns)
+    )
+    return [load_only(*selected)]
+
+
+def build_fields(
+    model: type[ModelT],
+    specs: Mapping[str, FieldSpec],
+    row: Any,
+    fields: Optional[Sequence[str]],
+    **values: Any,
+) -> ModelT:
+    """Builds a response from a row, with only the requested fields.
+
+    A projected response is not validated, as its required fields may be missing,
+    and must be serialized with `projected_response`.
+
+    Args:
+        model (type[ModelT]): The model of the response.
+        specs (Mapping[str, FieldSpec]): The fields of the response.
+        row (Any): The row, e.g. a Task.
+        fields (Optional[Sequence[str]]): The fields returned by `parse_fields`.
+        **values (Any): The values of fields that are not built with their spec.
+
+    Returns:
+        ModelT: The response.
+    """
+    names = specs if fields is None else fields
+    built = {name: specs[name].get(row) for name in names if name not in values}
+    if fields is None:
+        return model(**built, **values)
+    built.update((name, value) for name, value in values.items() if name in fields)
+    return model.model_construct(**built)
+
+
+def projected_response(
+    content: BaseModel | Sequence[BaseModel], fields: Sequence[str]
+) -> Response:
+    """Serializes responses built by `build_fields` with only the requested fields.
+
+    Args:
+        content (BaseModel | Sequence[BaseModel]): A response or a list of responses.
+        fields (Sequence[str]): The fields returned by `parse_fields`.
+
+    Returns:
+        Response: The JSON response.
+    """
+    include = set(fields)
+    if isinstance(content, BaseModel):
+        body = content.model_dump_json(include=include)
+    else:
+        body = (
+            f"[{','.join(item.model_dump_json(include=include) for item in content)}]"
+        )
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,181 @@
+import math
+from datetime import datetime
+from typing import Iterable, NamedTuple, Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from oqtopus_cloud.common.models.user_limit import UserLimit
+
+# the Retry-After of a submission over the limits on the number of tasks, which are
+# only freed as the tasks are processed
+LIMIT_RETRY_AFTER = 60
+
+# the counter of each status counted in the user_limits table
+COUNTERS = {
+    "QUEUED": "queued_tasks",
+    "RUNNING": "running_tasks",
+    "CANCELLING": "running_tasks",
+}
+
+
+class QuotaExceeded(Exception):
+    """Raised when tasks cannot be submitted within the limits of their owner.
+
+    Attributes:
+        retry_after (Optional[int]): The number of seconds after which the submission
+            may be accepted, or None if it never is.
+    """
+
+    def __init__(self, message: str, retry_after: Optional[int]):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class StatusChange(NamedTuple):
+    """A change of the status of tasks of an owner.
+
+    Attributes:
+        owner (str): The owner of the tasks.
+        old (Optional[str]): The status before the change, or None for new tasks.
+        new (Optional[str]): The status after the change, or None for a final status.
+        n_tasks (int): The number of tasks.
+    """
+
+    owner: str
+    old: Optional[str]
+    new: Optional[str]
+    n_tasks: int = 1
+
+
+def refill_tokens(
+    tokens: Optional[float],
+    refilled_at: Optional[datetime],
+    rate: float,
+    burst: float,
+    now: datetime,
+) -> float:
+    """Returns the tokens in a token bucket.
+
+    Args:
+        tokens (Optional[float]): The tokens at refilled_at, or None for a full bucket.
+        refilled_at (Optional[datetime]): The timestamp when tokens was updated.
+        rate (float): The tokens added per second.
+        burst (float): The capacity of the bucket.
+        now (datetime): The current time.
+
+    Returns:
+        float: The tokens at now.
+    """
+    if tokens is None or refilled_at is None:
+        return burst
+    elapsed = max((now - refilled_at).total_seconds(), 0.0)
+    return min(tokens + rate * elapsed, burst)
+
+
+def lock_user_limit(db: Session, owner: str) -> UserLimit:
+    """Locks the row of an owner in the user_limits table until the end of the transaction.
+
+    The row is created the first time, with the default values of the table.
+
+    Args:
+        db (Session): The database session.
+        owner (str): The owner.
+
+    Returns:
+        UserLimit: The limits and counters of the owner.
+    """
+    stmt = select(UserLimit).filter(UserLimit.owner == owner).with_for_update()
+    limit = db.scalars(stmt).first()
+    if limit is None:
+        try:
+            with db.begin_nested():
+                db.execute(insert(UserLimit).values(owner=owner))
+        except IntegrityError:
+            # the row was created by a concurrent submission of the owner
+            pass
+        limit = db.scalars(stmt).one()
+    return limit
+
+
+def reserve_tasks(db: Session, owner: str, count: int, now: datetime) -> None:
+    """Checks that an owner can submit new tasks, and counts them as QUEUED.
+
+    The row of the owner is locked until the end of the transaction, so the
+    concurrent submissions of an owner are checked one after the other. The limits
+    are checked against the counters of the row instead of counting the tasks of the
+    owner, so the cost of a submission does not depend on the number of queued tasks.
+
+    Args:
+        db (Session): The database session.
+        owner (str): The owner of the tasks.
+        count (int): The number of tasks.
+        now (datetime): The current time.
+
+    Raises:
+        QuotaExceeded: If the tasks are over a limit of the owner. Nothing is counted.
+    """
+    limit = lock_user_limit(db, owner)
+    if (
+        limit.max_queued_tasks is not None
+        and limit.queued_tasks + count > limit.max_queued_tasks
+    ):
+        raise QuotaExceeded(
+            f"too many queued tasks (limit = {limit.max_queued_tasks})",
+            LIMIT_RETRY_AFTER,
+        )
+    if (
+        limit.max_active_tasks is not None
+        and limit.queued_tasks + limit.running_tasks + count > limit.max_active_tasks
+    ):
+        raise QuotaExceeded(
+            f"too many queued and running tasks (limit = {limit.max_active_tasks})",
+            LIMIT_RETRY_AFTER,
+        )
+    if limit.rate is not None and limit.burst is not None:
+        if count > limit.burst:
+            raise QuotaExceeded(
+                f"{count} tasks cannot be submitted at once (limit = {limit.burst:g})",
+                None,
+            )
+        tokens = refill_tokens(
+            limit.tokens, limit.refilled_at, limit.rate, limit.burst, now
+        )
+        if tokens < count:
+            raise QuotaExceeded(
+                f"too many submitted tasks (limit = {limit.rate:g} per second)",
+                math.ceil((count - tokens) / limit.rate) if limit.rate > 0 else None,
+            )
+        limit.tokens = tokens - count
+        limit.refilled_at = now
+    limit.queued_tasks += count
+
+
+def record_status_changes(db: Session, changes: Iterable[StatusChange]) -> None:
+    """Updates the counters of the owners of tasks whose status changes.
+
+    The counters are updated by increments, without reading them, and the rows are
+    updated in the order of the owners, so concurrent transactions do not deadlock.
+
+    Args:
+        db (Session): The database session.
+        changes (Iterable[StatusChange]): The changes.
+    """
+    deltas: dict[str, dict[str, int]] = {}
+    for change in changes:
+        delta = deltas.setdefault(change.owner, {})
+        for status, sign in ((change.old, -1), (change.new, 1)):
+            counter = COUNTERS.get(status) if status is not None else None
+            if counter is not None:
+                delta[counter] = delta.get(counter, 0) + sign * change.n_tasks
+    for owner in sorted(deltas):
+        values = {
+            counter: getattr(UserLimit, counter) + value
+            for counter, value in deltas[owner].items()
+            if value != 0
+        }
+        if len(values) > 0:
+            db.execute(
+                update(UserLimit).where(UserLimit.owner == owner).values(**values)
+            )
@@ -0,0 +1,147 @@
+import heapq
+from collections import deque
+from typing import Any, Mapping, Optional, Sequence
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement
+
+from oqtopus_cloud.common.models.fair_share import FairShare
+from oqtopus_cloud.common.models.task import Task
+
+# the weight of the owners without a row in the fair_shares table
+DEFAULT_WEIGHT = 1.0
+
+
+def start_times(
+    virtual_times: Mapping[str, float], weights: Mapping[str, float]
+) -> dict[str, float]:
+    """Returns the virtual time from which each owner with queued tasks is scheduled.
+
+    While an owner has queued tasks, its virtual time stays within 1 / weight of the
+    earliest one, so it is never below the largest virtual time - 1 / weight of the
+    owners. An owner that was idle, or is new, would otherwise be far behind the
+    others and take the device until it catches up: its virtual time is raised to
+    that floor, which leaves the owners that have been waiting all along unchanged.
+
+    Args:
+        virtual_times (Mapping[str, float]): The stored virtual times by owner.
+        weights (Mapping[str, float]): The weights of the owners with queued tasks.
+            The owners with a weight of 0 are left out.
+
+    Returns:
+        dict[str, float]: The virtual times by owner.
+    """
+    owners = [owner for owner, weight in weights.items() if weight > 0]
+    floor = max(
+        (
+            virtual_times[owner] - 1 / weights[owner]
+            for owner in owners
+            if owner in virtual_times
+        ),
+        default=0.0,
+    )
+    return {owner: max(virtual_times.get(owner, floor), floor) for owner in owners}
+
+
+def schedule_tasks(
+    db: Session,
+    device_id: str,
+    limit: Optional[int],
+    claim: bool = False,
+    conditions: Sequence[ColumnElement[bool]] = (),
+    options: Sequence[Any] = (),
+) -> list[Task]:
+    """Returns the queued tasks of a device in dispatch order.
+
+    The owners share the device by stride scheduling, a weighted fair queuing:
+    each owner has a virtual time, which advances by 1 / weight with each
+    dispatched task, and the next task is taken from the owner with the earliest
+    virtual time (ties go to the larger weight). The tasks of an owner are taken in
+    descending priority, then in order of age. So an owner with 50k queued tasks
+    gets its share of the device without starving the other owners, and priorities
+    only reorder the tasks of one owner.
+
+    Each step is served from idx_tasks_device_status_owner_priority: the owners with
+    queued tasks are read from it, then the first tasks of an owner the first time
+    it is picked, so the queue is never sorted as a whole.
+
+    Args:
+        db (Session): The database session.
+        device_id (str): The device.
+        limit (Optional[int]): The maximum number of tasks, or None for all of them.
+        claim (bool): If true, the tasks are locked (skipping the tasks locked by
+            another claim) and the virtual times of the owners are advanced with the
+            transaction of the session, for the tasks to be dispatched. The rows of
+            the owners in fair_shares are locked until the end of the transaction,
+            so the claims of a device are serialized. Otherwise the order is only
+            computed.
+        conditions (Sequence[ColumnElement[bool]]): Other conditions on the tasks.
+        options (Sequence[Any]): Loader options of the tasks.
+
+    Returns:
+        list[Task]: The tasks.
+    """
+    queued = (Task.device == device_id, Task.status == "QUEUED", *conditions)
+    owners = db.scalars(select(Task.owner).filter(*queued).distinct()).all()
+    if len(owners) == 0 or limit == 0:
+        return []
+    owners = sorted(owners)
+    stmt = select(FairShare).filter(
+        FairShare.device == device_id, FairShare.owner.in_(owners)
+    )
+    if claim:
+        # the missing rows are created first, as only existing rows are locked
+        db.execute(
+            insert(FairShare)
+            .prefix_with("IGNORE", dialect="mysql")
+            .prefix_with("OR IGNORE", dialect="sqlite"),
+            [
+                {"device": device_id, "owner": owner, "weight": DEFAULT_WEIGHT}
+                for owner in owners
+            ],
+        )
+        stmt = stmt.order_by(FairShare.owner).with_for_update()
+    shares = {share.owner: share for share in db.scalars(stmt)}
+    weights = {
+        owner: shares[owner].weight if owner in shares else DEFAULT_WEIGHT
+        for owner in owners
+    }
+    times = start_times(
+        {
+            owner: share.virtual_time
+            for owner, share in shares.items()
+            if share.virtual_time is not None
+        },
+        weights,
+    )
+    heap = [(time, -weights[owner], owner) for owner, time in times.items()]
+    heapq.heapify(heap)
+    queues: dict[str, deque[Task]] = {}
+    tasks: list[Task] = []
+    while len(heap) > 0 and (limit is None or len(tasks) < limit):
+        time, _, owner = heapq.heappop(heap)
+        if owner not in queues:
+            owner_stmt = (
+                select(Task)
+                .filter(*queued, Task.owner == owner)
+                .order_by(Task.priority.desc(), Task.created_at, Task.id)
+                .options(*options)
+            )
+            if limit is not None:
+                # the owner cannot be picked more times than the remaining tasks
+                owner_stmt = owner_stmt.limit(limit - len(tasks))
+            if claim:
+                owner_stmt = owner_stmt.with_for_update(skip_locked=True)
+            queues[owner] = deque(db.scalars(owner_stmt).all())
+        queue = queues[owner]
+        if len(queue) == 0:
+            continue
+        tasks.append(queue.popleft())
+        times[owner] = time + 1 / weights[owner]
+        if len(queue) > 0:
+            heapq.heappush(heap, (times[owner], -weights[owner], owner))
+    if claim:
+        for owner, time in times.items():
+            shares[owner].virtual_time = time
+    return tasks
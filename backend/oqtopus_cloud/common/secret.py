@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    Optional,
+)
+
+from aws_lambda_powertools import Logger
+
+logger: Logger = Logger(child=True)
+
+
+class SecretCache:
+    """
+    Caches a secret retrieved from the AWS Secrets Manager.
+
+    The secret is kept for `ttl` seconds. Once less than `refresh_margin` seconds
+    are left, the next read returns the cached value and refreshes it in a
+    background thread, so that requests do not wait for the Secrets Manager.
+    If the cached value has expired (e.g. the background refresh failed or the
+    container was frozen), it is refreshed synchronously.
+
+    Args:
+        secret_id (str): The name or ARN of the secret.
+        client (Any): A Secrets Manager client, or any object providing `get_secret_value(SecretId=...)`.
+        ttl (float): The number of seconds a secret is cached.
+        refresh_margin (float): The number of seconds before expiry when the background refresh starts.
+        clock (Callable[[], float]): The monotonic clock used to measure the TTL.
+    """
+
+    def __init__(
+        self,
+        secret_id: str,
+        client: Any,
+        ttl: float = 300,
+        refresh_margin: float = 60,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.secret_id = secret_id
+        self.client = client
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.clock = clock
+        self._value: Optional[dict[str, Any]] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    def get(self) -> dict[str, Any]:
+        """Returns the secret, fetching it from the Secrets Manager if needed.
+
+        Raises:
+            ClientError: If the secret cannot be retrieved and no valid cached value exists.
+
+        Returns:
+            dict[str, Any]: The secret.
+        """
+        now = self.clock()
+        value = self._value
+        if value is None or now >= self._expires_at:
+            with self._lock:
+                if self._value is None or self.clock() >= self._expires_at:
+                    self._store(self._fetch())
+                return self._value  # type: ignore
+        if now >= self._expires_at - self.refresh_margin:
+            self._refresh_in_background()
+        return value
+
+    def invalidate(self) -> None:
+        """Discards the cached secret so that the next read fetches it again.
+
+        Called when the database rejects the cached credentials, which means the
+        secret has been rotated.
+        """
+        with self._lock:
+            self._value = None
+            self._expires_at = 0.0
+
+    def _fetch(self) -> dict[str, Any]:
+        response = self.client.get_secret_value(SecretId=self.secret_id)
+        value: dict[str, Any] = json.loads(response["SecretString"])
+        return value
+
+    def _store(self, value: dict[str, Any]) -> None:
+        self._value = value
+        self._expires_at = self.clock() + self.ttl
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(target=self._refresh, daemon=True)
+            self._refresh_thread.start()
+
+    def _refresh(self) -> None:
+        try:
+            value = self._fetch()
+        except Exception as e:
+            # keep serving the cached value, it is refreshed synchronously on expiry
+            logger.warning(f"failed to refresh secret: {str(e)}")
+            return
+        with self._lock:
+            self._store(value)
@@ -1,26 +1,79 @@
-import json
 import os
+import threading
 from typing import (
+    TYPE_CHECKING,
     Any,
+    AsyncGenerator,
     Generator,
+    Optional,
 )
 
-import boto3
-
-# from aws_xray_sdk.core import xray_recorder
-from botocore.exceptions import (
-    ClientError,
-)
 from sqlalchemy import (
     create_engine,
+    event,
 )
+from sqlalchemy.engine import Engine, ExceptionContext
 from sqlalchemy.orm import sessionmaker
 
+from oqtopus_cloud.common.env import strtobool
+from oqtopus_cloud.common.secret import SecretCache
+
+if TYPE_CHECKING:
+    # imported lazily, the asyncio extension requires greenlet and a driver
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+# MySQL error code for "Access denied for user", raised when the credentials
+# used by the pool are no longer valid (e.g. after a secret rotation).
+MYSQL_ACCESS_DENIED = 1045
+
+_engine: Optional[Engine] = None
+_session_local: Optional[sessionmaker] = None
+_engine_credentials: Optional[tuple[str, str]] = None
+_engine_lock = threading.Lock()
+_async_engine: Optional["AsyncEngine"] = None
+_async_session_local: Optional["async_sessionmaker[AsyncSession]"] = None
+_async_engine_credentials: Optional[tuple[str, str]] = None
+_secret_cache: Optional[SecretCache] = None
+_secret_lock = threading.Lock()
+
+
+def get_secret_cache() -> SecretCache:
+    """Returns the process-wide cache of the database secret.
+
+    The Secrets Manager client and the cache are created on first use. The TTL
+    and the background refresh margin can be configured with SECRET_TTL and
+    SECRET_REFRESH_MARGIN (in seconds).
+
+    Returns:
+        SecretCache: The secret cache.
+    """
+    global _secret_cache
+    with _secret_lock:
+        if _secret_cache is None:
+            # imported here, the local environment does not use the Secrets Manager
+            import boto3
+
+            session = boto3.session.Session()
+            client = session.client(
+                service_name="secretsmanager",
+                region_name=os.environ["AWS_REGION"],
+            )
+            _secret_cache = SecretCache(
+                os.environ["SECRET_NAME"],
+                client,
+                ttl=float(os.getenv("SECRET_TTL", "300")),
+                refresh_margin=float(os.getenv("SECRET_REFRESH_MARGIN", "60")),
+            )
+        return _secret_cache
+
 
 def get_secret() -> Any:
     """
     Retrieves the secret from the AWS Secrets Manager.
 
+    The secret is cached for the lifetime of the process and refreshed before
+    its TTL expires, so most requests do not call the Secrets Manager at all.
+
     Raises:
       ClientError: If there is an error while retrieving the secret.
 
@@ -32,29 +85,115 @@ def get_secret() -> Any:
             "username": "admin",
             "password": "password",
         }
-    secret_name = os.environ["SECRET_NAME"]
-    region = os.environ["AWS_REGION"]
-    session = boto3.session.Session()
-    client = session.client(
-        service_name="secretsmanager",
-        region_name=region,
-    )
-    try:
-        get_secret_value_response = client.get_secret_value(SecretId=secret_name)
-    except ClientError as e:
-        raise e
+    return get_secret_cache().get()
+
+
+def get_pool_options() -> dict[str, Any]:
+    """Returns the connection pool options of the engine.
+
+    The options are read from the environment so that they can be tuned per
+    deployment (a Lambda container serves one request at a time, a uvicorn
+    worker serves many).
+
+    Returns:
+        dict[str, Any]: Keyword arguments passed to `create_engine`.
+    """
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "300")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+    }
+
+
+def is_access_denied(context: ExceptionContext) -> bool:
+    """Returns whether the DBAPI error was caused by rejected credentials.
+
+    Args:
+        context (ExceptionContext): The context of the error raised by the engine.
+
+    Returns:
+        bool: True if the database rejected the username or password.
+    """
+    orig = context.original_exception
+    # the original exception is not always a DBAPI error with a code in its args
+    args: tuple[Any, ...] = getattr(orig, "args", ())
+    return bool(args) and args[0] == MYSQL_ACCESS_DENIED
+
+
+def _on_engine_error(context: ExceptionContext) -> None:
+    if is_access_denied(context):
+        if _secret_cache is not None:
+            _secret_cache.invalidate()
+        invalidate_engine()
+
+
+def _connect() -> tuple[Engine, sessionmaker]:
+    global _engine, _session_local, _engine_credentials
+    secret = get_secret()
+    credentials = (secret["username"], secret["password"])
+    with _engine_lock:
+        if _engine is not None and _engine_credentials != credentials:
+            # the secret has been rotated, stop handing out the old pool
+            _engine.dispose(close=False)
+            _engine = None
+        if _engine is None or _session_local is None:
+            host = os.environ["DB_HOST"]
+            db_name = os.environ["DB_NAME"]
+            connector = os.environ["DB_CONNECTOR"]
+            SQLALCHEMY_DATABASE_URL = f"{connector}://{secret['username']}:{secret['password']}@{host}/{db_name}"
+            engine = create_engine(
+                SQLALCHEMY_DATABASE_URL,
+                **get_pool_options(),
+            )
+            event.listen(engine, "handle_error", _on_engine_error)
+            _engine = engine
+            _engine_credentials = credentials
+            _session_local = sessionmaker(
+                autoflush=False,
+                bind=engine,
+            )
+        return _engine, _session_local
+
+
+def get_engine() -> Engine:
+    """Returns the process-wide SQLAlchemy engine.
+
+    The engine and its connection pool are created on first use and reused by
+    every subsequent request served by the same Lambda container or worker
+    process. The engine is rebuilt when the cached secret has been rotated or
+    once it has been invalidated, which happens automatically when the database
+    rejects the current credentials.
+
+    Returns:
+        Engine: The SQLAlchemy engine.
+    """
+    engine, _ = _connect()
+    return engine
 
-    secret = get_secret_value_response["SecretString"]
-    return json.loads(secret)
+
+def invalidate_engine() -> None:
+    """Disposes the cached engine so that the next request builds a new one.
+
+    Connections that are currently checked out are closed once they are
+    returned to the pool.
+    """
+    global _engine, _session_local
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose(close=False)
+        _engine = None
+        _session_local = None
 
 
 def get_db() -> Generator:
     """Returns a database session.
 
-    This function creates a database session using the SQLAlchemy engine and sessionmaker.
+    This function creates a database session from the cached SQLAlchemy engine and sessionmaker.
     The session is then yielded to the caller, allowing them to perform database operations.
     If an exception occurs during the database operation, the session is rolled back and the exception is raised.
-    Finally, the session is closed.
+    Finally, the session is closed and its connection is returned to the pool.
 
     Yields:
         Generator: A database session.
@@ -65,21 +204,7 @@ def get_db() -> Generator:
     Returns:
         Generator: A database session.
     """
-    secret = get_secret()
-    host = os.environ["DB_HOST"]
-    db_name = os.environ["DB_NAME"]
-    connector = os.environ["DB_CONNECTOR"]
-    SQLALCHEMY_DATABASE_URL = (
-        f"{connector}://{secret['username']}:{secret['password']}@{host}/{db_name}"
-    )
-
-    engine = create_engine(
-        SQLALCHEMY_DATABASE_URL,
-    )
-    SessionLocal = sessionmaker(
-        autoflush=False,
-        bind=engine,
-    )
+    _, SessionLocal = _connect()
 
     db = SessionLocal()
     try:
@@ -89,3 +214,104 @@ def get_db() -> Generator:
         raise
     finally:
         db.close()
+
+
+def is_async_enabled() -> bool:
+    """Returns whether the routes with an async variant use the async engine.
+
+    The async mode is enabled with DB_ASYNC=true. It is meant for a long-running
+    ASGI server (e.g. uvicorn), where the sync routes are limited by the size of
+    the threadpool of FastAPI. A Lambda container serves one request at a time, so
+    the sync mode is the default.
+
+    Returns:
+        bool: True if the async mode is enabled.
+    """
+    return strtobool(os.getenv("DB_ASYNC", "false"))
+
+
+def _on_async_engine_error(context: ExceptionContext) -> None:
+    if is_access_denied(context):
+        if _secret_cache is not None:
+            _secret_cache.invalidate()
+        invalidate_async_engine()
+
+
+def _connect_async() -> tuple["AsyncEngine", "async_sessionmaker[AsyncSession]"]:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    global _async_engine, _async_session_local, _async_engine_credentials
+    secret = get_secret()
+    credentials = (secret["username"], secret["password"])
+    with _engine_lock:
+        if _async_engine is not None and _async_engine_credentials != credentials:
+            # the secret has been rotated, stop handing out the old pool
+            _async_engine.sync_engine.dispose(close=False)
+            _async_engine = None
+        if _async_engine is None or _async_session_local is None:
+            host = os.environ["DB_HOST"]
+            db_name = os.environ["DB_NAME"]
+            connector = os.getenv("DB_ASYNC_CONNECTOR", "mysql+aiomysql")
+            SQLALCHEMY_DATABASE_URL = f"{connector}://{secret['username']}:{secret['password']}@{host}/{db_name}"
+            engine = create_async_engine(
+                SQLALCHEMY_DATABASE_URL,
+                **get_pool_options(),
+            )
+            event.listen(engine.sync_engine, "handle_error", _on_async_engine_error)
+            _async_engine = engine
+            _async_engine_credentials = credentials
+            _async_session_local = async_sessionmaker(
+                autoflush=False,
+                bind=engine,
+                expire_on_commit=False,
+            )
+        return _async_engine, _async_session_local
+
+
+def get_async_engine() -> "AsyncEngine":
+    """Returns the process-wide async SQLAlchemy engine.
+
+    Same as `get_engine`, over the async driver given by DB_ASYNC_CONNECTOR
+    (mysql+aiomysql by default, mysql+asyncmy is also supported).
+
+    Returns:
+        AsyncEngine: The async SQLAlchemy engine.
+    """
+    engine, _ = _connect_async()
+    return engine
+
+
+def invalidate_async_engine() -> None:
+    """Discards the cached async engine so that the next request builds a new one.
+
+    Connections that are currently checked out are closed once they are
+    returned to the pool.
+    """
+    global _async_engine, _async_session_local
+    with _engine_lock:
+        if _async_engine is not None:
+            _async_engine.sync_engine.dispose(close=False)
+        _async_engine = None
+        _async_session_local = None
+
+
+async def get_async_db() -> AsyncGenerator["AsyncSession", None]:
+    """Returns an async database session.
+
+    Same as `get_db`, for the `async def` routes. The session does not block the
+    event loop while waiting for the database, so the number of concurrent
+    requests is not limited by the threadpool of FastAPI.
+
+    Yields:
+        AsyncGenerator[AsyncSession, None]: An async database session.
+    """
+    _, AsyncSessionLocal = _connect_async()
+
+    db = AsyncSessionLocal()
+    try:
+        yield db
+    except:
+        await db.rollback()
+        raise
+    finally:
+        await db.close()
@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy import Row, delete, insert, literal, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement
+
+from oqtopus_cloud.common.models.task import Task
+from oqtopus_cloud.common.models.task_event import TaskEvent
+
+# how long a gap in the sequence numbers is assumed to be a transaction that has not
+# committed yet, rather than one that was rolled back
+GAP_GRACE = timedelta(seconds=5)
+
+# how long the entries are kept in the log
+RETENTION = timedelta(days=1)
+# the maximum number of entries deleted by each pruning
+PRUNE_LIMIT = 1000
+
+
+def record_queued_tasks(db: Session, tasks: Iterable[Task]) -> None:
+    """Appends new tasks to the log of the task_events table.
+
+    The entries are written with the transaction of the session, so the feed sees
+    them exactly when the tasks are committed. They are stamped with the time they
+    are written rather than the time the tasks were built, see `committed_seq`.
+
+    Args:
+        db (Session): The database session.
+        tasks (Iterable[Task]): The tasks, with their id and device set.
+    """
+    now = datetime.now()
+    db.add_all(
+        [
+            TaskEvent(task_id=task.id, device=task.device, created_at=now)
+            for task in tasks
+        ]
+    )
+
+
+def record_requeued_tasks(
+    db: Session, now: datetime, *conditions: ColumnElement[bool]
+) -> None:
+    """Appends the tasks that are about to be put back to QUEUED to the log.
+
+    Args:
+        db (Session): The database session.
+        now (datetime): The current time.
+        *conditions (ColumnElement[bool]): The conditions selecting the tasks.
+    """
+    db.execute(
+        insert(TaskEvent).from_select(
+            ["task_id", "device", "created_at"],
+            select(Task.id, Task.device, literal(now, TaskEvent.created_at.type)).where(
+                *conditions
+            ),
+        )
+    )
+
+
+def committed_seq(db: Session, now: datetime) -> int:
+    """Returns a sequence number up to which the log will not change anymore.
+
+    The sequence numbers are allocated when the entries are inserted, so an entry
+    may be committed after one with a greater number. An entry is assumed to be
+    committed (or rolled back) within GAP_GRACE of being stamped, so the entries up
+    to the last one older than GAP_GRACE are final. The entries after it, those of
+    the last GAP_GRACE, are final up to the first gap in their numbers.
+
+    Both queries scan the primary key backward or forward from the last entry older
+    than GAP_GRACE, so their cost is the number of entries of the last GAP_GRACE,
+    whatever the size of the log.
+
+    Args:
+        db (Session): The database session.
+        now (datetime): The current time.
+
+    Returns:
+        int: The sequence number, or 0 if no entry is final yet.
+    """
+    stmt = (
+        select(TaskEvent.seq)
+        .filter(TaskEvent.created_at <= now - GAP_GRACE)
+        .order_by(TaskEvent.seq.desc())
+        .limit(1)
+    )
+    horizon = db.scalars(stmt).first() or 0
+    recent = db.scalars(
+        select(TaskEvent.seq).filter(TaskEvent.seq > horizon).order_by(TaskEvent.seq)
+    ).all()
+    for seq in recent:
+        if seq != horizon + 1:
+            break
+        horizon = seq
+    return horizon
+
+
+def select_events(
+    db: Session, device_id: str, cursor: int, horizon: int, limit: int
+) -> Sequence[Row[Any]]:
+    """Selects the entries of the log of a device between two sequence numbers.
+
+    The entries are read with idx_task_events_device_seq, so only the entries of the
+    device are scanned.
+
+    Args:
+        db (Session): The database session.
+        device_id (str): The device of the tasks.
+        cursor (int): The sequence number of the last entry already read.
+        horizon (int): The sequence number of the last entry to read, see
+            `committed_seq`.
+        limit (int): The maximum number of entries.
+
+    Returns:
+        Sequence[Row[Any]]: The seq, task_id and created_at of the entries, in
+            ascending order.
+    """
+    stmt = (
+        select(TaskEvent.seq, TaskEvent.task_id, TaskEvent.created_at)
+        .filter(
+            TaskEvent.device == device_id,
+            TaskEvent.seq > cursor,
+            TaskEvent.seq <= horizon,
+        )
+        .order_by(TaskEvent.seq)
+        .limit(limit)
+    )
+    return db.execute(stmt).all()
+
+
+def prune_events(db: Session, now: datetime) -> int:
+    """Deletes the entries older than RETENTION from the head of the log.
+
+    Only the first PRUNE_LIMIT entries are read, a primary key range scan, so the
+    cost of a pruning does not depend on the size of the log. They are locked with
+    SKIP LOCKED, so concurrent prunings do not wait for each other.
+
+    Args:
+        db (Session): The database session.
+        now (datetime): The current time.
+
+    Returns:
+        int: The number of deleted entries.
+    """
+    head = db.execute(
+        select(TaskEvent.seq, TaskEvent.created_at)
+        .order_by(TaskEvent.seq)
+        .limit(PRUNE_LIMIT)
+        .with_for_update(skip_locked=True)
+    ).all()
+    expired = [entry.seq for entry in head if entry.created_at < now - RETENTION]
+    if len(expired) == 0:
+        return 0
+    db.execute(delete(TaskEvent).where(TaskEvent.seq.in_(expired)))
+    return len(expired)
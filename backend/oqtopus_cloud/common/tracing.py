@@ -0,0 +1,77 @@
+import os
+from typing import Any, Callable, Optional, Union
+
+from aws_lambda_powertools import Tracer
+from aws_lambda_powertools.shared import constants
+from aws_lambda_powertools.shared.functions import resolve_truthy_env_var_choice
+
+
+def is_tracing_disabled() -> bool:
+    """Checks whether the powertools `Tracer` would be disabled.
+
+    The rules are the ones of the `Tracer`: tracing is disabled by
+    POWERTOOLS_TRACE_DISABLED, outside of Lambda, and when running in SAM CLI or
+    Chalice locally.
+
+    Returns:
+        bool: True if tracing is disabled.
+    """
+    if resolve_truthy_env_var_choice(
+        env=os.getenv(constants.TRACER_DISABLED_ENV, "false")
+    ):
+        return True
+    if not os.getenv(constants.LAMBDA_TASK_ROOT_ENV):
+        return True
+    return bool(
+        os.getenv(constants.SAM_LOCAL_ENV) or os.getenv(constants.CHALICE_LOCAL_ENV)
+    )
+
+
+class NoOpTracer:
+    """
+    Stands in for the powertools `Tracer` when tracing is disabled.
+
+    Creating a `Tracer` imports the X-Ray SDK and its patchers even when tracing is
+    disabled, which is the largest share of the import time of the entry points
+    outside of Lambda. The decorators return the decorated functions unchanged.
+    """
+
+    def capture_lambda_handler(
+        self,
+        lambda_handler: Optional[Callable] = None,
+        capture_response: Optional[bool] = None,
+        capture_error: Optional[bool] = None,
+    ) -> Callable:
+        if lambda_handler is None:
+            return lambda lambda_handler: lambda_handler
+        return lambda_handler
+
+    def capture_method(
+        self,
+        method: Optional[Callable] = None,
+        capture_response: Optional[bool] = None,
+        capture_error: Optional[bool] = None,
+    ) -> Callable:
+        if method is None:
+            return lambda method: method
+        return method
+
+    def put_annotation(self, key: str, value: Union[str, int, float, bool]) -> None:
+        pass
+
+    def put_metadata(
+        self, key: str, value: Any, namespace: Optional[str] = None
+    ) -> None:
+        pass
+
+
+def create_tracer() -> Union[Tracer, NoOpTracer]:
+    """Creates the tracer of an entry point.
+
+    Returns:
+        Union[Tracer, NoOpTracer]: A powertools `Tracer`, or a `NoOpTracer` if
+            tracing is disabled.
+    """
+    if is_tracing_disabled():
+        return NoOpTracer()
+    return Tracer()
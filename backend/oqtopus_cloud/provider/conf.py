@@ -2,8 +2,11 @@ import os
 
 from aws_lambda_powertools import Logger, Metrics, Tracer
 
+from oqtopus_cloud.common.tracing import NoOpTracer, create_tracer
+
 logger: Logger = Logger()
-tracer: Tracer = Tracer()
+# a no-op tracer when tracing is disabled, see `create_tracer`
+tracer: Tracer | NoOpTracer = create_tracer()
 metrics: Metrics = Metrics()
 
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
@@ -5,11 +5,11 @@ This module is the entry point of the development application. It creates the Fa
 
 import os
 
-import setuptools._distutils.util
 from fastapi import FastAPI
 from mangum import (
     Mangum,
 )
+from oqtopus_cloud.common.env import strtobool
 from oqtopus_cloud.provider.conf import logger, metrics, tracer
 from oqtopus_cloud.provider.middleware import CustomMiddleware
 from oqtopus_cloud.provider.routers import (
@@ -31,9 +31,7 @@ app: FastAPI = FastAPI()
 app.add_middleware(CustomMiddleware)
 
 ALLOW_ORIGINS = os.getenv("ALLOW_ORIGINS", "").split(",")
-ALLOW_CREDENTIALS = setuptools._distutils.util.strtobool(
-    os.getenv("ALLOW_CREDENTIALS", "false")
-)
+ALLOW_CREDENTIALS = strtobool(os.getenv("ALLOW_CREDENTIALS", "false"))
 ALLOW_METHODS = os.getenv("ALLOW_METHODS", "").split(",")
 ALLOW_HEADERS = os.getenv("ALLOW_HEADERS", "").split(",")
 
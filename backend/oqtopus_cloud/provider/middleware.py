@@ -1,37 +1,64 @@
 import os
+from typing import Any, Mapping
 
 from aws_lambda_powertools.utilities.data_classes import APIGatewayProxyEvent
-from fastapi import Request
-from fastapi.exceptions import HTTPException
+from fastapi.responses import JSONResponse
 from oqtopus_cloud.provider.conf import logger
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+# read once, the environment of a Lambda container does not change
+IS_LOCAL = os.getenv("ENV") == "local"
 
-class CustomMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        corr_id = request.headers.get("x-correlation-id")
-        if os.getenv("ENV") == "local":
+
+class CustomMiddleware:
+    """
+    Sets the correlation id of the logs and the API Gateway authorizer of the request.
+
+    This is a pure ASGI middleware: unlike `BaseHTTPMiddleware`, it does not run the
+    application in a separate task nor wrap the response body in a stream.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        corr_id = Headers(scope=scope).get("x-correlation-id")
+        if IS_LOCAL:
             logger.info("Running in local environment")
             corr_id = "local-correlation-id"
         if not corr_id:
-            corr_id = request.scope["aws.context"].aws_request_id
+            corr_id = scope["aws.context"].aws_request_id
 
         logger.set_correlation_id(corr_id)
 
+        authorizer: Mapping[str, Any]
         try:
-            if os.getenv("ENV") == "local":
-                request.state.apigateway_authorizer = {
+            if IS_LOCAL:
+                authorizer = {
                     "cognito:username": "admin",
                 }
             else:
-                event = APIGatewayProxyEvent(request.scope["aws.event"])
-                request.state.apigateway_authorizer = event.request_context.authorizer
+                event = APIGatewayProxyEvent(scope["aws.event"])
+                authorizer = event.request_context.authorizer
         except KeyError:
             logger.error("No AWS event found in request scope")
-            raise HTTPException(
-                status_code=500, detail="No AWS event found in request scope"
+            response = JSONResponse(
+                status_code=500,
+                content={"detail": "No AWS event found in request scope"},
             )
+            await response(scope, receive, send)
+            return
+        # read by the routers as request.state.apigateway_authorizer
+        scope.setdefault("state", {})["apigateway_authorizer"] = authorizer
+
+        async def send_with_correlation_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Correlation-Id"] = corr_id
+            await send(message)
 
-        response = await call_next(request)
-        response.headers["X-Correlation-Id"] = corr_id
-        return response
+        await self.app(scope, receive, send_with_correlation_id)
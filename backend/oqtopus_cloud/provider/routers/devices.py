@@ -4,6 +4,7 @@ from fastapi import (
     APIRouter,
     Depends,
 )
+from oqtopus_cloud.common.device_cache import device_cache
 from oqtopus_cloud.common.models.device import Device
 from oqtopus_cloud.common.session import (
     get_db,
@@ -41,6 +42,23 @@ class DeviceType(Enum):
 router: APIRouter = APIRouter(route_class=LoggerRouteHandler)
 
 
+def commit_device(device: Device, db: Session) -> None:
+    """
+    Commit the update of a device and invalidate the cached device.
+
+    The version is incremented in SQL, so that concurrent updates of the device
+    never end up with the same version and the user API rebuilds the device.
+
+    Args:
+        device (Device): The updated device.
+        db (Session): The database session.
+    """
+    device_id = device.id
+    device.version = Device.version + 1
+    db.commit()
+    device_cache.invalidate(device_id)
+
+
 def update_device_status(
     device: Device, request: DeviceStatusUpdate, db: Session
 ) -> DeviceDataUpdateResponse | ErrorResponse:
@@ -67,7 +85,7 @@ def update_device_status(
             return BadRequestResponse("restartAt is not required for status AVAILABLE")
         device.status = status  # type: ignore
         device.restart_at = None  # type: ignore
-    db.commit()
+    commit_device(device, db)
     return DeviceDataUpdateResponse(message="Device's data updated")
 
 
@@ -94,7 +112,7 @@ def update_device_pending_tasks(
     if n_pending_tasks < 0:
         return BadRequestResponse("nPendingTasks must be greater than or equal to 0")
     device.pending_tasks = n_pending_tasks
-    db.commit()
+    commit_device(device, db)
     return DeviceDataUpdateResponse(message="Device's data updated")
 
 
@@ -125,7 +143,7 @@ def update_device_calibration(
         return BadRequestResponse(detail="calibratedAt is required")
     device.calibration_data = calibration_data.model_dump_json()
     device.calibrated_at = calibrated_at
-    db.commit()
+    commit_device(device, db)
     return DeviceDataUpdateResponse(message="Device's data updated")
 
 
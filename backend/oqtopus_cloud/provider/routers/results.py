@@ -1,9 +1,17 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends
+from oqtopus_cloud.common import codec
+from oqtopus_cloud.common.estimation import EstimationError, estimate_expectation
+from oqtopus_cloud.common.histogram import HistogramFormatError, encode_histogram
 from oqtopus_cloud.common.models.result import Result as ResultModel
 from oqtopus_cloud.common.models.task import Task
+from oqtopus_cloud.common.pauli import OperatorFormatError, load_operator
+from oqtopus_cloud.common.quota import StatusChange, record_status_changes
 from oqtopus_cloud.common.session import get_db
 from oqtopus_cloud.provider.conf import logger, tracer
 from oqtopus_cloud.provider.schemas.errors import (
+    BadRequestResponse,
     ConflictErrorResponse,
     Detail,
     ErrorResponse,
@@ -11,9 +19,17 @@ from oqtopus_cloud.provider.schemas.errors import (
     NotFoundErrorResponse,
 )
 from oqtopus_cloud.provider.schemas.results import (
+    CreateResultBatchRequest,
+    CreateResultBatchResponse,
     CreateResultResponse,
+    EstimationResult,
+    Result,
+    ResultBatchItem,
+    ResultBatchItemStatus,
     ResultDef,
+    SamplingResult,
 )
+from sqlalchemy import insert, select, update
 from sqlalchemy.orm import Session
 
 from . import LoggerRouteHandler
@@ -21,10 +37,66 @@ from . import LoggerRouteHandler
 router: APIRouter = APIRouter(route_class=LoggerRouteHandler)
 
 
+def encode_result(result: Result) -> tuple[Optional[str], Optional[bytes]]:
+    """Encodes a result into the values of the result and packed_result columns.
+
+    Count histograms with bitstring keys are stored in the compact binary format,
+    other results as JSON.
+
+    Args:
+        result (Result): The result of a task.
+
+    Returns:
+        tuple[Optional[str], Optional[bytes]]: The values of result and packed_result.
+    """
+    if isinstance(result.root, SamplingResult) and result.root.root is not None:
+        try:
+            return None, encode_histogram(result.root.root)
+        except HistogramFormatError:
+            pass
+    return result.model_dump_json(), None
+
+
+def estimate_result(
+    action: str,
+    packed_operator: Optional[bytes],
+    operator: Optional[str],
+    request: ResultDef,
+) -> tuple[Result, Optional[str]]:
+    """Estimates the result of an estimation task from its basis counts, if needed.
+
+    Args:
+        action (str): The action of the task.
+        packed_operator (Optional[bytes]): The packed_operator of the task.
+        operator (Optional[str]): The operator of the task, if it is not packed.
+        request (ResultDef): The result of the task.
+
+    Raises:
+        EstimationError: If basis counts are given for a sampling task, or the
+            expectation value cannot be estimated from them.
+        OperatorFormatError: If the operator of the task is malformed.
+
+    Returns:
+        tuple[Result, Optional[str]]: The result and the value of the basis_counts column.
+    """
+    if request.basisCounts is None:
+        return request.result, None
+    if action != "estimation":
+        raise EstimationError("basisCounts is valid only for estimation tasks")
+    result = request.result
+    if request.status.root == "SUCCESS" and result.root is None:
+        expectation = estimate_expectation(
+            load_operator(packed_operator, operator), request.basisCounts
+        )
+        result = Result(EstimationResult([expectation.real, expectation.imag]))
+    return result, codec.dumps(request.basisCounts)
+
+
 @router.post(
     "/results",
     response_model=CreateResultResponse,
     responses={
+        400: {"model": Detail},
         404: {"model": Detail},
         409: {"model": Detail},
         500: {"model": Detail},
@@ -46,16 +118,126 @@ def create_result(
         task = db.get(Task, task_id)
         if task is None:
             return NotFoundErrorResponse("Task not found")
+        try:
+            estimated, basis_counts = estimate_result(
+                task.action, task.packed_operator, task.operator, request
+            )
+        except (EstimationError, OperatorFormatError) as e:
+            logger.info(f"invalid basis counts: {str(e)}")
+            return BadRequestResponse(str(e))
+        result_json, packed_result = encode_result(estimated)
         new_result = ResultModel(
             task_id=task_id,
             status=request.status.root,
-            result=request.result.model_dump_json(),
+            result=result_json,
+            packed_result=packed_result,
             reason=request.reason,
             transpiled_code=request.transpiledCode,
             qubit_allocation=qubitAllocation,
+            basis_counts=basis_counts,
         )
         db.add(new_result)
+        # the task is set to its final status by update_tasks_status_trigger, and
+        # its lease ends
+        record_status_changes(db, [StatusChange(task.owner, task.status, None)])
+        task.lease_expires_at = None
+        task.lease_token = None
         db.commit()
         return CreateResultResponse(message="success")
     except Exception as e:
         return InternalServerErrorResponse(str(e))
+
+
+@router.post(
+    "/results/batch",
+    response_model=CreateResultBatchResponse,
+    responses={
+        400: {"model": Detail},
+        500: {"model": Detail},
+    },
+)
+@tracer.capture_method
+def create_results(
+    request: CreateResultBatchRequest,
+    db: Session = Depends(get_db),
+) -> CreateResultBatchResponse | ErrorResponse:
+    logger.info("invoked create_results")
+    task_ids = [result.taskId.root.bytes for result in request.results]
+    try:
+        existing_ids = set(
+            db.scalars(
+                select(ResultModel.task_id).filter(ResultModel.task_id.in_(task_ids))
+            ).all()
+        )
+        tasks = {
+            task.id: task
+            for task in db.execute(
+                select(
+                    Task.id,
+                    Task.owner,
+                    Task.status,
+                    Task.action,
+                    Task.packed_operator,
+                    Task.operator,
+                ).filter(Task.id.in_(task_ids))
+            ).all()
+        }
+        rows = []
+        changes = []
+        items = []
+        for task_id, result in zip(task_ids, request.results):
+            task = tasks.get(task_id)
+            if task_id in existing_ids:
+                status = ResultBatchItemStatus("CONFLICT")
+            elif task is None:
+                status = ResultBatchItemStatus("NOT_FOUND")
+            else:
+                try:
+                    estimated, basis_counts = estimate_result(
+                        task.action, task.packed_operator, task.operator, result
+                    )
+                except (EstimationError, OperatorFormatError) as e:
+                    # only this result is rejected, the others are still stored
+                    logger.info(f"invalid basis counts: {str(e)}")
+                    items.append(
+                        ResultBatchItem(
+                            taskId=result.taskId,
+                            status=ResultBatchItemStatus("INVALID"),
+                            detail=str(e),
+                        )
+                    )
+                    continue
+                status = ResultBatchItemStatus("CREATED")
+                # a task id repeated in the same batch conflicts with its first occurrence
+                existing_ids.add(task_id)
+                result_json, packed_result = encode_result(estimated)
+                rows.append(
+                    {
+                        "task_id": task_id,
+                        "status": result.status.root,
+                        "result": result_json,
+                        "packed_result": packed_result,
+                        "reason": result.reason,
+                        "transpiled_code": result.transpiledCode,
+                        "qubit_allocation": None
+                        if result.qubitAllocation is None
+                        else codec.dumps(result.qubitAllocation),
+                        "basis_counts": basis_counts,
+                    }
+                )
+                changes.append(StatusChange(task.owner, task.status, None))
+            items.append(ResultBatchItem(taskId=result.taskId, status=status))
+        if len(rows) > 0:
+            db.execute(insert(ResultModel).values(rows))
+            # the tasks are set to their final status by update_tasks_status_trigger,
+            # and their leases end
+            record_status_changes(db, changes)
+            db.execute(
+                update(Task)
+                .where(Task.id.in_([row["task_id"] for row in rows]))
+                .values(lease_expires_at=None, lease_token=None)
+            )
+        db.commit()
+        return CreateResultBatchResponse(results=items)
+    except Exception as e:
+        return InternalServerErrorResponse(str(e))
@@ -1,14 +1,35 @@
 import uuid
-from ast import literal_eval
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import Any, Optional, Sequence
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
+from oqtopus_cloud.common import long_poll
+from oqtopus_cloud.common.code_store import task_code, task_code_hash
+from oqtopus_cloud.common.estimation import measurement_bases
 from oqtopus_cloud.common.models.task import Task
+from oqtopus_cloud.common.models.task_code import TaskCode
+from oqtopus_cloud.common.pauli import load_operator, operator_to_list
+from oqtopus_cloud.common.projection import (
+    FieldSpec,
+    InvalidFields,
+    build_fields,
+    load_fields,
+    parse_fields,
+    projected_response,
+)
+from oqtopus_cloud.common.quota import StatusChange, record_status_changes
+from oqtopus_cloud.common.scheduler import schedule_tasks
 from oqtopus_cloud.common.session import get_db
+from oqtopus_cloud.common.task_feed import (
+    committed_seq,
+    prune_events,
+    record_requeued_tasks,
+    select_events,
+)
 from oqtopus_cloud.provider.conf import logger, tracer
 from oqtopus_cloud.provider.schemas.errors import (
     BadRequestResponse,
+    ConflictErrorResponse,
     Detail,
     ErrorResponse,
     InternalServerErrorResponse,
@@ -16,15 +37,21 @@ from oqtopus_cloud.provider.schemas.errors import (
 )
 from oqtopus_cloud.provider.schemas.tasks import (
     Action,
+    ClaimedTaskInfo,
     EstimationAction,
+    InternalTaskStatus,
     SamplingAction,
+    TaskClaimRequest,
+    TaskCodeInfo,
+    TaskFeedEvent,
+    TaskFeedResponse,
     TaskId,
     TaskInfo,
     TaskStatusUpdate,
     TaskStatusUpdateResponse,
 )
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import Row, select, update
+from sqlalchemy.orm import Session, selectinload
 from zoneinfo import ZoneInfo
 
 from . import LoggerRouteHandler
@@ -34,27 +61,82 @@ router: APIRouter = APIRouter(route_class=LoggerRouteHandler)
 utc = ZoneInfo("UTC")
 jst = ZoneInfo("Asia/Tokyo")
 
+# the lease of a claimed task, unless another one is requested
+DEFAULT_LEASE_SECONDS = 3600
 
-def create_task_info(task: Task, status=None) -> TaskInfo:
-    if status is None:
-        status = task.status
-    return TaskInfo(
-        taskId=TaskId(task.id),
-        code=task.code,
-        device=task.device,
-        nQubits=task.n_qubits,
-        nNodes=task.n_nodes,
-        action=Action(recreate_task_action(task)),
-        qubitAllocation=task.qubit_allocation,
-        skipTranspilation=task.skip_transpilation,
-        seedTranspilation=task.seed_transpilation,
-        seedSimulation=task.seed_simulation,
-        roErrorMitigation=task.ro_error_mitigation,
-        nPerNode=task.n_per_node,
-        simulationOpt=task.simulation_opt,
-        status=status,  # type: ignore
-        createdAt=task.created_at.astimezone(jst),
-    )
+FEED_DEFAULT_MAX_RESULTS = 100
+FEED_MAX_RESULTS = 1000
+
+
+TASK_FIELDS: dict[str, FieldSpec] = {
+    "taskId": FieldSpec((Task.id,), lambda task: TaskId(task.id)),
+    "code": FieldSpec((Task.code, Task.code_hash), task_code),
+    "codeHash": FieldSpec(
+        (Task.code, Task.code_hash), lambda task: task_code_hash(task).hex()
+    ),
+    "device": FieldSpec((Task.device,), lambda task: task.device),
+    "nQubits": FieldSpec((Task.n_qubits,), lambda task: task.n_qubits),
+    "nNodes": FieldSpec((Task.n_nodes,), lambda task: task.n_nodes),
+    "action": FieldSpec(
+        (
+            Task.action,
+            Task.shots,
+            Task.method,
+            Task.packed_operator,
+            Task.operator,
+        ),
+        lambda task: Action(recreate_task_action(task)),
+    ),
+    "qubitAllocation": FieldSpec(
+        (Task.qubit_allocation,), lambda task: task.qubit_allocation
+    ),
+    "skipTranspilation": FieldSpec(
+        (Task.skip_transpilation,), lambda task: task.skip_transpilation
+    ),
+    "seedTranspilation": FieldSpec(
+        (Task.seed_transpilation,), lambda task: task.seed_transpilation
+    ),
+    "seedSimulation": FieldSpec(
+        (Task.seed_simulation,), lambda task: task.seed_simulation
+    ),
+    "roErrorMitigation": FieldSpec(
+        (Task.ro_error_mitigation,), lambda task: task.ro_error_mitigation
+    ),
+    "nPerNode": FieldSpec((Task.n_per_node,), lambda task: task.n_per_node),
+    "simulationOpt": FieldSpec(
+        (Task.simulation_opt,), lambda task: task.simulation_opt
+    ),
+    "priority": FieldSpec((Task.priority,), lambda task: task.priority),
+    "status": FieldSpec(
+        (Task.status,),
+        lambda task: InternalTaskStatus(root=task.status),
+    ),
+    "createdAt": FieldSpec(
+        (Task.created_at,), lambda task: task.created_at.astimezone(jst)
+    ),
+}
+
+
+def create_task_info(
+    task: Task,
+    status=None,
+    include_code: bool = True,
+    fields: Optional[Sequence[str]] = None,
+) -> TaskInfo:
+    values: dict[str, Any] = {}
+    if status is not None:
+        values["status"] = InternalTaskStatus(root=status)
+    if not include_code and (fields is None or "code" in fields):
+        # the code of a task submitted before code_hash is always included
+        values["code"] = task.code
+    return build_fields(TaskInfo, TASK_FIELDS, task, fields, **values)
+
+
+def create_claimed_task_info(task: Task, include_code: bool = True) -> ClaimedTaskInfo:
+    values: dict[str, Any] = {"leaseToken": uuid.UUID(bytes=task.lease_token)}
+    if not include_code:
+        values["code"] = task.code
+    return build_fields(ClaimedTaskInfo, TASK_FIELDS, task, None, **values)
 
 
 @router.get(
@@ -67,22 +149,213 @@ def get_tasks(
     status: Optional[str] = None,
     maxResults: Optional[int] = None,
     timestamp: Optional[str] = None,
+    includeCode: bool = True,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
-) -> list[TaskInfo]:
+) -> list[TaskInfo] | ErrorResponse | Response:
     logger.info("invoked get_tasks")
-    stmt = select(Task).filter(Task.device == deviceId)
-    if status is not None:
-        stmt = stmt.filter(Task.status == status)
+    try:
+        projection = parse_fields(fields, TASK_FIELDS)
+    except InvalidFields as e:
+        return BadRequestResponse(str(e))
+    options = load_fields(TASK_FIELDS, projection)
+    if includeCode and (projection is None or "code" in projection):
+        # each distinct code is fetched once for all the tasks
+        options.append(selectinload(Task.task_code))
+    conditions = []
     if timestamp is not None:
         time = datetime.fromisoformat(timestamp).astimezone(jst)
-        stmt = stmt.filter(Task.created_at > time)
-    if maxResults is not None:
-        stmt = stmt.limit(maxResults)
+        conditions.append(Task.created_at > time)
+    tasks: Sequence[Task]
+    if status == "QUEUED":
+        # the queued tasks are listed in the order they would be claimed
+        tasks = schedule_tasks(
+            db, deviceId, maxResults, conditions=conditions, options=options
+        )
+    else:
+        stmt = select(Task).filter(Task.device == deviceId, *conditions)
+        if status is not None:
+            stmt = stmt.filter(Task.status == status)
+        if maxResults is not None:
+            stmt = stmt.limit(maxResults)
+        tasks = db.scalars(stmt.options(*options)).all()
+    infos = [
+        create_task_info(task, status=None, include_code=includeCode, fields=projection)
+        for task in tasks
+    ]
+    return infos if projection is None else projected_response(infos, projection)
+
+
+def wait_task_events(
+    db: Session, device_id: str, cursor: int, max_results: int, timeout: float
+) -> tuple[list[Row[Any]], int]:
+    """Waits until tasks are queued for a device after a cursor or the timeout passes.
+
+    The events of the device are read from the cursor with idx_task_events_device_seq,
+    an index range scan that is empty while no task is queued, see `long_poll.poll`.
+    Only the events up to `committed_seq` are read, so an event committed after one
+    with a greater sequence number is not skipped.
+
+    Args:
+        db (Session): The database session.
+        device_id (str): The device of the tasks.
+        cursor (int): The sequence number of the last event already delivered.
+        max_results (int): The maximum number of events.
+        timeout (float): The maximum number of seconds to wait.
+
+    Returns:
+        tuple[list[Row[Any]], int]: The events of the device and the next cursor.
+    """
+
+    def check() -> list[Row[Any]]:
+        horizon = committed_seq(db, datetime.now())
+        events = list(select_events(db, device_id, cursor, horizon, max_results))
+        db.commit()
+        return events
+
+    events = long_poll.poll(check, lambda events: len(events) > 0, timeout)
+    return events, events[-1].seq if len(events) > 0 else cursor
+
+
+@router.get(
+    "/tasks/feed",
+    response_model=TaskFeedResponse,
+    responses={400: {"model": Detail}, 500: {"model": Detail}},
+)
+@tracer.capture_method
+def get_task_feed(
+    deviceId: str,
+    cursor: Optional[int] = None,
+    timeout: float = long_poll.DEFAULT_TIMEOUT,
+    maxResults: int = FEED_DEFAULT_MAX_RESULTS,
+    db: Session = Depends(get_db),
+) -> TaskFeedResponse | ErrorResponse:
+    logger.info("invoked get_task_feed")
+    if not 0 <= timeout <= long_poll.MAX_TIMEOUT:
+        return BadRequestResponse(
+            f"timeout must be between 0 and {long_poll.MAX_TIMEOUT:g}"
+        )
+    if not 1 <= maxResults <= FEED_MAX_RESULTS:
+        return BadRequestResponse(
+            f"maxResults must be between 1 and {FEED_MAX_RESULTS}"
+        )
+    try:
+        if cursor is None:
+            # a new subscriber starts from the end of the feed, the tasks queued
+            # before are claimed with POST /tasks/claim
+            return TaskFeedResponse(events=[], cursor=committed_seq(db, datetime.now()))
+        events, next_cursor = wait_task_events(
+            db, deviceId, cursor, maxResults, timeout
+        )
+        return TaskFeedResponse(
+            events=[
+                TaskFeedEvent(
+                    seq=event.seq,
+                    taskId=TaskId(uuid.UUID(bytes=event.task_id)),
+                    createdAt=event.created_at.astimezone(jst),
+                )
+                for event in events
+            ],
+            cursor=next_cursor,
+        )
+    except Exception as e:
+        return InternalServerErrorResponse(f"Error: {str(e)}")
+
+
+def requeue_expired_tasks(db: Session, device_id: str, now: datetime) -> int:
+    """Puts RUNNING tasks of a device whose lease has expired back to QUEUED.
+
+    The tasks are appended to the task feed again, see `get_task_feed`, and counted
+    as QUEUED again for the limits of their owners. The expired tasks are found with
+    idx_tasks_device_status_lease_expires_at and locked with SKIP LOCKED, so only
+    their rows are locked and concurrent claims do not wait for each other; a task
+    locked by another transaction is left to a later claim.
+
+    Args:
+        db (Session): The database session.
+        device_id (str): The device of the tasks.
+        now (datetime): The current time.
+
+    Returns:
+        int: The number of requeued tasks.
+    """
+    expired = db.execute(
+        select(Task.id, Task.owner)
+        .filter(
+            Task.device == device_id,
+            Task.status == "RUNNING",
+            Task.lease_expires_at < now,
+        )
+        .with_for_update(skip_locked=True)
+    ).all()
+    if len(expired) == 0:
+        return 0
+    ids = [row.id for row in expired]
+    record_requeued_tasks(db, now, Task.id.in_(ids))
+    record_status_changes(
+        db, [StatusChange(row.owner, "RUNNING", "QUEUED") for row in expired]
+    )
+    db.execute(
+        update(Task)
+        .where(Task.id.in_(ids))
+        .values(status="QUEUED", lease_expires_at=None, lease_token=None)
+    )
+    return len(expired)
+
+
+@router.post(
+    "/tasks/claim",
+    response_model=list[ClaimedTaskInfo],
+    responses={400: {"model": Detail}, 500: {"model": Detail}},
+)
+@tracer.capture_method
+def claim_tasks(
+    request: TaskClaimRequest,
+    db: Session = Depends(get_db),
+) -> list[ClaimedTaskInfo] | ErrorResponse:
+    logger.info("invoked claim_tasks")
+    max_tasks = request.maxTasks if request.maxTasks is not None else 1
+    lease_seconds = (
+        request.leaseSeconds
+        if request.leaseSeconds is not None
+        else DEFAULT_LEASE_SECONDS
+    )
+    include_code = request.includeCode is not False
+    try:
+        now = datetime.now()
+        requeued = requeue_expired_tasks(db, request.deviceId, now)
+        if requeued > 0:
+            logger.info(f"requeued {requeued} tasks with an expired lease")
+        pruned = prune_events(db, now)
+        if pruned > 0:
+            logger.info(f"deleted {pruned} events older than the retention")
+        # rows locked by a concurrent claim are skipped instead of waited for,
+        # so each queued task is handed out to exactly one worker
+        tasks = schedule_tasks(
+            db,
+            request.deviceId,
+            max_tasks,
+            claim=True,
+            options=[selectinload(Task.task_code)] if include_code else [],
+        )
+        lease_expires_at = now + timedelta(seconds=lease_seconds)
+        for task in tasks:
+            task.status = "RUNNING"
+            task.lease_expires_at = lease_expires_at
+            # a new token for each claim, so only the worker of this claim renews it
+            task.lease_token = uuid.uuid4().bytes
+        record_status_changes(
+            db, [StatusChange(task.owner, "QUEUED", "RUNNING") for task in tasks]
+        )
+        task_infos = [
+            create_claimed_task_info(task, include_code=include_code) for task in tasks
+        ]
+        db.commit()
+        return task_infos
+    except Exception as e:
+        return InternalServerErrorResponse(f"Error: {str(e)}")
 
-    tasks = db.scalars(stmt).all()
-    return [create_task_info(task, status=None) for task in tasks]
 
-  
 @router.get(
     "/tasks/{taskId}",
     response_model=TaskInfo,
@@ -91,18 +364,48 @@ def get_tasks(
 @tracer.capture_method
 def get_task(
     taskId: str,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
-) -> TaskInfo | ErrorResponse:
+) -> TaskInfo | ErrorResponse | Response:
     logger.info("invoked get_task")
     try:
         id = uuid.UUID(taskId).bytes
     except Exception:
         return BadRequestResponse("Invalid taskId")
     try:
-        task = db.get(Task, id)
+        projection = parse_fields(fields, TASK_FIELDS)
+    except InvalidFields as e:
+        return BadRequestResponse(str(e))
+    try:
+        task = db.get(Task, id, options=load_fields(TASK_FIELDS, projection))
         if task is None:
             return NotFoundErrorResponse("Task not found")
-        return create_task_info(task)
+        info = create_task_info(task, fields=projection)
+        return info if projection is None else projected_response(info, projection)
+    except Exception as e:
+        return InternalServerErrorResponse(f"Error: {str(e)}")
+
+
+@router.get(
+    "/task-codes/{codeHash}",
+    response_model=TaskCodeInfo,
+    responses={404: {"model": Detail}, 400: {"model": Detail}, 500: {"model": Detail}},
+)
+@tracer.capture_method
+def get_task_code(
+    codeHash: str,
+    db: Session = Depends(get_db),
+) -> TaskCodeInfo | ErrorResponse:
+    logger.info("invoked get_task_code")
+    try:
+        hash = bytes.fromhex(codeHash)
+    except ValueError:
+        return BadRequestResponse("Invalid codeHash")
+    try:
+        task_code = db.get(TaskCode, hash)
+        if task_code is None:
+            return NotFoundErrorResponse("Task code not found")
+        return TaskCodeInfo(codeHash=codeHash, code=task_code.code)
     except Exception as e:
         return InternalServerErrorResponse(f"Error: {str(e)}")
 
@@ -110,7 +413,12 @@ def get_task(
 @router.patch(
     "/tasks/{taskId}",
     response_model=TaskStatusUpdateResponse,
-    responses={404: {"model": Detail}, 400: {"model": Detail}, 500: {"model": Detail}},
+    responses={
+        404: {"model": Detail},
+        400: {"model": Detail},
+        409: {"model": Detail},
+        500: {"model": Detail},
+    },
 )
 @tracer.capture_method
 def update_task(
@@ -127,29 +435,78 @@ def update_task(
         task = db.scalars(select(Task).filter(Task.id == id)).first()
         if task is None:
             return NotFoundErrorResponse("Task not found")
+        if task.status not in ["QUEUED", "RUNNING"]:
+            # a finished or cancelling task is never set back to RUNNING, and
+            # is not counted again in the counters of its owner
+            return ConflictErrorResponse(
+                f"{taskId} task is not in valid status for update (valid statuses for update: 'QUEUED' and 'RUNNING')"
+            )
+        now = datetime.now()
+        leased = task.lease_token is not None or request.leaseToken is not None
+        if leased and not holds_lease(task, request.leaseToken, now):
+            # the task was requeued, and maybe claimed by another worker, so the
+            # worker must stop running it
+            return ConflictErrorResponse(
+                "the lease of the task has expired or is held by another worker"
+            )
         if request.status is not None:
-            task.status = request.status  # type: ignore
+            record_status_changes(
+                db,
+                [StatusChange(task.owner, task.status, request.status)],
+            )
+            task.status = request.status
+        if leased:
+            # the worker of a claimed task renews its lease while it runs the task
+            lease_seconds = (
+                request.leaseSeconds
+                if request.leaseSeconds is not None
+                else DEFAULT_LEASE_SECONDS
+            )
+            task.lease_expires_at = now + timedelta(seconds=lease_seconds)
         db.commit()
         return TaskStatusUpdateResponse(message="Task status updated")
     except Exception as e:
         return InternalServerErrorResponse(f"Error: {str(e)}")
 
 
+def holds_lease(task: Task, lease_token: Optional[uuid.UUID], now: datetime) -> bool:
+    """Returns whether a worker holds the unexpired lease of a claimed task.
+
+    Args:
+        task (Task): The task.
+        lease_token (Optional[uuid.UUID]): The leaseToken sent by the worker.
+        now (datetime): The current time.
+
+    Returns:
+        bool: True if the token is the one of the last claim of the task, and the
+            lease has not expired.
+    """
+    return (
+        lease_token is not None
+        and task.lease_token == lease_token.bytes
+        and task.lease_expires_at is not None
+        and task.lease_expires_at > now
+    )
+
+
 def recreate_task_action(task: Task):
     action_name = task.action
     action_shots = task.shots
     action_method = task.method
-    action_operator = task.operator
     if action_name == "sampling":
         return SamplingAction(
             name=action_name,
             nShots=action_shots,
         )
     else:
+        terms = load_operator(task.packed_operator, task.operator)
         # :TODO: remove Enum
         return EstimationAction(
-            name=action_name,  # type: ignore
+            name=action_name,
             method=action_method,  # type: ignore
             nShots=action_shots,
-            operator=literal_eval(action_operator),
+            operator=operator_to_list(terms),  # type: ignore
+            measurementBases=measurement_bases(terms)
+            if action_method == "sampling"
+            else None,
         )
@@ -43,7 +43,43 @@ class ResultDef(BaseModel):
     """
     Parameter valid only for QPU devices
     """
+    basisCounts: Annotated[
+        Optional[dict[str, dict[str, int]]],
+        Field(
+            None,
+            examples=[{"Z 0 Z 1": {"00": 510, "11": 490}, "X 0 X 1": {"00": 1000}}],
+        ),
+    ]
+    """
+    Count histograms measured in the measurementBases of the task, by basis<br>Parameter valid only for estimation tasks. If result is null, the expectation value is estimated from them
+    """
 
 
 class CreateResultResponse(BaseModel):
     message: str
+
+
+class CreateResultBatchRequest(BaseModel):
+    results: Annotated[list[ResultDef], Field(max_length=1000, min_length=1)]
+
+
+class ResultBatchItemStatus(
+    RootModel[Literal["CREATED", "CONFLICT", "NOT_FOUND", "INVALID"]]
+):
+    root: Annotated[
+        Literal["CREATED", "CONFLICT", "NOT_FOUND", "INVALID"],
+        Field(examples=["CREATED"]),
+    ]
+
+
+class ResultBatchItem(BaseModel):
+    taskId: tasks.TaskId
+    status: ResultBatchItemStatus
+    detail: Optional[str] = None
+    """
+    Why the result is invalid, if status is INVALID
+    """
+
+
+class CreateResultBatchResponse(BaseModel):
+    results: list[ResultBatchItem]
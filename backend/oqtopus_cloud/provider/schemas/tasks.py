@@ -60,6 +60,12 @@ class EstimationAction(BaseModel):
     Parameter valid only for sampling method
     """
     operator: Operator
+    measurementBases: Annotated[
+        Optional[list[str]], Field(None, examples=[["Z 0 Z 1", "X 0 Y 1"]])
+    ]
+    """
+    Bases in which to measure the qubit-wise commuting groups of the operator, as Pauli strings<br>Parameter valid only for sampling method
+    """
 
 
 class Action(RootModel[Union[SamplingAction, EstimationAction]]):
@@ -69,13 +75,28 @@ class Action(RootModel[Union[SamplingAction, EstimationAction]]):
 class TaskInfo(BaseModel):
     taskId: TaskId
     code: Annotated[
-        str,
+        Optional[str],
         Field(
             examples=[
                 "OPENQASM 3; qubit[2] q; bit[2] c; h q[0]; cnot q[0], q[1]; c = measure q;"
             ]
         ),
     ]
+    """
+    Null if the code is omitted with includeCode=false, see GET /task-codes/{codeHash}
+    """
+    codeHash: Annotated[
+        Optional[str],
+        Field(
+            None,
+            examples=[
+                "2f77668a9dfbf8d5848b9eeb4a7145ca94c6ed9236e4a773f6dcafa5132b2f91"
+            ],
+        ),
+    ]
+    """
+    SHA-256 digest of the code, in hexadecimal. Tasks with the same code have the same codeHash
+    """
     device: Annotated[str, Field(examples=["Kawasaki"])]
     nQubits: Annotated[Optional[int], Field(None, examples=[None])]
     nNodes: Annotated[Optional[int], Field(None, examples=[12])]
@@ -125,13 +146,94 @@ class TaskInfo(BaseModel):
     """
     Parameter valid only for simulator devices
     """
+    priority: Annotated[Optional[int], Field(None, examples=[0])]
+    """
+    Dispatch priority among the tasks of the owner on the device
+    """
     status: InternalTaskStatus
     createdAt: Annotated[AwareDatetime, Field(examples=["2022-10-19T11:45:34+09:00"])]
 
 
+class ClaimedTaskInfo(TaskInfo):
+    leaseToken: Annotated[
+        UUID, Field(examples=["0f8a3ad4-1c55-4c0e-9c0e-2f1a4f3a9b7e"])
+    ]
+    """
+    Token of the lease of the task, sent with PATCH /tasks/{taskId} to renew the lease
+    """
+
+
 class TaskStatusUpdate(BaseModel):
     status: Annotated[Literal["RUNNING"], Field(examples=["RUNNING"])]
+    leaseSeconds: Annotated[Optional[int], Field(None, examples=[3600], ge=1, le=86400)]
+    """
+    For a task claimed with POST /tasks/claim, the number of seconds from now after which it is requeued unless its result is registered (3600 by default)
+    """
+    leaseToken: Annotated[
+        Optional[UUID], Field(None, examples=["0f8a3ad4-1c55-4c0e-9c0e-2f1a4f3a9b7e"])
+    ]
+    """
+    For a task claimed with POST /tasks/claim, the leaseToken returned with the task. Required to renew the lease
+    """
 
 
 class TaskStatusUpdateResponse(BaseModel):
     message: str
+
+
+class TaskClaimRequest(BaseModel):
+    deviceId: Annotated[str, Field(examples=["Kawasaki"])]
+    maxTasks: Annotated[Optional[int], Field(1, examples=[10], ge=1, le=100)]
+    """
+    Maximum number of tasks to claim
+    """
+    leaseSeconds: Annotated[Optional[int], Field(3600, examples=[3600], ge=1, le=86400)]
+    """
+    Number of seconds after which a claimed task is requeued unless its result is registered
+    """
+    includeCode: Annotated[Optional[bool], Field(True, examples=[False])]
+    """
+    If false, the code of the tasks is omitted, see GET /task-codes/{codeHash}
+    """
+
+
+class TaskCodeInfo(BaseModel):
+    codeHash: Annotated[
+        str,
+        Field(
+            examples=[
+                "2f77668a9dfbf8d5848b9eeb4a7145ca94c6ed9236e4a773f6dcafa5132b2f91"
+            ]
+        ),
+    ]
+    code: Annotated[
+        str,
+        Field(
+            examples=[
+                "OPENQASM 3; qubit[2] q; bit[2] c; h q[0]; cnot q[0], q[1]; c = measure q;"
+            ]
+        ),
+    ]
+
+
+class TaskFeedEvent(BaseModel):
+    seq: Annotated[int, Field(examples=[1024])]
+    """
+    Position of the event in the feed
+    """
+    taskId: TaskId
+    createdAt: Annotated[AwareDatetime, Field(examples=["2022-10-19T11:45:34+09:00"])]
+    """
+    Time when the task was queued
+    """
+
+
+class TaskFeedResponse(BaseModel):
+    events: list[TaskFeedEvent]
+    """
+    Tasks queued for the device after the cursor, oldest first
+    """
+    cursor: Annotated[int, Field(examples=[1024])]
+    """
+    Cursor to pass to the next request
+    """
@@ -5,13 +5,14 @@ This module is the entry point of the development application. It creates the Fa
 
 import os
 
-import setuptools._distutils.util
 from fastapi import FastAPI
 from mangum import (
     Mangum,
 )
 from starlette.middleware.cors import CORSMiddleware
 
+from oqtopus_cloud.common.env import strtobool
+from oqtopus_cloud.common.session import is_async_enabled
 from oqtopus_cloud.user.conf import logger, metrics, tracer
 from oqtopus_cloud.user.middleware import CustomMiddleware
 from oqtopus_cloud.user.routers import (
@@ -29,9 +30,7 @@ app: FastAPI = FastAPI()
 app.add_middleware(CustomMiddleware)
 
 ALLOW_ORIGINS = os.getenv("ALLOW_ORIGINS", "").split(",")
-ALLOW_CREDENTIALS = setuptools._distutils.util.strtobool(
-    os.getenv("ALLOW_CREDENTIALS", "false")
-)
+ALLOW_CREDENTIALS = strtobool(os.getenv("ALLOW_CREDENTIALS", "false"))
 ALLOW_METHODS = os.getenv("ALLOW_METHODS", "").split(",")
 ALLOW_HEADERS = os.getenv("ALLOW_HEADERS", "").split(",")
 
@@ -41,8 +40,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=ALLOW_METHODS,
     allow_headers=ALLOW_HEADERS,
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+if is_async_enabled():
+    # imported only in the async mode, it requires the asyncio extension of SQLAlchemy
+    from oqtopus_cloud.user.routers import async_reads as async_read_router
+
+    # included first so that the async variants serve the hot read routes, the
+    # sync routes still document them in the OpenAPI schema
+    app.include_router(
+        async_read_router.router,
+        include_in_schema=False,
+    )
 app.include_router(
     device_router.router,
     tags=["device"],
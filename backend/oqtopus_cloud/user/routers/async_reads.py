@@ -0,0 +1,285 @@
+"""Async variants of the hot read routes
+
+These routes are included in front of the sync routers when the async mode is enabled
+(DB_ASYNC=true), so they serve the devices, the task statuses and the results without
+a thread of the threadpool of FastAPI. They are the same operations as the sync
+routes, which document them in the OpenAPI schema.
+"""
+
+import uuid
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, Header, Response
+from fastapi import Request as Event
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from oqtopus_cloud.common.device_cache import device_cache
+from oqtopus_cloud.common.etag import check_not_modified, make_etag
+from oqtopus_cloud.common.models.result import Result as ResultModel
+from oqtopus_cloud.common.models.task import Task
+from oqtopus_cloud.common.session import get_async_db
+from oqtopus_cloud.user.conf import logger, tracer
+from oqtopus_cloud.user.schemas.devices import DeviceInfo
+from oqtopus_cloud.user.schemas.errors import (
+    BadRequestResponse,
+    ErrorResponse,
+    InternalServerErrorResponse,
+    NotFoundErrorResponse,
+)
+from oqtopus_cloud.user.schemas.results import (
+    EstimationResultDef,
+    SamplingResultDef,
+)
+from oqtopus_cloud.user.schemas.tasks import (
+    GetEstimationTaskStatusResponse,
+    GetSamplingTaskStatusResponse,
+    TaskId,
+    TaskStatus,
+)
+
+from . import LoggerRouteHandler
+from .devices import model_to_schema
+from .results import (
+    MITIGATION_METHODS,
+    create_estimation_result,
+    create_sampling_result,
+    result_etag,
+    try_mitigate_sampling_result,
+)
+
+router: APIRouter = APIRouter(route_class=LoggerRouteHandler)
+
+
+@router.get("/devices", response_model=list[DeviceInfo])
+@tracer.capture_method
+async def list_devices(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    if_none_match: Annotated[Optional[str], Header()] = None,
+) -> list[DeviceInfo] | ErrorResponse | Response:
+    try:
+        logger.info("invoked list_devices")
+        entries = await device_cache.async_entries(db, model_to_schema)
+        etag = make_etag(
+            *(part for id, (version, _) in entries.items() for part in (id, version))
+        )
+        not_modified = check_not_modified(response, if_none_match, etag)
+        if not_modified is not None:
+            return not_modified
+        return [device for _, device in entries.values()]
+    except Exception as e:
+        logger.error(f"error: {str(e)}", stack_info=True)
+        return InternalServerErrorResponse(detail=str(e))
+
+
+@router.get("/devices/{deviceId}", response_model=DeviceInfo)
+@tracer.capture_method
+async def get_device(
+    deviceId: str,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    if_none_match: Annotated[Optional[str], Header()] = None,
+) -> DeviceInfo | ErrorResponse | Response:
+    try:
+        entry: Optional[tuple[int, DeviceInfo]] = (
+            await device_cache.async_entries(db, model_to_schema)
+        ).get(deviceId)
+        logger.info("invoked get_device")
+        if entry is None:
+            detail = f"deviceId={deviceId} is not found."
+            logger.info(detail)
+            return NotFoundErrorResponse(detail=detail)
+        version, device = entry
+        etag = make_etag(deviceId, version)
+        not_modified = check_not_modified(response, if_none_match, etag)
+        if not_modified is not None:
+            return not_modified
+        return device
+    except Exception as e:
+        logger.error(f"error: {str(e)}", stack_info=True)
+        return InternalServerErrorResponse(detail=str(e))
+
+
+async def select_task_status(
+    db: AsyncSession, task_id: uuid.UUID, action: str, owner: str
+) -> Optional[str]:
+    stmt = select(Task.status).filter(
+        Task.id == task_id.bytes,
+        Task.action == action,
+        Task.owner == owner,
+    )
+    return (await db.scalars(stmt)).first()
+
+
+@router.get(
+    "/tasks/sampling/{taskId}/status", response_model=GetSamplingTaskStatusResponse
+)
+@tracer.capture_method
+async def get_sampling_task_status(
+    event: Event,
+    taskId: str,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    if_none_match: Annotated[Optional[str], Header()] = None,
+) -> GetSamplingTaskStatusResponse | ErrorResponse | Response:
+    try:
+        task_id = uuid.UUID(taskId)
+    except ValueError:
+        logger.info(f"invalid task id: {taskId}")
+        return BadRequestResponse(detail="invalid task id")
+    try:
+        owner = event.state.owner
+        logger.info("invoked!", extra={"owner": owner})
+        task_status = await select_task_status(db, task_id, "sampling", owner)
+        if task_status is None:
+            return NotFoundErrorResponse(detail="task not found with the given id")
+        etag = make_etag(task_id.bytes, task_status)
+        not_modified = check_not_modified(response, if_none_match, etag)
+        if not_modified is not None:
+            return not_modified
+        return GetSamplingTaskStatusResponse(
+            taskId=TaskId(task_id),
+            status=TaskStatus(root=task_status),  # type: ignore
+        )
+    except Exception as e:
+        logger.info(f"error: {str(e)}")
+        return InternalServerErrorResponse(detail=str(e))
+
+
+@router.get(
+    "/tasks/estimation/{taskId}/status",
+    response_model=GetEstimationTaskStatusResponse,
+)
+@tracer.capture_method
+async def get_estimation_task_status(
+    event: Event,
+    taskId: str,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    if_none_match: Annotated[Optional[str], Header()] = None,
+) -> GetEstimationTaskStatusResponse | ErrorResponse | Response:
+    try:
+        task_id = uuid.UUID(taskId)
+    except ValueError:
+        logger.info(f"invalid task id: {taskId}")
+        return BadRequestResponse(detail="invalid task id")
+    try:
+        owner = event.state.owner
+        logger.info("invoked!", extra={"owner": owner})
+        task_status = await select_task_status(db, task_id, "estimation", owner)
+        if task_status is None:
+            return NotFoundErrorResponse(detail="task not found with the given id")
+        etag = make_etag(task_id.bytes, task_status)
+        not_modified = check_not_modified(response, if_none_match, etag)
+        if not_modified is not None:
+            return not_modified
+        return GetEstimationTaskStatusResponse(
+            taskId=TaskId(task_id),
+            status=TaskStatus(root=task_status),  # type: ignore
+        )
+    except Exception as e:
+        logger.info(f"error: {str(e)}")
+        return InternalServerErrorResponse(detail=str(e))
+
+
+async def select_result(
+    db: AsyncSession, task_id: uuid.UUID, action: str, owner: str
+) -> Optional[tuple[ResultModel, str, str]]:
+    stmt = (
+        select(ResultModel, Task.ro_error_mitigation, Task.device)
+        .join(Task, ResultModel.task_id == Task.id)
+        .filter(
+            Task.owner == owner,
+            ResultModel.task_id == task_id.bytes,
+            Task.action == action,
+        )
+    )
+    row = (await db.execute(stmt)).first()
+    if row is None:
+        return None
+    result, method, device_id = row
+    return result, method, device_id
+
+
+def build_sampling_result(
+    result: ResultModel, method: str, device: Optional[DeviceInfo]
+) -> SamplingResultDef:
+    return create_sampling_result(
+        result, mitigated_result=try_mitigate_sampling_result(result, method, device)
+    )
+
+
+@router.get("/results/sampling/{taskId}", response_model=SamplingResultDef)
+@tracer.capture_method
+async def get_sampling_result(
+    event: Event,
+    taskId: str,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    if_none_match: Annotated[Optional[str], Header()] = None,
+) -> SamplingResultDef | ErrorResponse | Response:
+    logger.info("invoked get_sampling_result")
+    try:
+        task_id = uuid.UUID(taskId)
+    except ValueError:
+        logger.info(f"invalid task id: {taskId}")
+        return BadRequestResponse(detail="invalid task id")
+    try:
+        owner = event.state.owner
+        logger.info("invoked!", extra={"owner": owner})
+        row = await select_result(db, task_id, "sampling", owner)
+        if row is None:
+            return NotFoundErrorResponse("result not found")
+        result, method, device_id = row
+        etag = result_etag(result)
+        device_entry = None
+        if method in MITIGATION_METHODS:
+            # the mitigated result changes with the calibration data of the device
+            entries = await device_cache.async_entries(db, model_to_schema)
+            device_entry = entries.get(device_id)
+            etag = make_etag(etag, device_entry[0] if device_entry else None)
+        not_modified = check_not_modified(response, if_none_match, etag)
+        if not_modified is not None:
+            return not_modified
+        # the histogram is decoded and mitigated in the threadpool, as it takes
+        # seconds for large results and would block the other requests
+        return await run_in_threadpool(
+            build_sampling_result,
+            result,
+            method,
+            device_entry[1] if device_entry else None,
+        )
+    except Exception as e:
+        return InternalServerErrorResponse(str(e))
+
+
+@router.get("/results/estimation/{taskId}", response_model=EstimationResultDef)
+@tracer.capture_method
+async def get_estimation_result(
+    event: Event,
+    taskId: str,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    if_none_match: Annotated[Optional[str], Header()] = None,
+) -> EstimationResultDef | ErrorResponse | Response:
+    logger.info("invoked get_estimation_result")
+    try:
+        task_id = uuid.UUID(taskId)
+    except ValueError:
+        logger.info(f"invalid task id: {taskId}")
+        return BadRequestResponse(detail="invalid task id")
+    try:
+        owner = event.state.owner
+        logger.info("invoked!", extra={"owner": owner})
+        row = await select_result(db, task_id, "estimation", owner)
+        if row is None:
+            return NotFoundErrorResponse("result not found")
+        result, _, _ = row
+        not_modified = check_not_modified(response, if_none_match, result_etag(result))
+        if not_modified is not None:
+            return not_modified
+        return create_estimation_result(result)
+    except Exception as e:
+        return InternalServerErrorResponse(str(e))
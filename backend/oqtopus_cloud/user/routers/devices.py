@@ -1,10 +1,12 @@
-import json
+from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, Header, Response
 from sqlalchemy.orm import Session
 from zoneinfo import ZoneInfo
 
+from oqtopus_cloud.common import codec
+from oqtopus_cloud.common.device_cache import device_cache
+from oqtopus_cloud.common.etag import check_not_modified, make_etag
 from oqtopus_cloud.common.model_util import model_to_schema_dict
 from oqtopus_cloud.common.models.device import Device
 from oqtopus_cloud.common.session import (
@@ -31,16 +33,26 @@ router: APIRouter = APIRouter(route_class=LoggerRouteHandler)
 
 
 @router.get(
-    "/devices", response_model=list[DeviceInfo], responses={500: {"model": Detail}}
+    "/devices",
+    response_model=list[DeviceInfo],
+    responses={304: {"description": "Not Modified"}, 500: {"model": Detail}},
 )
 @tracer.capture_method
 def list_devices(
+    response: Response,
     db: Session = Depends(get_db),
-) -> list[DeviceInfo] | ErrorResponse:
+    if_none_match: Annotated[Optional[str], Header()] = None,
+) -> list[DeviceInfo] | ErrorResponse | Response:
     try:
         logger.info("invoked list_devices")
-        devices = db.scalars(select(Device)).all()
-        return [model_to_schema(device) for device in devices]
+        entries = device_cache.entries(db, model_to_schema)
+        etag = make_etag(
+            *(part for id, (version, _) in entries.items() for part in (id, version))
+        )
+        not_modified = check_not_modified(response, if_none_match, etag)
+        if not_modified is not None:
+            return not_modified
+        return [device for _, device in entries.values()]
     except Exception as e:
         logger.error(f"error: {str(e)}", stack_info=True)
         return InternalServerErrorResponse(detail=str(e))
@@ -49,29 +61,43 @@ def list_devices(
 @router.get(
     "/devices/{deviceId}",
     response_model=DeviceInfo,
-    responses={404: {"model": Detail}, 500: {"model": Detail}},
+    responses={
+        304: {"description": "Not Modified"},
+        404: {"model": Detail},
+        500: {"model": Detail},
+    },
 )
 @tracer.capture_method
 def get_device(
     deviceId: str,
+    response: Response,
     db: Session = Depends(get_db),
-) -> DeviceInfo | ErrorResponse:
+    if_none_match: Annotated[Optional[str], Header()] = None,
+) -> DeviceInfo | ErrorResponse | Response:
     """_summary_
 
     Args:
         deviceId (str): _description_
+        response (Response): The response, whose ETag header is set.
         db (Session, optional): _description_. Defaults to Depends(get_db).
+        if_none_match (Optional[str]): The If-None-Match header. Defaults to None.
 
     Returns:
         GetDeviceResponse: _description_
     """
     # TODO implement error handling
     try:
-        device = db.scalars(select(Device).where(Device.id == deviceId)).first()
+        entry: Optional[tuple[int, DeviceInfo]] = device_cache.entries(
+            db, model_to_schema
+        ).get(deviceId)
         logger.info("invoked get_device")
-        if device:
-            response = model_to_schema(device)
-            return response
+        if entry:
+            version, device = entry
+            etag = make_etag(deviceId, version)
+            not_modified = check_not_modified(response, if_none_match, etag)
+            if not_modified is not None:
+                return not_modified
+            return device
         else:
             detail = f"deviceId={deviceId} is not found."
             logger.info(detail)
@@ -102,13 +128,13 @@ def model_to_schema(model: Device) -> DeviceInfo:
 
     # load as json if not None.
     if schema_dict["basisGates"]:
-        schema_dict["basisGates"] = json.loads(schema_dict["basisGates"])
+        schema_dict["basisGates"] = codec.loads(schema_dict["basisGates"])
     if schema_dict["supportedInstructions"]:
-        schema_dict["supportedInstructions"] = json.loads(
+        schema_dict["supportedInstructions"] = codec.loads(
             schema_dict["supportedInstructions"]
         )
     if schema_dict["calibrationData"]:
-        calibration_data_dict = json.loads(schema_dict["calibrationData"])
+        calibration_data_dict = codec.loads(schema_dict["calibrationData"])
         schema_dict["calibrationData"] = CalibrationData(**calibration_data_dict)
     if schema_dict["restartAt"]:
         schema_dict["restartAt"] = schema_dict["restartAt"].astimezone(jst)
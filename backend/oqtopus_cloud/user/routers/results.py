@@ -1,17 +1,26 @@
+import heapq
 import uuid
-from ast import literal_eval
+from itertools import batched
+from operator import itemgetter
+from typing import Annotated, Any, Iterator, Optional, cast
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Response
 from fastapi import Request as Event
+from fastapi.responses import StreamingResponse
 from pydantic import ValidationError
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 from zoneinfo import ZoneInfo
 
+from oqtopus_cloud.common import codec
+from oqtopus_cloud.common.device_cache import device_cache
+from oqtopus_cloud.common.etag import check_not_modified, make_etag
+from oqtopus_cloud.common.histogram import decode_histogram, iter_histogram
 from oqtopus_cloud.common.models.result import Result as ResultModel
 from oqtopus_cloud.common.models.task import Task
 from oqtopus_cloud.common.session import get_db
 from oqtopus_cloud.user.conf import logger, tracer
+from oqtopus_cloud.user.schemas.devices import DeviceInfo
 from oqtopus_cloud.user.schemas.errors import (
     BadRequestResponse,
     Detail,
@@ -27,58 +36,187 @@ from oqtopus_cloud.user.schemas.results import (
 from oqtopus_cloud.user.schemas.tasks import TaskId
 
 from . import LoggerRouteHandler
+from .devices import model_to_schema
 
 router: APIRouter = APIRouter(route_class=LoggerRouteHandler)
 # jst = ZoneInfo("Asia/Tokyo")
 tz = ZoneInfo("UTC")
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+MITIGATION_METHODS = ("pseudo_inverse", "least_square")
+STREAM_CHUNK_SIZE = 4096
 
-def create_sampling_result(result_model: ResultModel) -> SamplingResultDef:
-    print(result_model.task_id)
-    print(result_model.status)
-    print(result_model.result)
-    print(result_model.reason)
-    print(result_model.transpiled_code)
-    print(result_model.qubit_allocation)
+
+def load_result(result_model: ResultModel) -> Any:
+    """Decodes the stored result, either a compact count histogram or JSON.
+
+    Args:
+        result_model (ResultModel): The stored result.
+
+    Returns:
+        Any: The decoded result.
+    """
+    if result_model.packed_result is not None:
+        return decode_histogram(result_model.packed_result)
+    return codec.loads(result_model.result)
+
+
+def result_etag(result_model: ResultModel) -> str:
+    """Builds the ETag of a result from its key.
+
+    A result is written once, when its task ends, and is never updated, so its task
+    id and status identify its content without hashing the stored result.
+
+    Args:
+        result_model (ResultModel): The stored result.
+
+    Returns:
+        str: The ETag.
+    """
+    return make_etag(result_model.task_id, result_model.status)
+
+
+def create_sampling_result(
+    result_model: ResultModel,
+    include_result: bool = True,
+    mitigated_result: Optional[dict[str, float]] = None,
+) -> SamplingResultDef:
     if result_model.status == "SUCCESS":
-        result = literal_eval(result_model.result)
+        result = load_result(result_model) if include_result else None
         reason = None
     else:
         result = None
         reason = result_model.reason
     if result_model.qubit_allocation is not None:
-        qubit_allocation = literal_eval(result_model.qubit_allocation)
+        qubit_allocation = codec.loads(result_model.qubit_allocation)
     else:
         qubit_allocation = None
     return SamplingResultDef(
-        taskId=TaskId(result_model.task_id),
+        taskId=TaskId(uuid.UUID(bytes=result_model.task_id)),
         status=ResultStatus(root=result_model.status),  # type: ignore
         result=result,
+        mitigatedResult=mitigated_result,
         reason=reason,
         transpiledCode=result_model.transpiled_code,
         qubitAllocation=qubit_allocation,
     )
 
 
+def iter_sampling_result_entries(
+    result_model: ResultModel,
+    top_k: Optional[int] = None,
+    min_count: Optional[int] = None,
+) -> Iterator[tuple[str, int]]:
+    """Iterates over the count histogram of a sampling result.
+
+    Compact histograms are decoded lazily, and results stored as JSON text one
+    entry at a time, so the decoded histogram is never held in memory.
+
+    Args:
+        result_model (ResultModel): The stored result.
+        top_k (Optional[int]): If set, only the top_k entries with the largest counts are returned, in descending count order.
+        min_count (Optional[int]): If set, only the entries with at least min_count counts are returned.
+
+    Returns:
+        Iterator[tuple[str, int]]: The bitstrings and counts.
+    """
+    if result_model.status != "SUCCESS":
+        return iter(())
+    if result_model.packed_result is not None:
+        entries = iter_histogram(result_model.packed_result)
+    else:
+        entries = codec.iter_items(result_model.result)
+    if min_count is not None:
+        entries = (entry for entry in entries if entry[1] >= min_count)
+    if top_k is not None:
+        entries = iter(heapq.nlargest(top_k, entries, key=itemgetter(1)))
+    return entries
+
+
+def iter_ndjson(
+    header: SamplingResultDef, entries: Iterator[tuple[str, int]]
+) -> Iterator[bytes]:
+    yield header.model_dump_json(exclude={"result", "mitigatedResult"}).encode() + b"\n"
+    for chunk in batched(entries, STREAM_CHUNK_SIZE):
+        yield "".join(
+            [f"[{codec.dumps(key)},{count}]\n" for key, count in chunk]
+        ).encode()
+
+
+def mitigate_sampling_result(
+    result_model: ResultModel, method: str, device: Optional[DeviceInfo]
+) -> Optional[dict[str, float]]:
+    """Mitigates the readout errors of a successful sampling result.
+
+    The classical bit i of the result is assumed to be measured from the virtual
+    qubit i, which is mapped to a physical qubit by the qubit allocation of the
+    result (the identity if there is none).
+
+    Args:
+        result_model (ResultModel): The stored result.
+        method (str): The ro_error_mitigation of the task.
+        device (Optional[DeviceInfo]): The device of the task, with its calibration data.
+
+    Raises:
+        MitigationError: If the device has no readout calibration for a measured qubit.
+
+    Returns:
+        Optional[dict[str, float]]: The mitigated counts, or None if the task has no
+            mitigation or the result is not successful.
+    """
+    if method not in MITIGATION_METHODS or result_model.status != "SUCCESS":
+        return None
+    from oqtopus_cloud.common.mitigation import (
+        Method,
+        MitigationError,
+        mitigate_counts,
+        readout_matrices,
+    )
+
+    if device is None or device.calibrationData is None:
+        raise MitigationError("the device has no calibration data")
+    counts = load_result(result_model)
+    n_bits = len(next(iter(counts), ""))
+    if result_model.qubit_allocation is not None:
+        allocation = codec.loads(result_model.qubit_allocation)
+        try:
+            physical_qubits = [allocation[str(bit)] for bit in range(n_bits)]
+        except KeyError as e:
+            raise MitigationError(f"no allocated qubit for bit {e}") from e
+    else:
+        physical_qubits = list(range(n_bits))
+    matrices = readout_matrices(device.calibrationData.model_dump(), physical_qubits)
+    return mitigate_counts(counts, matrices, cast(Method, method))
+
+
+def try_mitigate_sampling_result(
+    result_model: ResultModel, method: str, device: Optional[DeviceInfo]
+) -> Optional[dict[str, float]]:
+    if method not in MITIGATION_METHODS:
+        return None
+    from oqtopus_cloud.common.mitigation import MitigationError
+
+    # the raw result is still returned if the readout errors cannot be mitigated
+    try:
+        return mitigate_sampling_result(result_model, method, device)
+    except MitigationError as e:
+        logger.warning(f"readout errors are not mitigated: {str(e)}")
+        return None
+
+
 def create_estimation_result(result_model: ResultModel) -> EstimationResultDef:
-    print(result_model.task_id)
-    print(result_model.status)
-    print(result_model.result)
-    print(result_model.reason)
-    print(result_model.transpiled_code)
-    print(result_model.qubit_allocation)
     if result_model.status == "SUCCESS":
-        result = literal_eval(result_model.result)
+        result = load_result(result_model)
         reason = None
     else:
         result = None
         reason = result_model.reason
     if result_model.qubit_allocation is not None:
-        qubit_allocation = literal_eval(result_model.qubit_allocation)
+        qubit_allocation = codec.loads(result_model.qubit_allocation)
     else:
         qubit_allocation = None
     return EstimationResultDef(
-        taskId=TaskId(result_model.task_id),
+        taskId=TaskId(uuid.UUID(bytes=result_model.task_id)),
         status=ResultStatus(root=result_model.status),  # type: ignore
         result=result,
         reason=reason,
@@ -91,6 +229,7 @@ def create_estimation_result(result_model: ResultModel) -> EstimationResultDef:
     "/results/sampling/{taskId}",
     response_model=SamplingResultDef,
     responses={
+        304: {"description": "Not Modified"},
         404: {"model": Detail},
         409: {"model": Detail},
         500: {"model": Detail},
@@ -100,8 +239,10 @@ def create_estimation_result(result_model: ResultModel) -> EstimationResultDef:
 def get_sampling_result(
     event: Event,
     taskId: str,
+    response: Response,
     db: Session = Depends(get_db),
-) -> SamplingResultDef | ErrorResponse:
+    if_none_match: Annotated[Optional[str], Header()] = None,
+) -> SamplingResultDef | ErrorResponse | Response:
     logger.info("invoked get_tasks")
     try:
         task_id = uuid.UUID(taskId).bytes
@@ -112,6 +253,72 @@ def get_sampling_result(
         owner = event.state.owner
         logger.info("invoked!", extra={"owner": owner})
 
+        stmt = (
+            select(ResultModel, Task.ro_error_mitigation, Task.device)
+            .join(Task, ResultModel.task_id == Task.id)
+            .filter(
+                Task.owner == owner,
+                ResultModel.task_id == task_id,
+                Task.action == "sampling",
+            )
+        )
+        row = db.execute(stmt).first()
+
+        if row is None:
+            return NotFoundErrorResponse("result not found")
+        result, method, device_id = row
+        etag = result_etag(result)
+        device_entry = None
+        if method in MITIGATION_METHODS:
+            # the mitigated result changes with the calibration data of the device
+            device_entry = device_cache.entries(db, model_to_schema).get(device_id)
+            etag = make_etag(etag, device_entry[0] if device_entry else None)
+        not_modified = check_not_modified(response, if_none_match, etag)
+        if not_modified is not None:
+            return not_modified
+        return create_sampling_result(
+            result,
+            mitigated_result=try_mitigate_sampling_result(
+                result, method, device_entry[1] if device_entry else None
+            ),
+        )
+    except Exception as e:
+        return InternalServerErrorResponse(str(e))
+
+
+@router.get(
+    "/results/sampling/{taskId}/stream",
+    response_class=StreamingResponse,
+    response_model=None,
+    responses={
+        200: {"content": {NDJSON_MEDIA_TYPE: {}}},
+        400: {"model": Detail},
+        404: {"model": Detail},
+        500: {"model": Detail},
+    },
+)
+@tracer.capture_method
+def get_sampling_result_stream(
+    event: Event,
+    taskId: str,
+    topK: Optional[int] = None,
+    minCount: Optional[int] = None,
+    db: Session = Depends(get_db),
+) -> StreamingResponse | ErrorResponse:
+    logger.info("invoked get_sampling_result_stream")
+    try:
+        task_id = uuid.UUID(taskId).bytes
+    except ValueError:
+        logger.info(f"invalid task id: {taskId}")
+        return BadRequestResponse(detail="invalid task id")
+    if topK is not None and topK < 1:
+        return BadRequestResponse(detail="topK must be positive")
+    if minCount is not None and minCount < 0:
+        return BadRequestResponse(detail="minCount must not be negative")
+    try:
+        owner = event.state.owner
+        logger.info("invoked!", extra={"owner": owner})
+
         stmt = (
             select(ResultModel)
             .join(Task, ResultModel.task_id == Task.id)
@@ -125,7 +332,12 @@ def get_sampling_result(
 
         if result is None:
             return NotFoundErrorResponse("result not found")
-        return create_sampling_result(result)
+        # the entries are produced after the session is closed, from the loaded row
+        header = create_sampling_result(result, include_result=False)
+        entries = iter_sampling_result_entries(result, top_k=topK, min_count=minCount)
+        return StreamingResponse(
+            iter_ndjson(header, entries), media_type=NDJSON_MEDIA_TYPE
+        )
     except Exception as e:
         return InternalServerErrorResponse(str(e))
 
@@ -134,6 +346,7 @@ def get_sampling_result(
     "/results/estimation/{taskId}",
     response_model=EstimationResultDef,
     responses={
+        304: {"description": "Not Modified"},
         404: {"model": Detail},
         409: {"model": Detail},
         500: {"model": Detail},
@@ -143,8 +356,10 @@ def get_sampling_result(
 def get_estimation_result(
     event: Event,
     taskId: str,
+    response: Response,
     db: Session = Depends(get_db),
-) -> EstimationResultDef | ErrorResponse:
+    if_none_match: Annotated[Optional[str], Header()] = None,
+) -> EstimationResultDef | ErrorResponse | Response:
     logger.info("invoked get_tasks")
     try:
         task_id = uuid.UUID(taskId).bytes
@@ -168,6 +383,9 @@ def get_estimation_result(
 
         if result is None:
             return NotFoundErrorResponse("result not found")
+        not_modified = check_not_modified(response, if_none_match, result_etag(result))
+        if not_modified is not None:
+            return not_modified
         return create_estimation_result(result)
     except Exception as e:
         return InternalServerErrorResponse(str(e))
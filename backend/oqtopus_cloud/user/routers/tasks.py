@@ -1,28 +1,73 @@
-import re
 import uuid
-from ast import literal_eval
 from datetime import datetime
-from typing import Any, Literal, Optional, Tuple
+from typing import (
+    Annotated,
+    Any,
+    Callable,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    get_args,
+)
 
 from fastapi import (
     APIRouter,
     Depends,
+    Header,
+    Response,
     status,
 )
 from fastapi import Request as Event
 from pydantic import ValidationError
-from sqlalchemy import select
+from sqlalchemy import and_, or_, select
 from sqlalchemy.orm import (
     Session,
+    selectinload,
 )
 from zoneinfo import ZoneInfo
 
+from oqtopus_cloud.common import long_poll
+from oqtopus_cloud.common.code_store import (
+    store_task_codes,
+    task_code,
+    task_code_hash,
+)
+from oqtopus_cloud.common.etag import check_not_modified, make_etag
+from oqtopus_cloud.common.histogram import histogram_length
 from oqtopus_cloud.common.models.device import Device
 from oqtopus_cloud.common.models.result import Result
 from oqtopus_cloud.common.models.task import Task
+from oqtopus_cloud.common.pagination import (
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+)
+from oqtopus_cloud.common.pauli import (
+    OperatorFormatError,
+    compile_operator,
+    encode_operator,
+    load_operator,
+    operator_to_list,
+)
+from oqtopus_cloud.common.projection import (
+    FieldSpec,
+    InvalidFields,
+    build_fields,
+    load_fields,
+    parse_fields,
+    projected_response,
+)
+from oqtopus_cloud.common.quota import (
+    QuotaExceeded,
+    StatusChange,
+    record_status_changes,
+    reserve_tasks,
+)
 from oqtopus_cloud.common.session import (
     get_db,
 )
+from oqtopus_cloud.common.task_feed import record_queued_tasks
 from oqtopus_cloud.user.conf import logger, tracer
 from oqtopus_cloud.user.schemas.errors import (
     BadRequestResponse,
@@ -30,145 +75,367 @@ from oqtopus_cloud.user.schemas.errors import (
     ErrorResponse,
     InternalServerErrorResponse,
     NotFoundErrorResponse,
+    TooManyRequestsResponse,
+)
+from oqtopus_cloud.user.schemas.results import (
+    WaitEstimationTaskResponse,
+    WaitSamplingTaskResponse,
 )
 from oqtopus_cloud.user.schemas.success import SuccessResponse
 from oqtopus_cloud.user.schemas.tasks import (
+    EstimationTaskBatchDef,
     EstimationTaskDef,
     EstimationTaskInfo,
     GetEstimationTaskStatusResponse,
     GetSamplingTaskStatusResponse,
     Operator,
+    SamplingTaskBatchDef,
     SamplingTaskDef,
     SamplingTaskInfo,
+    SubmitTaskBatchItem,
+    SubmitTaskBatchResponse,
     SubmitTaskResponse,
     TaskId,
     TaskStatus,
+    TaskStatusBatchGetRequest,
+    TaskStatusBatchGetResponse,
 )
 
 from . import LoggerRouteHandler
+from .results import create_estimation_result, create_sampling_result
 
 jst = ZoneInfo("Asia/Tokyo")
 utc = ZoneInfo("UTC")
 
 router: APIRouter = APIRouter(route_class=LoggerRouteHandler)
 
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+TERMINAL_STATUSES = ("COMPLETED", "FAILED", "CANCELLED")
+WAIT_INLINE_MAX_ENTRIES = 1024
+WAIT_INLINE_MAX_BYTES = 65536
+
 
 class BadRequest(Exception):
     def __init__(self, detail: str):
         self.detail = detail
 
 
-def create_sampling_task_info(task: Task) -> SamplingTaskInfo:
-    status = task.status
-    return SamplingTaskInfo(
-        taskId=TaskId(task.id),
-        code=task.code,
-        name=task.name,
-        device=task.device,
-        nQubits=task.n_qubits,
-        nNodes=task.n_nodes,
-        nShots=task.shots,
-        qubitAllocation=task.qubit_allocation,
-        skipTranspilation=task.skip_transpilation,
-        seedTranspilation=task.seed_transpilation,
-        seedSimulation=task.seed_simulation,
-        roErrorMitigation=task.ro_error_mitigation,
-        nPerNode=task.n_per_node,
-        simulationOpt=task.simulation_opt,
-        note=task.note,
-        status=TaskStatus(root=status),  # type: ignore
-        createdAt=task.created_at.astimezone(jst),
+SAMPLING_TASK_FIELDS: dict[str, FieldSpec] = {
+    "taskId": FieldSpec((Task.id,), lambda task: TaskId(task.id)),
+    "code": FieldSpec((Task.code, Task.code_hash), task_code),
+    "codeHash": FieldSpec(
+        (Task.code, Task.code_hash), lambda task: task_code_hash(task).hex()
+    ),
+    "name": FieldSpec((Task.name,), lambda task: task.name),
+    "device": FieldSpec((Task.device,), lambda task: task.device),
+    "nQubits": FieldSpec((Task.n_qubits,), lambda task: task.n_qubits),
+    "nNodes": FieldSpec((Task.n_nodes,), lambda task: task.n_nodes),
+    "nShots": FieldSpec((Task.shots,), lambda task: task.shots),
+    "qubitAllocation": FieldSpec(
+        (Task.qubit_allocation,), lambda task: task.qubit_allocation
+    ),
+    "skipTranspilation": FieldSpec(
+        (Task.skip_transpilation,), lambda task: task.skip_transpilation
+    ),
+    "seedTranspilation": FieldSpec(
+        (Task.seed_transpilation,), lambda task: task.seed_transpilation
+    ),
+    "seedSimulation": FieldSpec(
+        (Task.seed_simulation,), lambda task: task.seed_simulation
+    ),
+    "roErrorMitigation": FieldSpec(
+        (Task.ro_error_mitigation,), lambda task: task.ro_error_mitigation
+    ),
+    "nPerNode": FieldSpec((Task.n_per_node,), lambda task: task.n_per_node),
+    "simulationOpt": FieldSpec(
+        (Task.simulation_opt,), lambda task: task.simulation_opt
+    ),
+    "note": FieldSpec((Task.note,), lambda task: task.note),
+    "priority": FieldSpec((Task.priority,), lambda task: task.priority),
+    "status": FieldSpec(
+        (Task.status,),
+        lambda task: TaskStatus(root=task.status),
+    ),
+    "createdAt": FieldSpec(
+        (Task.created_at,), lambda task: task.created_at.astimezone(jst)
+    ),
+}
+ESTIMATION_TASK_FIELDS: dict[str, FieldSpec] = {
+    **SAMPLING_TASK_FIELDS,
+    "method": FieldSpec((Task.method,), lambda task: task.method),
+    "operator": FieldSpec(
+        (Task.packed_operator, Task.operator),
+        lambda task: Operator(
+            operator_to_list(load_operator(task.packed_operator, task.operator))  # type: ignore
+        ),
+    ),
+}
+
+
+def code_values(
+    task: Task, include_code: bool, fields: Optional[Sequence[str]]
+) -> dict[str, Any]:
+    if include_code or (fields is not None and "code" not in fields):
+        return {}
+    # the code of a task submitted before code_hash is always included
+    return {"code": task.code}
+
+
+def create_sampling_task_info(
+    task: Task, include_code: bool = True, fields: Optional[Sequence[str]] = None
+) -> SamplingTaskInfo:
+    return build_fields(
+        SamplingTaskInfo,
+        SAMPLING_TASK_FIELDS,
+        task,
+        fields,
+        **code_values(task, include_code, fields),
     )
 
 
-def serialize_operator(operator: Operator) -> str | BadRequestResponse:
-    pauli_regex = re.compile("([X|Y|Z|I]\\s+\\d+)(\\s+[X|Y|Z|I]\\s+\\d+)*\\s*$")
-    ops = literal_eval(operator.model_dump_json())
-    if not isinstance(ops, list) or len(ops) == 0:
-        return BadRequestResponse(detail=f"Malformed operator format: {str(ops)}")
-    for op in ops:
-        if not isinstance(op, list) or len(op) != 2:
-            return BadRequestResponse(f"Malformed operator format: {str(op)}")
-        pauli_str = op[0]
-        if not isinstance(pauli_str, str):
-            return BadRequestResponse(
-                f"Malformed operator format: malformed Pauli string: {str(op)}"
-            )
-        if not pauli_regex.match(pauli_str):
-            return BadRequestResponse(
-                f"Malformed operator format: malformed Pauli string: {str(op)}"
-            )
-        coef = op[1]
+def serialize_operator(operator: Operator) -> bytes | BadRequestResponse:
+    try:
+        terms = compile_operator(operator.model_dump())
+    except OperatorFormatError as e:
+        return BadRequestResponse(f"Malformed operator format: {str(e)}")
+    return encode_operator(terms)
+
+
+def create_estimation_task_info(
+    task: Task, include_code: bool = True, fields: Optional[Sequence[str]] = None
+) -> EstimationTaskInfo:
+    return build_fields(
+        EstimationTaskInfo,
+        ESTIMATION_TASK_FIELDS,
+        task,
+        fields,
+        **code_values(task, include_code, fields),
+    )
+
+
+def parse_timestamp(value: str) -> datetime:
+    """
+    Parse an ISO 8601 timestamp of a query parameter.
+
+    A timestamp without a UTC offset is in JST, like the timestamps of the tasks,
+    instead of the local time of the server.
+
+    Args:
+        value (str): The timestamp.
+
+    Returns:
+        datetime: The timestamp in JST.
+
+    Raises:
+        ValueError: If the value is not an ISO 8601 timestamp.
+    """
+    timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=jst)
+    return timestamp.astimezone(jst)
+
+
+def select_tasks_page(
+    db: Session,
+    owner: str,
+    action: Literal["sampling", "estimation"],
+    limit: int,
+    cursor: Optional[str],
+    status: Optional[str],
+    device: Optional[str],
+    since: Optional[str],
+    until: Optional[str],
+    include_code: bool = True,
+    fields: Optional[Sequence[str]] = None,
+) -> Tuple[Sequence[Task], Optional[str]] | BadRequestResponse:
+    """
+    Select one page of the owner's tasks using keyset pagination.
+
+    Tasks are ordered by (created_at, id). The cursor encodes the sort key of the
+    last task of the previous page, so every page is an index range scan no matter
+    how many tasks the owner has.
+
+    Args:
+        db (Session): The database session.
+        owner (str): The owner of the tasks.
+        action (str): The action of the tasks (sampling or estimation).
+        limit (int): The maximum number of tasks in the page.
+        cursor (Optional[str]): The cursor returned with the previous page.
+        status (Optional[str]): Only tasks with this status are returned.
+        device (Optional[str]): Only tasks submitted to this device are returned.
+        since (Optional[str]): Only tasks created at or after this ISO 8601 timestamp (see `parse_timestamp`) are returned.
+        until (Optional[str]): Only tasks created before this ISO 8601 timestamp (see `parse_timestamp`) are returned.
+        include_code (bool): Whether the code of the tasks is loaded, each distinct code once.
+        fields (Optional[Sequence[str]]): If set, only the columns of these fields (see `parse_fields`) are loaded.
+
+    Returns:
+        Tuple[Sequence[Task], Optional[str]]: The tasks and the cursor of the next page (None for the last page).
+    """
+    if limit < 1 or limit > MAX_PAGE_LIMIT:
+        return BadRequestResponse(
+            detail=f"limit must be between 1 and {MAX_PAGE_LIMIT}"
+        )
+    specs = SAMPLING_TASK_FIELDS if action == "sampling" else ESTIMATION_TASK_FIELDS
+    stmt = (
+        select(Task)
+        .filter(Task.action == action, Task.owner == owner)
+        .options(*load_fields(specs, fields, Task.created_at))
+    )
+    if include_code and (fields is None or "code" in fields):
+        stmt = stmt.options(selectinload(Task.task_code))
+    if status is not None:
+        if status not in get_args(TaskStatus.model_fields["root"].annotation):
+            return BadRequestResponse(detail=f"invalid status: {status}")
+        stmt = stmt.filter(Task.status == status)
+    if device is not None:
+        stmt = stmt.filter(Task.device == device)
+    try:
+        if since is not None:
+            stmt = stmt.filter(Task.created_at >= parse_timestamp(since))
+        if until is not None:
+            stmt = stmt.filter(Task.created_at < parse_timestamp(until))
+    except ValueError:
+        return BadRequestResponse(detail="since and until must be ISO 8601 timestamps")
+    if cursor is not None:
         try:
-            if isinstance(coef, list):
-                if len(coef) == 2:
-                    op[1] = [float(coef[0]), float(coef[1])]
-                elif len(coef) == 1:
-                    op[1] = [float(coef[0]), 0.0]
-                else:
-                    return BadRequestResponse(
-                        f"Malformed operator format: malformed coef value: {str(op)}"
-                    )
-            else:
-                op[1] = [float(coef), 0.0]
-        except (TypeError, ValueError):
-            return BadRequestResponse(
-                f"Malformed operator format: malformed coef value: {str(op)}"
+            last_created_at, last_id = decode_cursor(cursor)
+        except InvalidCursor:
+            return BadRequestResponse(detail="invalid cursor")
+        stmt = stmt.filter(
+            or_(
+                Task.created_at > last_created_at,
+                and_(Task.created_at == last_created_at, Task.id > last_id),
             )
-    return str(ops)
-
-
-def create_estimation_task_info(task: Task) -> EstimationTaskInfo:
-    status = task.status
-
-    return EstimationTaskInfo(
-        taskId=TaskId(task.id),
-        code=task.code,
-        name=task.name,
-        device=task.device,
-        nQubits=task.n_qubits,
-        nNodes=task.n_nodes,
-        method=task.method,  # type: ignore
-        nShots=task.shots,
-        operator=Operator(literal_eval(task.operator)),  # type: ignore
-        qubitAllocation=task.qubit_allocation,
-        skipTranspilation=task.skip_transpilation,
-        seedTranspilation=task.seed_transpilation,
-        seedSimulation=task.seed_simulation,
-        roErrorMitigation=task.ro_error_mitigation,
-        nPerNode=task.n_per_node,
-        simulationOpt=task.simulation_opt,
-        note=task.note,
-        status=TaskStatus(root=status),  # type: ignore
-        createdAt=task.created_at.astimezone(jst),
-    )
+        )
+    # fetch one more task to know whether there is a next page
+    stmt = stmt.order_by(Task.created_at, Task.id).limit(limit + 1)
+    tasks = db.scalars(stmt).all()
+    if len(tasks) <= limit:
+        return tasks, None
+    tasks = tasks[:limit]
+    return tasks, encode_cursor(tasks[-1].created_at, tasks[-1].id)
 
 
 @router.get(
     "/tasks/sampling",
     response_model=list[SamplingTaskInfo],
-    responses={500: {"model": Detail}},
+    responses={400: {"model": Detail}, 500: {"model": Detail}},
 )
 @tracer.capture_method
 def get_sampling_tasks(
     event: Event,
+    response: Response,
+    limit: int = DEFAULT_PAGE_LIMIT,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    device: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    includeCode: bool = True,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
-) -> list[SamplingTaskInfo] | ErrorResponse:
+) -> list[SamplingTaskInfo] | ErrorResponse | Response:
+    try:
+        projection = parse_fields(fields, SAMPLING_TASK_FIELDS)
+    except InvalidFields as e:
+        return BadRequestResponse(detail=str(e))
     try:
         owner = event.state.owner
         logger.info("invoked!", extra={"owner": owner})
-        stmt = (
-            select(Task)
-            .filter(Task.action == "sampling", Task.owner == owner)
-            .order_by(Task.created_at)
+        page = select_tasks_page(
+            db,
+            owner,
+            "sampling",
+            limit,
+            cursor,
+            status,
+            device,
+            since,
+            until,
+            include_code=includeCode,
+            fields=projection,
         )
-        tasks = db.scalars(stmt).all()
-        return [create_sampling_task_info(task) for task in tasks]
+        if isinstance(page, BadRequestResponse):
+            return page
+        tasks, next_cursor = page
+        if next_cursor is not None:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        infos = [
+            create_sampling_task_info(task, include_code=includeCode, fields=projection)
+            for task in tasks
+        ]
+        return infos if projection is None else projected_response(infos, projection)
     except Exception as e:
         logger.info(f"error: {str(e)}")
         return InternalServerErrorResponse(detail=str(e))
 
 
+def wait_task_status(
+    db: Session, task_id: bytes, action: str, owner: str, timeout: float
+) -> Optional[str]:
+    """Waits until a task reaches a terminal status or the timeout passes.
+
+    Only the status column is selected by each check, see `long_poll.poll`.
+
+    Args:
+        db (Session): The database session.
+        task_id (bytes): The binary id of the task.
+        action (str): The action of the task (sampling or estimation).
+        owner (str): The owner of the task.
+        timeout (float): The maximum number of seconds to wait.
+
+    Returns:
+        Optional[str]: The last status of the task, or None if the task is not found.
+    """
+    stmt = select(Task.status).filter(
+        Task.id == task_id,
+        Task.action == action,
+        Task.owner == owner,
+    )
+
+    def check() -> Optional[str]:
+        task_status = db.scalars(stmt).first()
+        db.commit()
+        return task_status
+
+    return long_poll.poll(
+        check,
+        lambda task_status: task_status is None or task_status in TERMINAL_STATUSES,
+        timeout,
+    )
+
+
+def is_inline_result(result: Result) -> bool:
+    """Checks whether a result is small enough to be returned by the wait routes.
+
+    Args:
+        result (Result): The stored result.
+
+    Returns:
+        bool: True if the result has at most WAIT_INLINE_MAX_ENTRIES histogram entries,
+            or at most WAIT_INLINE_MAX_BYTES bytes of JSON.
+    """
+    if result.packed_result is not None:
+        return histogram_length(result.packed_result) <= WAIT_INLINE_MAX_ENTRIES
+    return result.result is None or len(result.result) <= WAIT_INLINE_MAX_BYTES
+
+
+def validate_wait_params(taskId: str, timeout: float) -> bytes | BadRequestResponse:
+    try:
+        task_id = uuid.UUID(taskId).bytes
+    except ValueError:
+        logger.info(f"invalid task id: {taskId}")
+        return BadRequestResponse(detail="invalid task id")
+    if not 0 <= timeout <= long_poll.MAX_TIMEOUT:
+        return BadRequestResponse(
+            detail=f"timeout must be between 0 and {long_poll.MAX_TIMEOUT:g}"
+        )
+    return task_id
+
+
 def validate_name(request: SamplingTaskDef | EstimationTaskDef) -> str | None:
     if request.name is not None:
         request.name
@@ -306,11 +573,172 @@ def get_resources(
     return (n_qubits, n_nodes)
 
 
+def quota_error(e: QuotaExceeded) -> ErrorResponse:
+    """Returns the response to a submission over the limits of the user.
+
+    Args:
+        e (QuotaExceeded): The exceeded limit.
+
+    Returns:
+        ErrorResponse: 429 with a Retry-After header, or 400 if the submission
+            is never accepted.
+    """
+    logger.info(f"quota exceeded: {str(e)}")
+    if e.retry_after is None:
+        return BadRequestResponse(detail=str(e))
+    return TooManyRequestsResponse(detail=str(e), retry_after=e.retry_after)
+
+
+def submit_tasks_batch(
+    db: Session,
+    owner: str,
+    requests: Sequence[SamplingTaskDef] | Sequence[EstimationTaskDef],
+    build_task: Callable[..., Task | str],
+) -> SubmitTaskBatchResponse | ErrorResponse:
+    """Validates and inserts a batch of tasks in one transaction.
+
+    The devices of all tasks are fetched with one query. Invalid tasks are
+    reported in the response and do not prevent the valid ones from being created.
+    If the valid tasks are over the limits of the owner, none is created.
+
+    Args:
+        db (Session): The database session.
+        owner (str): The owner of the tasks.
+        requests (Sequence[SamplingTaskDef] | Sequence[EstimationTaskDef]): The tasks to submit.
+        build_task (Callable[..., Task | str]): Validates a task and creates its model,
+            or returns why it is invalid.
+
+    Returns:
+        SubmitTaskBatchResponse | ErrorResponse: The created task or the error of each
+            task, in request order, or the error of the exceeded limit.
+    """
+    device_ids = {request.device for request in requests}
+    devices = {
+        device.id: device
+        for device in db.scalars(select(Device).filter(Device.id.in_(device_ids)))
+    }
+    created_at = datetime.now()
+    tasks = []
+    items = []
+    for request in requests:
+        task = build_task(request, devices.get(request.device), owner, created_at)
+        if isinstance(task, str):
+            items.append(SubmitTaskBatchItem(createdAt=None, detail=task))
+            continue
+        tasks.append(task)
+        items.append(
+            SubmitTaskBatchItem(
+                taskId=TaskId(uuid.UUID(bytes=task.id)),
+                createdAt=created_at.astimezone(jst),
+                status=TaskStatus(root="QUEUED"),
+                detail=None,
+            )
+        )
+    if len(tasks) > 0:
+        try:
+            reserve_tasks(db, owner, len(tasks), created_at)
+        except QuotaExceeded as e:
+            return quota_error(e)
+    store_task_codes(db, tasks)
+    record_queued_tasks(db, tasks)
+    # the ids, status and timestamp are set here, so the tasks are not read back
+    db.add_all(tasks)
+    db.commit()
+    return SubmitTaskBatchResponse(results=items)
+
+
+def build_sampling_task(
+    request: SamplingTaskDef,
+    device_info: Device | None,
+    owner: str,
+    created_at: datetime,
+) -> Task | str:
+    if device_info is None:
+        return "device not found"
+    if device_info.status != "AVAILABLE":
+        return f"device {device_info.id} is not available"
+
+    # NOTE: method and operator is validated by pydantic
+    shots = request.nShots
+    # name is optional
+    name = validate_name(request)
+    code = request.code
+
+    resource = get_resources(request, device_info)
+    if isinstance(resource, BadRequestResponse):
+        return resource.detail
+    else:
+        n_qubits, n_nodes = resource
+
+    # qubit allocation is valid only for QPU devices
+    qubit_allocation = validate_qubit_allocation(request, device_info)
+    if isinstance(qubit_allocation, BadRequestResponse):
+        return qubit_allocation.detail
+
+    # skip transpilation is False by default
+    skip_transpilation = validate_skip_transpilation(request)
+    if isinstance(skip_transpilation, BadRequestResponse):
+        return skip_transpilation.detail
+
+    # seed transpilation is valid only for transpilation enabled tasks
+    seed_transpilation = validate_seed_transpilation(request)
+    if isinstance(seed_transpilation, BadRequestResponse):
+        return seed_transpilation.detail
+
+    # seed simulation is valid only for simulator devices
+    seed_simulation = validate_seed_simulation(request, device_info)
+    if isinstance(seed_simulation, BadRequestResponse):
+        return seed_simulation.detail
+
+    # ro error mitigation is valid only for QPU devices
+    ro_error_mitigation = validate_ro_error_mitigation(request, device_info)
+    if isinstance(ro_error_mitigation, BadRequestResponse):
+        return ro_error_mitigation.detail
+
+    # n per node is valid only for simulator devices
+    n_per_node = validate_n_per_node(request, device_info)
+    if isinstance(n_per_node, BadRequestResponse):
+        return n_per_node.detail
+
+    # simulation opt is valid only for simulator devices
+    simulation_opt = validate_simulation_opt(request, device_info)
+    if isinstance(simulation_opt, BadRequestResponse):
+        return simulation_opt.detail
+
+    # note is optional
+    note = validate_note(request)
+
+    return Task(
+        id=uuid.uuid4().bytes,
+        owner=owner,
+        name=name,
+        device=request.device,
+        n_nodes=n_nodes,
+        n_qubits=n_qubits,
+        code=code,
+        action="sampling",
+        method=None,  # sampling task is not using method
+        shots=shots,
+        operator=None,  # sampling task is not using operator
+        qubit_allocation=qubit_allocation,
+        skip_transpilation=skip_transpilation,
+        seed_transpilation=seed_transpilation,
+        seed_simulation=seed_simulation,
+        ro_error_mitigation=ro_error_mitigation,
+        n_per_node=n_per_node,
+        simulation_opt=simulation_opt,
+        note=note,
+        priority=request.priority if request.priority is not None else 0,
+        status="QUEUED",
+        created_at=created_at,
+    )
+
+
 @router.post(
     "/tasks/sampling",
     status_code=status.HTTP_201_CREATED,
     response_model=SubmitTaskResponse,
-    responses={400: {"model": Detail}, 500: {"model": Detail}},
+    responses={400: {"model": Detail}, 429: {"model": Detail}, 500: {"model": Detail}},
 )
 @tracer.capture_method
 def submit_sampling_tasks(
@@ -320,106 +748,58 @@ def submit_sampling_tasks(
 ) -> SubmitTaskResponse | ErrorResponse:
     try:
         device_info = db.get(Device, request.device)  # type: ignore
-        if device_info is None:
-            return BadRequestResponse(detail="device not found")
         owner = event.state.owner
         logger.info("invoked!", extra={"owner": owner})
-        if device_info.status != "AVAILABLE":
-            return BadRequestResponse(f"device {device_info.id} is not available")
-
-        # NOTE: method and operator is validated by pydantic
-        shots = request.nShots
-        # name is optional
-        name = validate_name(request)
-        code = request.code
-
-        # NOTE:omit query from user_limits table logic
-        resource = get_resources(request, device_info)
-        if isinstance(resource, BadRequestResponse):
-            return resource
-        else:
-            n_qubits, n_nodes = resource
-
-        # qubit allocation is valid only for QPU devices
-        qubit_allocation = validate_qubit_allocation(request, device_info)
-        if isinstance(qubit_allocation, BadRequestResponse):
-            return qubit_allocation
-
-        # skip transpilation is False by default
-        skip_transpilation = validate_skip_transpilation(request)
-        if isinstance(skip_transpilation, BadRequestResponse):
-            return skip_transpilation
-
-        # seed transpilation is valid only for transpilation enabled tasks
-        seed_transpilation = validate_seed_transpilation(request)
-        if isinstance(seed_transpilation, BadRequestResponse):
-            return seed_transpilation
-
-        # seed simulation is valid only for simulator devices
-        seed_simulation = validate_seed_simulation(request, device_info)
-        if isinstance(seed_simulation, BadRequestResponse):
-            return seed_simulation
-
-        # ro error mitigation is valid only for QPU devices
-        ro_error_mitigation = validate_ro_error_mitigation(request, device_info)
-        if isinstance(ro_error_mitigation, BadRequestResponse):
-            return ro_error_mitigation
-
-        # n per node is valid only for simulator devices
-        n_per_node = validate_n_per_node(request, device_info)
-        if isinstance(n_per_node, BadRequestResponse):
-            return n_per_node
-
-        # simulation opt is valid only for simulator devices
-        simulation_opt = validate_simulation_opt(request, device_info)
-        if isinstance(simulation_opt, BadRequestResponse):
-            return simulation_opt
-
-        # note is optional
-        note = validate_note(request)
-
-        task = Task(
-            id=uuid.uuid4().bytes,
-            owner=owner,
-            name=name,
-            device=request.device,
-            n_nodes=n_nodes,
-            n_qubits=n_qubits,
-            code=code,
-            action="sampling",
-            method=None,  # sampling task is not using method
-            shots=shots,
-            operator=None,  # sampling task is not using operator
-            qubit_allocation=qubit_allocation,
-            skip_transpilation=skip_transpilation,
-            seed_transpilation=seed_transpilation,
-            seed_simulation=seed_simulation,
-            ro_error_mitigation=ro_error_mitigation,
-            n_per_node=n_per_node,
-            simulation_opt=simulation_opt,
-            note=note,
-            created_at=datetime.now(),
-        )
+        now = datetime.now()
+        task = build_sampling_task(request, device_info, owner, now)
+        if isinstance(task, str):
+            return BadRequestResponse(detail=task)
+        try:
+            reserve_tasks(db, owner, 1, now)
+        except QuotaExceeded as e:
+            return quota_error(e)
 
+        store_task_codes(db, [task])
+        record_queued_tasks(db, [task])
         db.add(task)
         db.commit()
 
         task_get = db.get(Task, task.id)
         if task_get is None:
             return NotFoundErrorResponse(
-                detail=f"the created task {task.id} is not found"
+                detail=f"the created task {uuid.UUID(bytes=task.id)} is not found"
             )
 
         return SubmitTaskResponse(
-            taskId=task.id,
+            taskId=TaskId(uuid.UUID(bytes=task.id)),
             createdAt=task.created_at.astimezone(jst),
-            status=task_get.status,
+            status=TaskStatus.model_validate(task_get.status),
         )
     except Exception as e:
         logger.info(f"error: {str(e)}")
         return InternalServerErrorResponse(detail=str(e))
 
 
+@router.post(
+    "/tasks/sampling/batch",
+    response_model=SubmitTaskBatchResponse,
+    responses={400: {"model": Detail}, 429: {"model": Detail}, 500: {"model": Detail}},
+)
+@tracer.capture_method
+def submit_sampling_tasks_batch(
+    event: Event,
+    request: SamplingTaskBatchDef,
+    db: Session = Depends(get_db),
+) -> SubmitTaskBatchResponse | ErrorResponse:
+    try:
+        owner = event.state.owner
+        logger.info("invoked!", extra={"owner": owner})
+        return submit_tasks_batch(db, owner, request.tasks, build_sampling_task)
+    except Exception as e:
+        logger.info(f"error: {str(e)}")
+        return InternalServerErrorResponse(detail=str(e))
+
+
 @router.get(
     "/tasks/sampling/{taskId}",
     response_model=SamplingTaskInfo,
@@ -429,24 +809,32 @@ def submit_sampling_tasks(
 def get_sampling_task(
     event: Event,
     taskId: str,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
-) -> SamplingTaskInfo | ErrorResponse:
+) -> SamplingTaskInfo | ErrorResponse | Response:
     try:
         TaskId(root=uuid.UUID(taskId))
     except ValidationError:
         logger.info(f"invalid task id: {taskId}")
         return BadRequestResponse(detail="invalid task id")
+    try:
+        projection = parse_fields(fields, SAMPLING_TASK_FIELDS)
+    except InvalidFields as e:
+        return BadRequestResponse(detail=str(e))
     try:
         task_id = uuid.UUID(taskId).bytes
         owner = event.state.owner
         logger.info("invoked!", extra={"owner": owner})
-        stmt = select(Task).filter(
-            Task.id == task_id, Task.owner == owner, Task.action == "sampling"
+        stmt = (
+            select(Task)
+            .filter(Task.id == task_id, Task.owner == owner, Task.action == "sampling")
+            .options(*load_fields(SAMPLING_TASK_FIELDS, projection))
         )
         task = db.scalars(stmt).first()
         if task is None:
             return NotFoundErrorResponse(detail="task not found with the given id")
-        return create_sampling_task_info(task)
+        info = create_sampling_task_info(task, fields=projection)
+        return info if projection is None else projected_response(info, projection)
     except Exception as e:
         logger.info(f"error: {str(e)}")
         return InternalServerErrorResponse(detail=str(e))
@@ -489,7 +877,7 @@ def delete_sampling_task(
 
         db.delete(task)
         db.commit()
-        return
+        return None
     except Exception as e:
         logger.info(f"error: {str(e)}")
         return InternalServerErrorResponse(detail=str(e))
@@ -498,33 +886,84 @@ def delete_sampling_task(
 @router.get(
     "/tasks/sampling/{taskId}/status",
     response_model=GetSamplingTaskStatusResponse,
-    responses={400: {"model": Detail}, 404: {"model": Detail}, 500: {"model": Detail}},
+    responses={
+        304: {"description": "Not Modified"},
+        400: {"model": Detail},
+        404: {"model": Detail},
+        500: {"model": Detail},
+    },
 )
 @tracer.capture_method
 def get_sampling_task_status(
     event: Event,
     taskId: str,
+    response: Response,
     db: Session = Depends(get_db),
-) -> GetSamplingTaskStatusResponse | ErrorResponse:
+    if_none_match: Annotated[Optional[str], Header()] = None,
+) -> GetSamplingTaskStatusResponse | ErrorResponse | Response:
     try:
-        TaskId(root=uuid.UUID(taskId))
-    except ValidationError:
+        task_id = uuid.UUID(taskId)
+    except ValueError:
         logger.info(f"invalid task id: {taskId}")
         return BadRequestResponse(detail="invalid task id")
     owner = event.state.owner
     logger.info("invoked!", extra={"owner": owner})
-    stmt = select(Task).filter(
-        Task.id == uuid.UUID(taskId).bytes,
-        Task.action == "sampling",
-        Task.owner == owner,
-    )
-    task = db.scalars(stmt).first()
-    if task is None:
-        return NotFoundErrorResponse(detail="task not found with the given id")
-    return GetSamplingTaskStatusResponse(
-        taskId=TaskId(uuid.UUID(taskId)),
-        status=TaskStatus(root=task.status),  # type: ignore
-    )
+    try:
+        stmt = select(Task.status).filter(
+            Task.id == task_id.bytes,
+            Task.action == "sampling",
+            Task.owner == owner,
+        )
+        task_status = db.scalars(stmt).first()
+        if task_status is None:
+            return NotFoundErrorResponse(detail="task not found with the given id")
+        etag = make_etag(task_id.bytes, task_status)
+        not_modified = check_not_modified(response, if_none_match, etag)
+        if not_modified is not None:
+            return not_modified
+        return GetSamplingTaskStatusResponse(
+            taskId=TaskId(task_id),
+            status=TaskStatus.model_validate(task_status),
+        )
+    except Exception as e:
+        logger.info(f"error: {str(e)}")
+        return InternalServerErrorResponse(detail=str(e))
+
+
+@router.get(
+    "/tasks/sampling/{taskId}/wait",
+    response_model=WaitSamplingTaskResponse,
+    responses={400: {"model": Detail}, 404: {"model": Detail}, 500: {"model": Detail}},
+)
+@tracer.capture_method
+def wait_sampling_task(
+    event: Event,
+    taskId: str,
+    timeout: float = long_poll.DEFAULT_TIMEOUT,
+    db: Session = Depends(get_db),
+) -> WaitSamplingTaskResponse | ErrorResponse:
+    task_id = validate_wait_params(taskId, timeout)
+    if isinstance(task_id, BadRequestResponse):
+        return task_id
+    owner = event.state.owner
+    logger.info("invoked!", extra={"owner": owner})
+    try:
+        task_status = wait_task_status(db, task_id, "sampling", owner, timeout)
+        if task_status is None:
+            return NotFoundErrorResponse(detail="task not found with the given id")
+        result = None
+        if task_status in TERMINAL_STATUSES:
+            result_model = db.get(Result, task_id)
+            if result_model is not None and is_inline_result(result_model):
+                result = create_sampling_result(result_model)
+        return WaitSamplingTaskResponse(
+            taskId=TaskId(uuid.UUID(taskId)),
+            status=TaskStatus(root=task_status),  # type: ignore
+            result=result,
+        )
+    except Exception as e:
+        logger.info(f"error: {str(e)}")
+        return InternalServerErrorResponse(detail=str(e))
 
 
 @router.post(
@@ -566,6 +1005,7 @@ def cancel_sampling_task(
                 task_id=task_id, status="CANCELLED", reason="user cancelled"
             )
             db.add(result)
+            record_status_changes(db, [StatusChange(owner, "QUEUED", None)])
             db.commit()
         elif task.status in ["RUNNING"]:
             logger.info("task is in RUNNING state, so it will be marked as CANCELLING")
@@ -580,33 +1020,169 @@ def cancel_sampling_task(
 @router.get(
     "/tasks/estimation",
     response_model=list[EstimationTaskInfo],
-    responses={500: {"model": Detail}},
+    responses={400: {"model": Detail}, 500: {"model": Detail}},
 )
 @tracer.capture_method
 def get_estimation_tasks(
     event: Event,
+    response: Response,
+    limit: int = DEFAULT_PAGE_LIMIT,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    device: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    includeCode: bool = True,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
-) -> list[EstimationTaskInfo] | ErrorResponse:
+) -> list[EstimationTaskInfo] | ErrorResponse | Response:
+    try:
+        projection = parse_fields(fields, ESTIMATION_TASK_FIELDS)
+    except InvalidFields as e:
+        return BadRequestResponse(detail=str(e))
     try:
         owner = event.state.owner
         logger.info("invoked!", extra={"owner": owner})
-        stmt = (
-            select(Task)
-            .filter(Task.action == "estimation", Task.owner == owner)
-            .order_by(Task.created_at)
+        page = select_tasks_page(
+            db,
+            owner,
+            "estimation",
+            limit,
+            cursor,
+            status,
+            device,
+            since,
+            until,
+            include_code=includeCode,
+            fields=projection,
         )
-        tasks = db.scalars(stmt).all()
-        return [create_estimation_task_info(task) for task in tasks]
+        if isinstance(page, BadRequestResponse):
+            return page
+        tasks, next_cursor = page
+        if next_cursor is not None:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        infos = [
+            create_estimation_task_info(
+                task, include_code=includeCode, fields=projection
+            )
+            for task in tasks
+        ]
+        return infos if projection is None else projected_response(infos, projection)
     except Exception as e:
         logger.info(f"error: {str(e)}")
         return InternalServerErrorResponse(detail=str(e))
 
 
+def build_estimation_task(
+    request: EstimationTaskDef,
+    device_info: Device | None,
+    owner: str,
+    created_at: datetime,
+) -> Task | str:
+    if device_info is None:
+        return "device not found"
+    if device_info.status != "AVAILABLE":
+        return f"device {device_info.id} is not available"
+
+    # NOTE: method and operator is needed for estimation task
+    method = request.method
+
+    if method not in ["state_vector", "sampling"]:
+        return "method should be either 'state_vector' or 'sampling'"
+    if request.method == "state_vector":
+        if device_info.device_type != "simulator":
+            return "state_vector method is valid only for simulator devices"
+        if request.nShots is not None:
+            return "nShots is not valid for state_vector method"
+        shots = None
+    else:  # sampling
+        if request.nShots is None:
+            return "nShots is mandatory for sampling method"
+        shots = request.nShots
+
+    # operator is mandatory for estimation task
+    operator = serialize_operator(request.operator)
+    if isinstance(operator, BadRequestResponse):
+        return operator.detail
+    # name is optional
+    name = validate_name(request)
+    code = request.code
+
+    resource = get_resources(request, device_info)
+    if isinstance(resource, BadRequestResponse):
+        return resource.detail
+    else:
+        n_qubits, n_nodes = resource
+
+    # qubit allocation is valid only for QPU devices
+    qubit_allocation = validate_qubit_allocation(request, device_info)
+    if isinstance(qubit_allocation, BadRequestResponse):
+        return qubit_allocation.detail
+
+    # skip transpilation is False by default
+    skip_transpilation = validate_skip_transpilation(request)
+    if isinstance(skip_transpilation, BadRequestResponse):
+        return skip_transpilation.detail
+
+    # seed transpilation is valid only for transpilation enabled tasks
+    seed_transpilation = validate_seed_transpilation(request)
+    if isinstance(seed_transpilation, BadRequestResponse):
+        return seed_transpilation.detail
+
+    # seed simulation is valid only for simulator devices
+    seed_simulation = validate_seed_simulation(request, device_info)
+    if isinstance(seed_simulation, BadRequestResponse):
+        return seed_simulation.detail
+
+    # ro error mitigation is valid only for QPU devices
+    ro_error_mitigation = validate_ro_error_mitigation(request, device_info)
+    if isinstance(ro_error_mitigation, BadRequestResponse):
+        return ro_error_mitigation.detail
+
+    # n per node is valid only for simulator devices
+    n_per_node = validate_n_per_node(request, device_info)
+    if isinstance(n_per_node, BadRequestResponse):
+        return n_per_node.detail
+
+    # simulation opt is valid only for simulator devices
+    simulation_opt = validate_simulation_opt(request, device_info)
+    if isinstance(simulation_opt, BadRequestResponse):
+        return simulation_opt.detail
+
+    # note is optional
+    note = validate_note(request)
+
+    return Task(
+        id=uuid.uuid4().bytes,
+        owner=owner,
+        name=name,
+        device=request.device,
+        n_nodes=n_nodes,
+        n_qubits=n_qubits,
+        code=code,
+        action="estimation",
+        method=method,  # estimation task is using method
+        shots=shots,
+        packed_operator=operator,  # estimation task is using operator
+        qubit_allocation=qubit_allocation,
+        skip_transpilation=skip_transpilation,
+        seed_transpilation=seed_transpilation,
+        seed_simulation=seed_simulation,
+        ro_error_mitigation=ro_error_mitigation,
+        n_per_node=n_per_node,
+        simulation_opt=simulation_opt,
+        note=note,
+        priority=request.priority if request.priority is not None else 0,
+        status="QUEUED",
+        created_at=created_at,
+    )
+
+
 @router.post(
     "/tasks/estimation",
     status_code=status.HTTP_201_CREATED,
     response_model=SubmitTaskResponse,
-    responses={400: {"model": Detail}, 500: {"model": Detail}},
+    responses={400: {"model": Detail}, 429: {"model": Detail}, 500: {"model": Detail}},
 )
 @tracer.capture_method
 def submit_estimation_tasks(
@@ -616,134 +1192,59 @@ def submit_estimation_tasks(
 ) -> SubmitTaskResponse | ErrorResponse:
     try:
         device_info = db.get(Device, request.device)  # type: ignore
-        if device_info is None:
-            return BadRequestResponse(detail="device not found")
         owner = event.state.owner
 
         logger.info("invoked!", extra={"owner": owner})
 
-        if device_info.status != "AVAILABLE":
-            return BadRequestResponse(f"device {device_info.id} is not available")
-
-        # NOTE: method and operator is needed for estimation task
-        method = request.method
-
-        if method not in ["state_vector", "sampling"]:
-            return BadRequestResponse(
-                detail="method should be either 'state_vector' or 'sampling'"
-            )
-        if request.method == "state_vector":
-            if device_info.device_type != "simulator":
-                return BadRequestResponse(
-                    detail="state_vector method is valid only for simulator devices"
-                )
-            if request.nShots is not None:
-                return BadRequestResponse(
-                    detail="nShots is not valid for state_vector method"
-                )
-            shots = None
-        else:  # sampling
-            if request.nShots is None:
-                return BadRequestResponse(
-                    detail="nShots is mandatory for sampling method"
-                )
-            shots = request.nShots
-
-        # operator is mandatory for estimation task
-        operator = serialize_operator(request.operator)
-        if isinstance(operator, BadRequestResponse):
-            return operator
-        # name is optional
-        name = validate_name(request)
-        code = request.code
-
-        # NOTE:omit query from user_limits table logic
-
-        resource = get_resources(request, device_info)
-        if isinstance(resource, BadRequestResponse):
-            return resource
-        else:
-            n_qubits, n_nodes = resource
-
-        # qubit allocation is valid only for QPU devices
-        qubit_allocation = validate_qubit_allocation(request, device_info)
-        if isinstance(qubit_allocation, BadRequestResponse):
-            return qubit_allocation
-
-        # skip transpilation is False by default
-        skip_transpilation = validate_skip_transpilation(request)
-        if isinstance(skip_transpilation, BadRequestResponse):
-            return skip_transpilation
-
-        # seed transpilation is valid only for transpilation enabled tasks
-        seed_transpilation = validate_seed_transpilation(request)
-        if isinstance(seed_transpilation, BadRequestResponse):
-            return seed_transpilation
-
-        # seed simulation is valid only for simulator devices
-        seed_simulation = validate_seed_simulation(request, device_info)
-        if isinstance(seed_simulation, BadRequestResponse):
-            return seed_simulation
-
-        # ro error mitigation is valid only for QPU devices
-        ro_error_mitigation = validate_ro_error_mitigation(request, device_info)
-        if isinstance(ro_error_mitigation, BadRequestResponse):
-            return ro_error_mitigation
-
-        # n per node is valid only for simulator devices
-        n_per_node = validate_n_per_node(request, device_info)
-        if isinstance(n_per_node, BadRequestResponse):
-            return n_per_node
-
-        # simulation opt is valid only for simulator devices
-        simulation_opt = validate_simulation_opt(request, device_info)
-        if isinstance(simulation_opt, BadRequestResponse):
-            return simulation_opt
-
-        # note is optional
-        note = validate_note(request)
-
-        task = Task(
-            id=uuid.uuid4().bytes,
-            owner=owner,
-            name=name,
-            device=request.device,
-            n_nodes=n_nodes,
-            n_qubits=n_qubits,
-            code=code,
-            action="estimation",
-            method=method,  # estimation task is using method
-            shots=shots,
-            operator=operator,  # estimation task is using operator
-            qubit_allocation=qubit_allocation,
-            skip_transpilation=skip_transpilation,
-            seed_transpilation=seed_transpilation,
-            seed_simulation=seed_simulation,
-            ro_error_mitigation=ro_error_mitigation,
-            n_per_node=n_per_node,
-            simulation_opt=simulation_opt,
-            note=note,
-            created_at=datetime.now(),
-        )
+        now = datetime.now()
+        task = build_estimation_task(request, device_info, owner, now)
+        if isinstance(task, str):
+            return BadRequestResponse(detail=task)
+        try:
+            reserve_tasks(db, owner, 1, now)
+        except QuotaExceeded as e:
+            return quota_error(e)
+        store_task_codes(db, [task])
+        record_queued_tasks(db, [task])
         db.add(task)
         db.commit()
 
         task_get = db.get(Task, task.id)
         if task_get is None:
             return NotFoundErrorResponse(
-                detail=f"the created task {task.id} is not found"
+                detail=f"the created task {uuid.UUID(bytes=task.id)} is not found"
             )
 
         return SubmitTaskResponse(
-            taskId=task.id,
+            taskId=TaskId(uuid.UUID(bytes=task.id)),
             createdAt=task.created_at.astimezone(jst),
-            status=task_get.status,
+            status=TaskStatus.model_validate(task_get.status),
         )
     except Exception as e:
         logger.info(f"error: {str(e)}")
         return InternalServerErrorResponse(detail=str(e))
 
 
+@router.post(
+    "/tasks/estimation/batch",
+    response_model=SubmitTaskBatchResponse,
+    responses={400: {"model": Detail}, 429: {"model": Detail}, 500: {"model": Detail}},
+)
+@tracer.capture_method
+def submit_estimation_tasks_batch(
+    event: Event,
+    request: EstimationTaskBatchDef,
+    db: Session = Depends(get_db),
+) -> SubmitTaskBatchResponse | ErrorResponse:
+    try:
+        owner = event.state.owner
+        logger.info("invoked!", extra={"owner": owner})
+        return submit_tasks_batch(db, owner, request.tasks, build_estimation_task)
+    except Exception as e:
+        logger.info(f"error: {str(e)}")
+        return InternalServerErrorResponse(detail=str(e))
+
+
 @router.get(
     "/tasks/estimation/{taskId}",
     response_model=EstimationTaskInfo,
@@ -753,24 +1254,34 @@ def submit_estimation_tasks(
 def get_estimation_task(
     event: Event,
     taskId: str,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
-) -> EstimationTaskInfo | ErrorResponse:
+) -> EstimationTaskInfo | ErrorResponse | Response:
     try:
         TaskId(root=uuid.UUID(taskId))
     except ValidationError:
         logger.info(f"invalid task id: {taskId}")
         return BadRequestResponse(detail="invalid task id")
+    try:
+        projection = parse_fields(fields, ESTIMATION_TASK_FIELDS)
+    except InvalidFields as e:
+        return BadRequestResponse(detail=str(e))
     try:
         task_id = uuid.UUID(taskId).bytes
         owner = event.state.owner
         logger.info("invoked!", extra={"owner": owner})
-        stmt = select(Task).filter(
-            Task.id == task_id, Task.owner == owner, Task.action == "estimation"
+        stmt = (
+            select(Task)
+            .filter(
+                Task.id == task_id, Task.owner == owner, Task.action == "estimation"
+            )
+            .options(*load_fields(ESTIMATION_TASK_FIELDS, projection))
         )
         task = db.scalars(stmt).first()
         if task is None:
             return NotFoundErrorResponse(detail="task not found with the given id")
-        return create_estimation_task_info(task)
+        info = create_estimation_task_info(task, fields=projection)
+        return info if projection is None else projected_response(info, projection)
     except Exception as e:
         logger.info(f"error: {str(e)}")
         return InternalServerErrorResponse(detail=str(e))
@@ -813,7 +1324,7 @@ def delete_estimation_task(
 
         db.delete(task)
         db.commit()
-        return
+        return None
     except Exception as e:
         logger.info(f"error: {str(e)}")
         return InternalServerErrorResponse(detail=str(e))
@@ -822,33 +1333,112 @@ def delete_estimation_task(
 @router.get(
     "/tasks/estimation/{taskId}/status",
     response_model=GetEstimationTaskStatusResponse,
-    responses={400: {"model": Detail}, 404: {"model": Detail}, 500: {"model": Detail}},
+    responses={
+        304: {"description": "Not Modified"},
+        400: {"model": Detail},
+        404: {"model": Detail},
+        500: {"model": Detail},
+    },
 )
 @tracer.capture_method
 def get_estimation_task_status(
     event: Event,
     taskId: str,
+    response: Response,
     db: Session = Depends(get_db),
-) -> GetEstimationTaskStatusResponse | ErrorResponse:
+    if_none_match: Annotated[Optional[str], Header()] = None,
+) -> GetEstimationTaskStatusResponse | ErrorResponse | Response:
     try:
-        TaskId(root=uuid.UUID(taskId))
-    except ValidationError:
+        task_id = uuid.UUID(taskId)
+    except ValueError:
         logger.info(f"invalid task id: {taskId}")
         return BadRequestResponse(detail="invalid task id")
     owner = event.state.owner
     logger.info("invoked!", extra={"owner": owner})
-    stmt = select(Task).filter(
-        Task.id == uuid.UUID(taskId).bytes,
-        Task.action == "estimation",
-        Task.owner == owner,
-    )
-    task = db.scalars(stmt).first()
-    if task is None:
-        return NotFoundErrorResponse(detail="task not found with the given id")
-    return GetEstimationTaskStatusResponse(
-        taskId=TaskId(uuid.UUID(taskId)),
-        status=TaskStatus(root=task.status),  # type: ignore
-    )
+    try:
+        stmt = select(Task.status).filter(
+            Task.id == task_id.bytes,
+            Task.action == "estimation",
+            Task.owner == owner,
+        )
+        task_status = db.scalars(stmt).first()
+        if task_status is None:
+            return NotFoundErrorResponse(detail="task not found with the given id")
+        etag = make_etag(task_id.bytes, task_status)
+        not_modified = check_not_modified(response, if_none_match, etag)
+        if not_modified is not None:
+            return not_modified
+        return GetEstimationTaskStatusResponse(
+            taskId=TaskId(task_id),
+            status=TaskStatus.model_validate(task_status),
+        )
+    except Exception as e:
+        logger.info(f"error: {str(e)}")
+        return InternalServerErrorResponse(detail=str(e))
+
+
+@router.get(
+    "/tasks/estimation/{taskId}/wait",
+    response_model=WaitEstimationTaskResponse,
+    responses={400: {"model": Detail}, 404: {"model": Detail}, 500: {"model": Detail}},
+)
+@tracer.capture_method
+def wait_estimation_task(
+    event: Event,
+    taskId: str,
+    timeout: float = long_poll.DEFAULT_TIMEOUT,
+    db: Session = Depends(get_db),
+) -> WaitEstimationTaskResponse | ErrorResponse:
+    task_id = validate_wait_params(taskId, timeout)
+    if isinstance(task_id, BadRequestResponse):
+        return task_id
+    owner = event.state.owner
+    logger.info("invoked!", extra={"owner": owner})
+    try:
+        task_status = wait_task_status(db, task_id, "estimation", owner, timeout)
+        if task_status is None:
+            return NotFoundErrorResponse(detail="task not found with the given id")
+        result = None
+        if task_status in TERMINAL_STATUSES:
+            result_model = db.get(Result, task_id)
+            if result_model is not None and is_inline_result(result_model):
+                result = create_estimation_result(result_model)
+        return WaitEstimationTaskResponse(
+            taskId=TaskId(uuid.UUID(taskId)),
+            status=TaskStatus(root=task_status),  # type: ignore
+            result=result,
+        )
+    except Exception as e:
+        logger.info(f"error: {str(e)}")
+        return InternalServerErrorResponse(detail=str(e))
+
+
+@router.post(
+    "/tasks/status:batchGet",
+    response_model=TaskStatusBatchGetResponse,
+    responses={500: {"model": Detail}},
+)
+@tracer.capture_method
+def batch_get_task_status(
+    event: Event,
+    request: TaskStatusBatchGetRequest,
+    db: Session = Depends(get_db),
+) -> TaskStatusBatchGetResponse | ErrorResponse:
+    try:
+        owner = event.state.owner
+        logger.info("invoked!", extra={"owner": owner})
+        stmt = select(Task.id, Task.status).where(
+            Task.id.in_([task_id.root.bytes for task_id in request.taskIds]),
+            Task.owner == owner,
+        )
+        statuses = {
+            str(uuid.UUID(bytes=task_id)): TaskStatus(root=task_status)
+            for task_id, task_status in db.execute(stmt)
+        }
+        return TaskStatusBatchGetResponse(statuses=statuses)
+    except Exception as e:
+        logger.info(f"error: {str(e)}")
+        return InternalServerErrorResponse(detail=str(e))
 
 
 @router.post(
@@ -890,6 +1480,7 @@ def cancel_estimation_task(
                 task_id=task_id, status="CANCELLED", reason="user cancelled"
             )
             db.add(result)
+            record_status_changes(db, [StatusChange(owner, "QUEUED", None)])
             db.commit()
         elif task.status in ["RUNNING"]:
             logger.info("task is in RUNNING state, so it will be marked as CANCELLING")
@@ -36,6 +36,7 @@ class BadRequestResponse(ErrorResponse):
     Attributes:
         status_code (int): The HTTP status code for the response.
         content (dict): The content of the response.
+        detail (str): The detailed error message.
 
     """
 
@@ -47,6 +48,7 @@ class BadRequestResponse(ErrorResponse):
             status_code=400,
             content={"detail": detail},
         )
+        self.detail = detail
 
 
 class InternalServerErrorResponse(ErrorResponse):
@@ -116,3 +118,30 @@ class ConflictErrorResponse(ErrorResponse):
             status_code=409,
             content={"detail": detail},
         )
+
+
+class TooManyRequestsResponse(ErrorResponse):
+    """
+    Represents an error response for a request over the limits of the user (HTTP status code 429).
+
+    Args:
+        detail (str): The detailed error message.
+        retry_after (int): The number of seconds after which the request may be accepted.
+
+    Attributes:
+        status_code (int): The HTTP status code for the error response (429).
+        content (dict): The content of the error response, containing the detail message.
+        headers (dict): The Retry-After header.
+
+    """
+
+    def __init__(
+        self,
+        detail: str,
+        retry_after: int,
+    ):
+        super().__init__(
+            status_code=429,
+            content={"detail": detail},
+            headers={"Retry-After": str(retry_after)},
+        )
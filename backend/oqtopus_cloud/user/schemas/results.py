@@ -26,6 +26,13 @@ class SamplingResultDef(BaseModel):
     """
     Provided only for successful results
     """
+    mitigatedResult: Annotated[
+        Optional[dict[str, float]],
+        Field(None, examples=[{"11": 5012.34, "00": 4987.66}]),
+    ]
+    """
+    Counts mitigated with the readout calibration data of the device<br>Provided only for successful results of tasks with roErrorMitigation other than 'none'. The counts may be negative with 'pseudo_inverse'
+    """
     reason: Optional[str] = None
     """
     Provided only for unsuccessful (failed, cancelled) results
@@ -66,3 +73,29 @@ class EstimationResultDef(BaseModel):
     """
     Parameter valid only for QPU devices
     """
+
+
+class WaitSamplingTaskResponse(BaseModel):
+    """
+    task status, with the result if the task has finished
+    """
+
+    taskId: tasks.TaskId
+    status: tasks.TaskStatus
+    result: Optional[SamplingResultDef] = None
+    """
+    Provided only if the task has finished and the result is small, otherwise use getSamplingResult
+    """
+
+
+class WaitEstimationTaskResponse(BaseModel):
+    """
+    task status, with the result if the task has finished
+    """
+
+    taskId: tasks.TaskId
+    status: tasks.TaskStatus
+    result: Optional[EstimationResultDef] = None
+    """
+    Provided only if the task has finished and the result is small, otherwise use getEstimationResult
+    """
@@ -27,13 +27,28 @@ class TaskStatus(
 class SamplingTaskInfo(BaseModel):
     taskId: TaskId
     code: Annotated[
-        str,
+        Optional[str],
         Field(
             examples=[
                 "OPENQASM 3; qubit[2] q; bit[2] c; h q[0]; cnot q[0], q[1]; c = measure q;"
             ]
         ),
     ]
+    """
+    Null if the code is omitted with includeCode=false
+    """
+    codeHash: Annotated[
+        Optional[str],
+        Field(
+            None,
+            examples=[
+                "2f77668a9dfbf8d5848b9eeb4a7145ca94c6ed9236e4a773f6dcafa5132b2f91"
+            ],
+        ),
+    ]
+    """
+    SHA-256 digest of the code, in hexadecimal. Tasks with the same code have the same codeHash
+    """
     name: Annotated[Optional[str], Field(None, examples=["Bell State Sampling"])]
     device: Annotated[str, Field(examples=["Kawasaki"])]
     nQubits: Optional[int] = None
@@ -90,6 +105,10 @@ class SamplingTaskInfo(BaseModel):
     note: Annotated[
         Optional[str], Field(None, examples=["Bell State Sampling Example"])
     ]
+    priority: Annotated[Optional[int], Field(None, examples=[0])]
+    """
+    Dispatch priority among the tasks of the owner on the device
+    """
     status: TaskStatus
     createdAt: Annotated[AwareDatetime, Field(examples=["2022-10-19T11:45:34+09:00"])]
 
@@ -159,6 +178,10 @@ class SamplingTaskDef(BaseModel):
     note: Annotated[
         Optional[str], Field(None, examples=["Bell State Sampling Example"])
     ]
+    priority: Annotated[Optional[int], Field(0, examples=[5], ge=0, le=9)]
+    """
+    Dispatch priority among the tasks of the owner on the device, from 0 to 9 (highest).<br/>The tasks of different owners are dispatched by fair share, whatever their priority
+    """
 
 
 class SubmitTaskResponse(BaseModel):
@@ -205,13 +228,28 @@ class Operator(RootModel[list[SingleOperatorModel]]):
 class EstimationTaskInfo(BaseModel):
     taskId: TaskId
     code: Annotated[
-        str,
+        Optional[str],
         Field(
             examples=[
                 "OPENQASM 3; qubit[2] q; bit[2] c; h q[0]; cnot q[0], q[1]; c = measure q;"
             ]
         ),
     ]
+    """
+    Null if the code is omitted with includeCode=false
+    """
+    codeHash: Annotated[
+        Optional[str],
+        Field(
+            None,
+            examples=[
+                "2f77668a9dfbf8d5848b9eeb4a7145ca94c6ed9236e4a773f6dcafa5132b2f91"
+            ],
+        ),
+    ]
+    """
+    SHA-256 digest of the code, in hexadecimal. Tasks with the same code have the same codeHash
+    """
     name: Annotated[Optional[str], Field(None, examples=["Bell State Estimation"])]
     device: Annotated[str, Field(examples=["Kawasaki"])]
     nQubits: Optional[int] = None
@@ -276,6 +314,10 @@ class EstimationTaskInfo(BaseModel):
     note: Annotated[
         Optional[str], Field(None, examples=["Bell State Estimation Example"])
     ]
+    priority: Annotated[Optional[int], Field(None, examples=[0])]
+    """
+    Dispatch priority among the tasks of the owner on the device
+    """
     status: TaskStatus
     createdAt: Annotated[AwareDatetime, Field(examples=["2022-10-19T11:45:34+09:00"])]
 
@@ -353,6 +395,10 @@ class EstimationTaskDef(BaseModel):
     note: Annotated[
         Optional[str], Field(None, examples=["Bell State Estimation Example"])
     ]
+    priority: Annotated[Optional[int], Field(0, examples=[5], ge=0, le=9)]
+    """
+    Dispatch priority among the tasks of the owner on the device, from 0 to 9 (highest).<br/>The tasks of different owners are dispatched by fair share, whatever their priority
+    """
 
 
 class GetEstimationTaskStatusResponse(BaseModel):
@@ -362,3 +408,52 @@ class GetEstimationTaskStatusResponse(BaseModel):
 
     taskId: TaskId
     status: TaskStatus
+
+
+class SamplingTaskBatchDef(BaseModel):
+    tasks: Annotated[list[SamplingTaskDef], Field(max_length=1000, min_length=1)]
+
+
+class EstimationTaskBatchDef(BaseModel):
+    tasks: Annotated[list[EstimationTaskDef], Field(max_length=1000, min_length=1)]
+
+
+class SubmitTaskBatchItem(BaseModel):
+    taskId: Optional[TaskId] = None
+    """
+    Set if the task is created
+    """
+    createdAt: Annotated[
+        Optional[AwareDatetime], Field(None, examples=["2022-10-19T11:45:34+09:00"])
+    ]
+    status: Optional[TaskStatus] = None
+    detail: Annotated[Optional[str], Field(None, examples=["device not found"])]
+    """
+    Set if the task is rejected
+    """
+
+
+class SubmitTaskBatchResponse(BaseModel):
+    """
+    submit tasks in a batch
+    """
+
+    results: list[SubmitTaskBatchItem]
+
+
+class TaskStatusBatchGetRequest(BaseModel):
+    taskIds: Annotated[list[TaskId], Field(max_length=1000, min_length=1)]
+
+
+class TaskStatusBatchGetResponse(BaseModel):
+    """
+    task statuses by task id
+    """
+
+    statuses: Annotated[
+        dict[str, TaskStatus],
+        Field(examples=[{"7af020f6-2e38-4d70-8cf0-4349650ea08c": "QUEUED"}]),
+    ]
+    """
+    Tasks which are not found are omitted
+    """
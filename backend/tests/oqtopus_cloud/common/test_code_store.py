@@ -0,0 +1,48 @@
+import hashlib
+from datetime import datetime
+
+from oqtopus_cloud.common.code_store import (
+    hash_code,
+    task_code,
+    task_code_hash,
+)
+from oqtopus_cloud.common.models.task import Task
+from oqtopus_cloud.common.models.task_code import TaskCode
+
+
+def _get_task(code=None, code_hash=None) -> Task:
+    return Task(
+        id=bytes(16),
+        owner="admin",
+        device="Kawasaki",
+        code=code,
+        code_hash=code_hash,
+        action="sampling",
+        shots=1000,
+        status="QUEUED",
+        created_at=datetime(2024, 3, 4, 12, 34, 56),
+    )
+
+
+def test_hash_code():
+    # Act and Assert
+    assert (
+        hash_code("OPENQASM 3; // ü")
+        == hashlib.sha256("OPENQASM 3; // ü".encode()).digest()
+    )
+    assert len(hash_code("")) == 32
+
+
+def test_task_code():
+    # Arrange
+    legacy = _get_task(code="OPENQASM 2.0;")
+    stored = _get_task(code_hash=hash_code("OPENQASM 3;"))
+    stored.task_code = TaskCode(hash=stored.code_hash, code="OPENQASM 3;")
+    missing = _get_task(code_hash=hash_code("OPENQASM 3;"))
+
+    # Act and Assert
+    assert task_code(legacy) == "OPENQASM 2.0;"
+    assert task_code_hash(legacy) == hash_code("OPENQASM 2.0;")
+    assert task_code(stored) == "OPENQASM 3;"
+    assert task_code_hash(stored) == hash_code("OPENQASM 3;")
+    assert task_code(missing) is None
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+from oqtopus_cloud.common import codec
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        {"00": 5020, "11": 4980},
+        [["X 0 X 1", [1.5, 2.8]], ["Y 0 Z 1", [1.2, -2e-08]]],
+        {"0": 0, "1": None},
+        [1.5, 2.8],
+    ],
+)
+def test_dumps_loads(value):
+    # Act
+    encoded = codec.dumps(value)
+
+    # Assert
+    assert json.loads(encoded) == value
+    assert codec.loads(encoded) == value
+    assert codec.loads(encoded.encode()) == value
+
+
+def test_loads_python_literal():
+    # operators were stored with str() before they were stored as JSON
+    assert codec.loads(str([["X 0 X 1", [1.5, 2.8]]])) == [["X 0 X 1", [1.5, 2.8]]]
+
+
+@pytest.mark.parametrize("value", ["", "Z0*Z1", "{'00': "])
+def test_loads_malformed(value):
+    with pytest.raises(ValueError):
+        codec.loads(value)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        '{"00": 5020, "11": 4980}',
+        ' { "00" : 5020 ,\n"11":4980 } ',
+        "{'00': 5020, '11': 4980}",
+    ],
+)
+def test_iter_items(value):
+    # Act
+    items = codec.iter_items(value)
+
+    # Assert
+    assert next(items) == ("00", 5020)
+    assert list(items) == [("11", 4980)]
+
+
+@pytest.mark.parametrize("value", ["{}", "null", " {  } "])
+def test_iter_items_empty(value):
+    assert list(codec.iter_items(value)) == []
+
+
+@pytest.mark.parametrize("value", ['{"00": 5020 "11": 4980}', '{"00" 5020}'])
+def test_iter_items_malformed(value):
+    with pytest.raises(ValueError):
+        list(codec.iter_items(value))
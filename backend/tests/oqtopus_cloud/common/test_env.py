@@ -0,0 +1,12 @@
+import pytest
+from oqtopus_cloud.common.env import strtobool
+
+
+def test_strtobool():
+    # Act & Assert
+    assert strtobool("True") is True
+    assert strtobool("on") is True
+    assert strtobool("0") is False
+    assert strtobool("no") is False
+    with pytest.raises(ValueError):
+        strtobool("maybe")
@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+from oqtopus_cloud.common.estimation import (
+    EstimationError,
+    estimate_expectation,
+    group_commuting_terms,
+    measurement_bases,
+)
+from oqtopus_cloud.common.pauli import (
+    PauliTerm,
+    compile_operator,
+    format_pauli_string,
+    parse_pauli_string,
+)
+
+PAULIS = {
+    "I": np.eye(2),
+    "X": np.array([[0, 1], [1, 0]]),
+    "Y": np.array([[0, -1j], [1j, 0]]),
+    "Z": np.diag([1, -1]),
+}
+# the rotation measuring each Pauli in the computational basis
+ROTATIONS = {
+    "I": np.eye(2),
+    "X": np.array([[1, 1], [1, -1]]) / np.sqrt(2),
+    "Y": np.array([[1, -1j], [1, 1j]]) / np.sqrt(2),
+    "Z": np.eye(2),
+}
+
+
+def _dense(factors: dict[int, np.ndarray], n_qubits: int) -> np.ndarray:
+    # the rightmost bit (qubit 0) is the last factor
+    matrix = np.array([[1.0]])
+    for qubit in reversed(range(n_qubits)):
+        matrix = np.kron(matrix, factors.get(qubit, np.eye(2)))
+    return matrix
+
+
+def _paulis(pauli_string: str) -> dict[int, str]:
+    tokens = pauli_string.split()
+    return {int(index): pauli for pauli, index in zip(tokens[::2], tokens[1::2])}
+
+
+def test_group_commuting_terms():
+    # Arrange
+    terms = compile_operator(
+        [
+            ["Z 0", [1, 0]],
+            ["X 0 X 1", [1, 0]],
+            ["Z 0 Z 1", [1, 0]],
+            ["I 0", [2, 0]],
+            ["Z 1", [1, 0]],
+            ["X 1", [1, 0]],
+        ]
+    )
+
+    # Act
+    bases = group_commuting_terms(terms)
+
+    # Assert
+    assert [(format_pauli_string(b.x, b.z), b.terms) for b in bases] == [
+        ("X 0 X 1", [1, 5]),
+        ("Z 0 Z 1", [2, 0, 4]),
+    ]
+    assert measurement_bases(
+        compile_operator([["X 0 Y 1", [1, 0]], ["X 0", [1, 0]]])
+    ) == ["X 0 Y 1"]
+
+
+def test_estimate_expectation():
+    # Arrange
+    n_qubits = 3
+    rng = np.random.default_rng(7)
+    state = rng.normal(size=1 << n_qubits) + 1j * rng.normal(size=1 << n_qubits)
+    state /= np.linalg.norm(state)
+    operator = [
+        ["X 0 X 1", [1.5, 2.8]],
+        ["Y 0 Z 1", [1.2, -2e-8]],
+        ["Z 0 Z 1 Z 2", [0.5, 0]],
+        ["Y 2", [-0.7, 0.1]],
+        ["Z 2", [0.3, 0]],
+        ["I 1", [0.25, 0]],
+    ]
+    expected = sum(
+        complex(*coef)
+        * np.vdot(
+            state,
+            _dense({q: PAULIS[p] for q, p in _paulis(pauli_string).items()}, n_qubits)
+            @ state,
+        )
+        for pauli_string, coef in operator
+    )
+    shots = 10**9
+    basis_counts = {}
+    for basis in measurement_bases(compile_operator(operator)):
+        rotated = (
+            _dense({q: ROTATIONS[p] for q, p in _paulis(basis).items()}, n_qubits)
+            @ state
+        )
+        basis_counts[basis] = {
+            format(key, f"0{n_qubits}b"): round(probability * shots)
+            for key, probability in enumerate(np.abs(rotated) ** 2)
+        }
+
+    # Act
+    actual = estimate_expectation(compile_operator(operator), basis_counts)
+
+    # Assert
+    assert len(basis_counts) < len(operator) - 1
+    assert actual == pytest.approx(expected, abs=1e-6)
+
+
+def test_estimate_expectation_errors():
+    # Arrange
+    terms = [PauliTerm(*parse_pauli_string("X 0"), 1.0)]
+
+    # Act and Assert
+    assert estimate_expectation([PauliTerm(0, 0, 2.0)], {}) == 2.0
+    with pytest.raises(EstimationError):
+        estimate_expectation(terms, {"Z 0": {"0": 10}})
+    with pytest.raises(EstimationError):
+        estimate_expectation(terms, {"X 0": {}})
+    with pytest.raises(EstimationError):
+        estimate_expectation(terms, {"X 0": {"2": 10}})
+    with pytest.raises(EstimationError):
+        estimate_expectation(terms, {"X 0 X": {"0": 10}})
+    with pytest.raises(EstimationError):
+        estimate_expectation(compile_operator([["Z 70", 1.0]]), {"Z 70": {"0": 5}})
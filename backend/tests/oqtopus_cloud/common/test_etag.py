@@ -0,0 +1,44 @@
+from fastapi import Response
+from oqtopus_cloud.common.etag import check_not_modified, etag_matches, make_etag
+
+
+def test_make_etag():
+    # Act
+    etag = make_etag("SVSim", 1)
+
+    # Assert
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag("SVSim", 1)
+    assert etag != make_etag("SVSim", 2)
+    assert make_etag("ab", "c") != make_etag("a", "bc")
+    assert make_etag(None) != make_etag("")
+    assert make_etag(b"1") == make_etag("1")
+
+
+def test_etag_matches():
+    # Arrange
+    etag = make_etag("SVSim", 1)
+
+    # Act & Assert
+    assert not etag_matches(None, etag)
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(make_etag("SVSim", 2), etag)
+
+
+def test_check_not_modified():
+    # Arrange
+    etag = make_etag("SVSim", 1)
+    response = Response()
+
+    # Act
+    modified = check_not_modified(response, None, etag)
+    not_modified = check_not_modified(Response(), etag, etag)
+
+    # Assert
+    assert modified is None
+    assert response.headers["ETag"] == etag
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == etag
+    assert not_modified.body == b""
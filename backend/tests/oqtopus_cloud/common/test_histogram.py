@@ -0,0 +1,89 @@
+import pytest
+from oqtopus_cloud.common.histogram import (
+    HistogramFormatError,
+    decode_histogram,
+    histogram_arrays,
+    histogram_length,
+    encode_histogram,
+)
+
+
+@pytest.mark.parametrize("compression", ["none", "zlib"])
+@pytest.mark.parametrize(
+    "counts",
+    [
+        {"00": 5020, "11": 4980},
+        {"11": 1, "01": 70000, "00": 0},
+        {"1" * 64: 2**40, "0" * 64: 1},
+        {},
+    ],
+)
+def test_encode_decode_histogram(counts, compression):
+    # Act
+    actual = decode_histogram(encode_histogram(counts, compression=compression))
+
+    # Assert
+    assert actual == counts
+    assert list(actual) == sorted(counts)
+
+
+def test_encode_histogram_is_smaller_than_json():
+    # Arrange
+    counts = {format(i, "020b"): i % 1000 for i in range(0, 2**20, 7)}
+
+    # Act
+    actual = encode_histogram(counts, compression="none")
+
+    # Assert
+    assert len(actual) * 5 < len(str(counts))
+
+
+@pytest.mark.parametrize(
+    "counts",
+    [
+        {"0b1": 1},
+        {"1_0": 1},
+        {"00 11": 1},
+        {"0": 1, "11": 2},
+        {"": 1},
+        {"1" * 65: 1},
+        {"01": -1},
+    ],
+)
+def test_encode_invalid_histogram(counts):
+    with pytest.raises(HistogramFormatError):
+        encode_histogram(counts)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b"", b"{}", b"OQH\x02\x00", encode_histogram({"00": 1, "11": 2}, "none")[:-1]],
+)
+def test_decode_invalid_histogram(data):
+    with pytest.raises(HistogramFormatError):
+        decode_histogram(data)
+
+
+def test_histogram_length():
+    # Arrange
+    counts = {format(i, "016b"): i + 1 for i in range(0, 1 << 16, 7)}
+
+    # Act & Assert
+    for compression in ["none", "zlib", "zstd"]:
+        assert histogram_length(encode_histogram(counts, compression)) == len(counts)
+    with pytest.raises(HistogramFormatError):
+        histogram_length(b"OQH\x01\x01broken")
+
+
+def test_histogram_arrays():
+    # Act
+    keys, values = histogram_arrays({"11": 4980, "00": 5020, "1" * 64: 1})
+
+    # Assert
+    assert keys.dtype.name == "uint64" and values.dtype.name == "float64"
+    assert keys.tolist() == [3, 0, (1 << 64) - 1]
+    assert values.tolist() == [4980.0, 5020.0, 1.0]
+    with pytest.raises(HistogramFormatError):
+        histogram_arrays({"1" * 65: 1})
+    with pytest.raises(HistogramFormatError):
+        histogram_arrays({"02": 1})
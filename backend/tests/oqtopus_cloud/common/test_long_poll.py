@@ -0,0 +1,30 @@
+from oqtopus_cloud.common import long_poll
+from oqtopus_cloud.common.long_poll import poll
+
+
+def test_poll_backoff(monkeypatch):
+    # Arrange
+    sleeps = []
+    monkeypatch.setattr(long_poll.time, "sleep", sleeps.append)
+    values = iter(range(10))
+
+    # Act
+    actual = poll(lambda: next(values), lambda value: value == 6, timeout=60)
+
+    # Assert
+    assert actual == 6
+    assert sleeps == [0.25, 0.5, 1.0, 2.0, 2.0, 2.0]
+
+
+def test_poll_timeout(monkeypatch):
+    # Arrange
+    sleeps = []
+    monkeypatch.setattr(long_poll.time, "sleep", sleeps.append)
+    checks = []
+
+    # Act
+    actual = poll(lambda: checks.append(1) or len(checks), lambda value: False, 0)
+
+    # Assert
+    assert actual == 1
+    assert sleeps == []
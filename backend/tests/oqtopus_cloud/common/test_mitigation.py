@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+from oqtopus_cloud.common.mitigation import (
+    MitigationError,
+    mitigate_counts,
+    nearest_probabilities,
+    readout_matrices,
+)
+
+CALIBRATION_DATA = {
+    "measProb0As1": {"0": 0.01, "1": 0.02, "2": 0.03, "4": 0.05},
+    "measProb1As0": {"0": 0.04, "1": 0.06, "2": 0.08, "4": 0.1},
+}
+
+
+def _dense_inverse(counts, matrices):
+    # the full 2^n x 2^n matrix, the rightmost bit is the last factor
+    matrix = np.array([[1.0]])
+    for bit_matrix in matrices[::-1]:
+        matrix = np.kron(matrix, bit_matrix)
+    n_bits = len(matrices)
+    vector = np.zeros(1 << n_bits)
+    for key, count in counts.items():
+        vector[int(key, 2)] = count
+    mitigated = np.linalg.solve(matrix, vector)
+    return {format(key, f"0{n_bits}b"): value for key, value in enumerate(mitigated)}
+
+
+def test_readout_matrices():
+    # Act
+    matrices = readout_matrices(CALIBRATION_DATA, [4, 0])
+
+    # Assert
+    assert np.allclose(matrices[0], [[0.95, 0.1], [0.05, 0.9]])
+    assert np.allclose(matrices[1], [[0.99, 0.04], [0.01, 0.96]])
+    with pytest.raises(MitigationError):
+        readout_matrices(CALIBRATION_DATA, [3])
+    with pytest.raises(MitigationError):
+        readout_matrices({"measProb0As1": {"0": 0.5}, "measProb1As0": {"0": 0.5}}, [0])
+
+
+def test_mitigate_counts_pseudo_inverse():
+    # Arrange
+    counts = {"000": 480, "001": 30, "011": 12, "100": 25, "110": 20, "111": 433}
+    matrices = readout_matrices(CALIBRATION_DATA, [0, 4, 2])
+    expected = _dense_inverse(counts, matrices)
+
+    # Act
+    actual = mitigate_counts(counts, matrices, "pseudo_inverse", cutoff=0)
+
+    # Assert
+    assert list(actual) == sorted(actual)
+    for key, value in expected.items():
+        assert actual.get(key, 0.0) == pytest.approx(value, abs=1e-9)
+    assert sum(actual.values()) == pytest.approx(1000)
+
+
+def test_mitigate_counts_least_square():
+    # Arrange
+    counts = {"00": 950, "01": 20, "10": 30}
+    matrices = readout_matrices(CALIBRATION_DATA, [0, 1])
+    quasi = mitigate_counts(counts, matrices, "pseudo_inverse", cutoff=0)
+
+    # Act
+    actual = mitigate_counts(counts, matrices, "least_square", cutoff=0)
+
+    # Assert
+    assert min(quasi.values()) < 0
+    assert min(actual.values()) > 0
+    assert sum(actual.values()) == pytest.approx(1000)
+    assert actual["00"] > counts["00"]
+
+
+def test_mitigate_counts_many_qubits():
+    # Arrange
+    n_qubits = 40
+    calibration_data = {
+        "measProb0As1": {str(qubit): 0.02 for qubit in range(n_qubits)},
+        "measProb1As0": {str(qubit): 0.04 for qubit in range(n_qubits)},
+    }
+    matrices = readout_matrices(calibration_data, list(range(n_qubits)))
+    counts = {"0" * n_qubits: 500_000, "1" * n_qubits: 450_000, "0" * 39 + "1": 50_000}
+
+    # Act
+    actual = mitigate_counts(counts, matrices, "least_square", max_entries=10_000)
+
+    # Assert
+    assert len(actual) <= 10_000
+    assert actual["1" * n_qubits] > counts["1" * n_qubits]
+    assert sum(actual.values()) == pytest.approx(1_000_000)
+
+
+def test_mitigate_counts_invalid():
+    # Arrange
+    matrices = readout_matrices(CALIBRATION_DATA, [0, 1])
+
+    # Act & Assert
+    with pytest.raises(MitigationError):
+        mitigate_counts({"000": 1}, matrices, "pseudo_inverse")
+    with pytest.raises(MitigationError):
+        mitigate_counts({"00": 1, "1": 1}, matrices, "pseudo_inverse")
+    with pytest.raises(MitigationError):
+        mitigate_counts({"0x": 1}, matrices, "pseudo_inverse")
+    with pytest.raises(MitigationError):
+        mitigate_counts({"00": 1}, matrices, "none")  # type: ignore
+
+
+def test_nearest_probabilities():
+    # Act
+    actual = nearest_probabilities(np.array([0.6, 0.5, -0.1]))
+
+    # Assert
+    assert np.allclose(actual, [0.55, 0.45, 0.0])
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+import pytest
+from oqtopus_cloud.common.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+
+def test_encode_decode_cursor():
+    # Arrange
+    created_at = datetime(2024, 3, 4, 12, 34, 56)
+    id = bytes.fromhex("7af020f62e384d708cf04349650ea08c")
+
+    # Act
+    actual = decode_cursor(encode_cursor(created_at, id))
+
+    # Assert
+    assert actual == (created_at, id)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "e30", "eyJjIjogMX0"])
+def test_decode_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
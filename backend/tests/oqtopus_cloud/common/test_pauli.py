@@ -0,0 +1,101 @@
+import pytest
+from oqtopus_cloud.common.pauli import (
+    OperatorFormatError,
+    PauliTerm,
+    compile_operator,
+    decode_operator,
+    encode_operator,
+    format_pauli_string,
+    load_operator,
+    operator_to_list,
+    parse_pauli_string,
+)
+
+
+def test_parse_pauli_string():
+    # Act
+    x, z = parse_pauli_string("X 0 Y 1 Z 5 I 2")
+
+    # Assert
+    assert (x, z) == (0b11, 0b100010)
+    assert format_pauli_string(x, z) == "X 0 Y 1 Z 5"
+    assert format_pauli_string(0, 0) == ""
+    for malformed in ["", "X", "X 0 Y", "W 0", "X -1", "X 0 Z 0", "X 65536", "X ٣"]:
+        with pytest.raises(OperatorFormatError):
+            parse_pauli_string(malformed)
+
+
+def test_compile_operator():
+    # Act
+    terms = compile_operator(
+        [
+            ["X 0 X 1", [1.5, 2.8]],
+            ["Z 1 X 0", 0.5],
+            ["X 1 X 0", [0.5]],
+            ["I 3", [1, -1]],
+        ]
+    )
+
+    # Assert
+    assert terms == [
+        PauliTerm(0b11, 0, complex(2.0, 2.8)),
+        PauliTerm(0b01, 0b10, complex(0.5, 0)),
+        PauliTerm(0, 0, complex(1, -1)),
+    ]
+    assert operator_to_list(terms) == [
+        ["X 0 X 1", [2.0, 2.8]],
+        ["X 0 Z 1", [0.5, 0.0]],
+        ["I 0", [1.0, -1.0]],
+    ]
+    for malformed in [
+        [],
+        "X 0",
+        [["X 0"]],
+        [[0, [1.0, 0.0]]],
+        [["X 0 W 1", [1.0, 0.0]]],
+        [["X 0", [1.0, 0.0, 0.0]]],
+        [["X 0", ["1.0"]]],
+        [["X 0", True]],
+    ]:
+        with pytest.raises(OperatorFormatError):
+            compile_operator(malformed)
+
+
+def test_encode_operator():
+    # Arrange
+    terms = compile_operator(
+        [
+            ["X 0 Y 1", [1.5, 2.8]],
+            ["Z 70", [-1.2, -2e-8]],
+            ["I 0", [0.25, 0.0]],
+        ]
+    )
+    many_terms = compile_operator(
+        [[f"Z {i} Z {i + 1}", [0.1 * i, 0.0]] for i in range(5000)]
+    )
+
+    # Act
+    data = encode_operator(terms)
+    identity = encode_operator([PauliTerm(0, 0, 1j)])
+
+    # Assert
+    assert decode_operator(data) == terms
+    assert decode_operator(identity) == [PauliTerm(0, 0, 1j)]
+    assert decode_operator(encode_operator(many_terms)) == many_terms
+    for malformed in [b"", b"OQH\x01", data[:-1], b"OQP\x02" + data[4:]]:
+        with pytest.raises(OperatorFormatError):
+            decode_operator(malformed)
+
+
+def test_load_operator():
+    # Arrange
+    terms = [PauliTerm(0b1, 0b1, 1.5 + 0j)]
+
+    # Act and Assert
+    assert load_operator(encode_operator(terms), None) == terms
+    # operators were stored as JSON, or with str(), before they were packed
+    assert load_operator(None, '[["Y 0", [1.5, 0.0]]]') == terms
+    assert load_operator(None, "[['Y 0', [1.5, 0.0]]]") == terms
+    for malformed in [None, "Z0*Z1"]:
+        with pytest.raises(OperatorFormatError):
+            load_operator(None, malformed)
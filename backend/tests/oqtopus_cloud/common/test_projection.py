@@ -0,0 +1,24 @@
+import pytest
+from oqtopus_cloud.common.projection import FieldSpec, InvalidFields, parse_fields
+
+SPECS = {
+    "taskId": FieldSpec((), lambda row: row["id"]),
+    "status": FieldSpec((), lambda row: row["status"]),
+    "createdAt": FieldSpec((), lambda row: row["created_at"]),
+}
+
+
+def test_parse_fields():
+    # Act
+    actual = parse_fields("createdAt, status,,", SPECS)
+
+    # Assert
+    assert actual == ["taskId", "status", "createdAt"]
+    assert parse_fields(None, SPECS) is None
+    assert parse_fields("", SPECS) == ["taskId"]
+
+
+@pytest.mark.parametrize("fields", ["status,code", "Status", "taskId,created_at"])
+def test_parse_invalid_fields(fields):
+    with pytest.raises(InvalidFields):
+        parse_fields(fields, SPECS)
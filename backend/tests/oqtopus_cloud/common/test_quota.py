@@ -0,0 +1,15 @@
+from datetime import datetime, timedelta
+
+from oqtopus_cloud.common.quota import refill_tokens
+
+
+def test_refill_tokens():
+    # Arrange
+    now = datetime(2024, 3, 4, 12, 34, 56)
+
+    # Act and Assert
+    assert refill_tokens(None, None, 2.0, 10.0, now) == 10.0
+    assert refill_tokens(1.0, now - timedelta(seconds=2), 2.0, 10.0, now) == 5.0
+    assert refill_tokens(1.0, now - timedelta(hours=1), 2.0, 10.0, now) == 10.0
+    # a clock going backwards does not take tokens
+    assert refill_tokens(1.0, now + timedelta(seconds=2), 2.0, 10.0, now) == 1.0
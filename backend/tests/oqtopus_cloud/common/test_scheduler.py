@@ -0,0 +1,22 @@
+from oqtopus_cloud.common.scheduler import start_times
+
+
+def test_start_times():
+    # Act
+    actual = start_times({"alice": 11.5, "bob": 12.0}, {"alice": 1.0, "bob": 2.0})
+
+    # Assert
+    assert actual == {"alice": 11.5, "bob": 12.0}
+
+
+def test_start_times_of_idle_owners():
+    # Act
+    actual = start_times(
+        {"alice": 10.0, "bob": 3.0, "carol": 4.0},
+        {"alice": 1.0, "bob": 2.0, "dave": 0.5, "erin": 0.0},
+    )
+
+    # Assert
+    assert actual == {"alice": 10.0, "bob": 9.0, "dave": 9.0}
+    assert start_times({"alice": 10.0}, {"alice": 1.0}) == {"alice": 10.0}
+    assert start_times({}, {"alice": 1.0}) == {"alice": 0.0}
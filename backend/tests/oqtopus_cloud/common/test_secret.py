@@ -0,0 +1,124 @@
+import json
+
+import pytest
+from oqtopus_cloud.common.secret import SecretCache
+
+
+class StubSecretsManager:
+    """Stands in for the Secrets Manager client."""
+
+    def __init__(self, password="password"):
+        self.password = password
+        self.calls = 0
+        self.fail = False
+
+    def get_secret_value(self, SecretId):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("throttled")
+        secret = {"username": "admin", "password": self.password}
+        return {"SecretString": json.dumps(secret)}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _get_cache(client, clock):
+    return SecretCache("db-secret", client, ttl=300, refresh_margin=60, clock=clock)
+
+
+def test_get_is_cached_within_ttl():
+    # Arrange
+    client = StubSecretsManager()
+    clock = FakeClock()
+    cache = _get_cache(client, clock)
+
+    # Act
+    first = cache.get()
+    clock.now = 200
+    second = cache.get()
+
+    # Assert
+    assert first == {"username": "admin", "password": "password"}
+    assert second == first
+    assert client.calls == 1
+
+
+def test_get_refreshes_in_background_before_expiry():
+    # Arrange
+    client = StubSecretsManager()
+    clock = FakeClock()
+    cache = _get_cache(client, clock)
+    cache.get()
+    client.password = "rotated"
+
+    # Act
+    clock.now = 250
+    stale = cache.get()
+    cache._refresh_thread.join()
+    fresh = cache.get()
+
+    # Assert
+    assert stale["password"] == "password"
+    assert fresh["password"] == "rotated"
+    assert client.calls == 2
+
+
+def test_get_refreshes_synchronously_after_expiry():
+    # Arrange
+    client = StubSecretsManager()
+    clock = FakeClock()
+    cache = _get_cache(client, clock)
+    cache.get()
+    client.password = "rotated"
+
+    # Act
+    clock.now = 301
+    actual = cache.get()
+
+    # Assert
+    assert actual["password"] == "rotated"
+    assert client.calls == 2
+
+
+def test_failed_background_refresh_keeps_cached_value():
+    # Arrange
+    client = StubSecretsManager()
+    clock = FakeClock()
+    cache = _get_cache(client, clock)
+    cache.get()
+    client.fail = True
+
+    # Act
+    clock.now = 250
+    cache.get()
+    cache._refresh_thread.join()
+    actual = cache.get()
+
+    # Assert
+    assert actual["password"] == "password"
+    clock.now = 301
+    with pytest.raises(RuntimeError):
+        cache.get()
+
+
+def test_invalidate():
+    # Arrange
+    client = StubSecretsManager()
+    clock = FakeClock()
+    cache = _get_cache(client, clock)
+    cache.get()
+    client.password = "rotated"
+
+    # Act
+    cache.invalidate()
+    actual = cache.get()
+
+    # Assert
+    assert actual["password"] == "rotated"
+    assert client.calls == 2
@@ -0,0 +1,45 @@
+import pytest
+from oqtopus_cloud.common.tracing import NoOpTracer, create_tracer, is_tracing_disabled
+
+
+def test_is_tracing_disabled(monkeypatch: pytest.MonkeyPatch):
+    # Arrange
+    monkeypatch.delenv("POWERTOOLS_TRACE_DISABLED", raising=False)
+    monkeypatch.delenv("AWS_SAM_LOCAL", raising=False)
+    monkeypatch.delenv("AWS_CHALICE_CLI_MODE", raising=False)
+    monkeypatch.delenv("LAMBDA_TASK_ROOT", raising=False)
+
+    # Act & Assert
+    assert is_tracing_disabled()
+    monkeypatch.setenv("LAMBDA_TASK_ROOT", "/var/task")
+    assert not is_tracing_disabled()
+    monkeypatch.setenv("POWERTOOLS_TRACE_DISABLED", "true")
+    assert is_tracing_disabled()
+    monkeypatch.delenv("POWERTOOLS_TRACE_DISABLED")
+    monkeypatch.setenv("AWS_SAM_LOCAL", "true")
+    assert is_tracing_disabled()
+
+
+def test_create_tracer(monkeypatch: pytest.MonkeyPatch):
+    # Arrange
+    monkeypatch.delenv("LAMBDA_TASK_ROOT", raising=False)
+
+    # Act
+    tracer = create_tracer()
+
+    # Assert
+    assert isinstance(tracer, NoOpTracer)
+
+
+def test_no_op_tracer_decorators():
+    # Arrange
+    tracer = NoOpTracer()
+
+    def handler(event, context):
+        return event
+
+    # Act & Assert
+    assert tracer.capture_method(handler) is handler
+    assert tracer.capture_method(capture_response=False)(handler) is handler
+    assert tracer.capture_lambda_handler(handler) is handler
+    assert tracer.capture_lambda_handler(capture_error=False)(handler) is handler
@@ -0,0 +1,47 @@
+from typing import Any, Callable
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+@pytest.fixture
+def explain_task_queries(
+    test_db: Session,
+) -> Callable[[Callable[[], Any]], list[list[str]]]:
+    """Returns a function which runs a query and explains its SELECTs of tasks.
+
+    EXPLAIN QUERY PLAN is SQLite-only: the plans are those of the SQLite test
+    database, which uses the same indexes as the MySQL schema, so a SCAN of the
+    tasks table here is a full scan on MySQL as well.
+
+    Args:
+        test_db (Session): The database session of the user or provider tests.
+
+    Returns:
+        Callable[[Callable[[], Any]], list[list[str]]]: The function, which returns
+            the details of the plan of each captured statement.
+    """
+
+    def explain(query: Callable[[], Any]) -> list[list[str]]:
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().startswith("SELECT") and "FROM tasks" in statement:
+                statements.append((statement, parameters))
+
+        engine = test_db.get_bind()
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            query()
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+        plans = []
+        for statement, parameters in statements:
+            rows = test_db.connection().exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )
+            plans.append([row[3] for row in rows])
+        return plans
+
+    return explain
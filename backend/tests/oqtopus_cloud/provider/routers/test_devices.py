@@ -119,5 +119,22 @@ def test_update_device_calibration(test_db):
     assert actual == expected
 
 
+def test_update_device_increments_version(test_db):
+    # Arrange
+    test_db.add(_get_model())
+    test_db.commit()
+    device = test_db.get(Device, "SC2")
+    # Act
+    request = DevicePendingTasksUpdate(
+        command="DevicePendingTasksUpdate", nPendingTasks=3
+    )
+    update_device_pending_tasks(device=device, request=request, db=test_db)
+    update_device_pending_tasks(device=device, request=request, db=test_db)
+    # Assert
+    actual = test_db.get(Device, "SC2")
+    assert actual.version == 2
+    assert actual.pending_tasks == 3
+
+
 # TODO: add invalid test cases
 # TODO: add test cases for handler
@@ -3,15 +3,25 @@ import uuid
 from datetime import datetime
 from typing import Dict
 
+import pytest
 from oqtopus_cloud.common.models.device import (
     Device,
 )
+from oqtopus_cloud.common.histogram import decode_histogram
+from oqtopus_cloud.common.models.result import Result as ResultModel
 from oqtopus_cloud.common.models.task import (
     Task,
 )
-from oqtopus_cloud.provider.routers.results import create_result
+from oqtopus_cloud.common.models.user_limit import UserLimit
+from oqtopus_cloud.provider.routers.results import (
+    create_result,
+    create_results,
+    encode_result,
+)
 from oqtopus_cloud.provider.schemas.results import (
+    CreateResultBatchRequest,
     CreateResultResponse,
+    EstimationResult,
     Result,
     ResultDef,
     ResultStatus,
@@ -20,6 +30,7 @@ from oqtopus_cloud.provider.schemas.results import (
 from oqtopus_cloud.provider.schemas.tasks import (
     TaskId,
 )
+from sqlalchemy import event
 from zoneinfo import ZoneInfo
 
 # jst = ZoneInfo("Asia/Tokyo")
@@ -99,8 +110,10 @@ def test_create_result(test_db):
         "ro_error_mitigation": None,
         "n_per_node": None,
         "simulation_opt": None,
-        "status": "QUEUED",
+        "status": "RUNNING",
         "created_at": datetime(2024, 3, 4, 12, 34, 56),
+        "lease_expires_at": datetime(2024, 3, 4, 13, 34, 56),
+        "lease_token": uuid.UUID(int=0).bytes,
     }
     # Arrange
     test_db.add(_get_task_model(task_dict=task_dict))
@@ -124,6 +137,182 @@ def test_create_result(test_db):
     # Assert
 
     assert actual == expected
+    task = test_db.get(Task, uuid.UUID("e8a60c14-8838-46c9-816a-30191d6ab517").bytes)
+    assert (task.lease_expires_at, task.lease_token) == (None, None)
+
+
+def _get_result_def(task_id: uuid.UUID) -> ResultDef:
+    return ResultDef(
+        taskId=TaskId(root=task_id),
+        status=ResultStatus(root="SUCCESS"),
+        result=Result(SamplingResult({"00": 512, "11": 512})),
+        reason=None,
+        transpiledCode="OPENQASM 3;",
+        qubitAllocation={"0": 0, "1": 4},
+    )
+
+
+def test_create_results(test_db):
+    # Arrange
+    test_db.add(_get_device_model())
+    for i in range(3):
+        task_dict = {
+            "id": uuid.UUID(int=i).bytes,
+            "owner": "admin",
+            "code": "OPENQASM 2.0;",
+            "action": "sampling",
+            "shots": 1024,
+            "device": "SC2",
+            "qubit_allocation": None,
+            "simulation_opt": None,
+            "status": "RUNNING",
+            "created_at": datetime(2024, 3, 4, 12, 34, 56),
+            "lease_expires_at": datetime(2024, 3, 4, 13, 34, 56),
+            "lease_token": uuid.UUID(int=i).bytes,
+        }
+        test_db.add(_get_task_model(task_dict=task_dict))
+    test_db.add(
+        ResultModel(
+            task_id=uuid.UUID(int=2).bytes,
+            status="SUCCESS",
+            result='{"00": 1024}',
+            reason=None,
+            transpiled_code="OPENQASM 3;",
+            qubit_allocation=None,
+        )
+    )
+    test_db.add(UserLimit(owner="admin", running_tasks=3))
+    test_db.commit()
+    request = CreateResultBatchRequest(
+        results=[
+            _get_result_def(uuid.UUID(int=0)),
+            _get_result_def(uuid.UUID(int=1)),
+            _get_result_def(uuid.UUID(int=1)),
+            _get_result_def(uuid.UUID(int=2)),
+            _get_result_def(uuid.UUID(int=3)),
+        ]
+    )
+    inserts = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO results"):
+            inserts.append(statement)
+
+    # Act
+    engine = test_db.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        actual = create_results(request=request, db=test_db)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    # Assert
+    assert [item.status.root for item in actual.results] == [
+        "CREATED",
+        "CREATED",
+        "CONFLICT",
+        "CONFLICT",
+        "NOT_FOUND",
+    ]
+    assert [item.taskId.root for item in actual.results] == [
+        uuid.UUID(int=i) for i in [0, 1, 1, 2, 3]
+    ]
+    assert len(inserts) == 1
+    created = test_db.get(ResultModel, uuid.UUID(int=1).bytes)
+    assert created.result is None
+    assert decode_histogram(created.packed_result) == {"00": 512, "11": 512}
+    assert json.loads(created.qubit_allocation) == {"0": 0, "1": 4}
+    # the task with a conflicting result is not counted twice
+    assert test_db.get(UserLimit, "admin").running_tasks == 1
+    # the leases of the finished tasks end
+    leases = [
+        (task.lease_expires_at, task.lease_token)
+        for task in (test_db.get(Task, uuid.UUID(int=i).bytes) for i in range(3))
+    ]
+    assert leases[:2] == [(None, None), (None, None)]
+    assert leases[2] == (datetime(2024, 3, 4, 13, 34, 56), uuid.UUID(int=2).bytes)
+
+
+def test_create_result_from_basis_counts(test_db):
+    # Arrange
+    test_db.add(_get_device_model())
+    for i, action in enumerate(["estimation", "sampling"]):
+        task_dict = {
+            "id": uuid.UUID(int=i).bytes,
+            "owner": "admin",
+            "code": "OPENQASM 2.0;",
+            "action": action,
+            "method": "sampling",
+            "operator": '[["X 0 X 1", [1.5, 0.0]], ["Z 0 Z 1", [1.0, 0.0]], ["I 0", [0.5, 0.0]]]',
+            "shots": 1000,
+            "device": "SC2",
+            "qubit_allocation": None,
+            "simulation_opt": None,
+            "status": "RUNNING",
+            "created_at": datetime(2024, 3, 4, 12, 34, 56),
+            "lease_expires_at": datetime(2024, 3, 4, 13, 34, 56),
+            "lease_token": uuid.UUID(int=i).bytes,
+        }
+        test_db.add(_get_task_model(task_dict=task_dict))
+    test_db.commit()
+    basis_counts = {
+        "X 0 X 1": {"00": 400, "01": 100, "10": 100, "11": 400},
+        "Z 0 Z 1": {"00": 500, "11": 500},
+    }
+
+    def request(task_id: uuid.UUID, basis_counts: dict) -> ResultDef:
+        return ResultDef(
+            taskId=TaskId(root=task_id),
+            status=ResultStatus(root="SUCCESS"),
+            result=Result(None),
+            reason=None,
+            transpiledCode="OPENQASM 3;",
+            qubitAllocation=None,
+            basisCounts=basis_counts,
+        )
+
+    # Act
+    actual = create_result(request(uuid.UUID(int=0), basis_counts), db=test_db)
+    sampling = create_result(request(uuid.UUID(int=1), basis_counts), db=test_db)
+    batch = create_results(
+        CreateResultBatchRequest(
+            results=[
+                request(uuid.UUID(int=0), {"X 0 X 1": {"00": 1000}}),
+                request(uuid.UUID(int=1), {"X 0 X 1": {"00": 1000}}),
+                request(uuid.UUID(int=1), None),
+            ]
+        ),
+        db=test_db,
+    )
+
+    # Assert
+    assert actual == CreateResultResponse(message="success")
+    created = test_db.get(ResultModel, uuid.UUID(int=0).bytes)
+    # 1.5 * 0.6 + 1.0 * 1.0 + 0.5
+    assert json.loads(created.result) == pytest.approx([2.4, 0.0])
+    assert json.loads(created.basis_counts) == basis_counts
+    assert sampling.status_code == 400
+    # an invalid item is reported alone, and the valid ones are still stored
+    assert [(item.status.root, item.detail) for item in batch.results] == [
+        ("CONFLICT", None),
+        ("INVALID", "basisCounts is valid only for estimation tasks"),
+        ("CREATED", None),
+    ]
+    created = test_db.get(ResultModel, uuid.UUID(int=1).bytes)
+    assert created.basis_counts is None
+
+
+def test_encode_result():
+    # Act
+    histogram = encode_result(Result(SamplingResult({"00": 5020, "11": 4980})))
+    registers = encode_result(Result(SamplingResult({"00 1": 5020, "11 0": 4980})))
+    estimation = encode_result(Result(EstimationResult([1.5, 2.8])))
+
+    # Assert
+    assert histogram[0] is None
+    assert decode_histogram(histogram[1]) == {"00": 5020, "11": 4980}
+    assert registers == ('{"00 1":5020,"11 0":4980}', None)
+    assert estimation == ("[1.5,2.8]", None)
 
 
 # TODO: add invalid test cases
@@ -1,28 +1,53 @@
 import json
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Dict
 
+import pytest
+from oqtopus_cloud.common import long_poll
 from oqtopus_cloud.common.models.device import (
     Device,
 )
+from oqtopus_cloud.common.code_store import store_task_codes
+from oqtopus_cloud.common.models.fair_share import FairShare
 from oqtopus_cloud.common.models.task import (
     Task,
 )
+from oqtopus_cloud.common.models.task_event import TaskEvent
+from oqtopus_cloud.common.models.user_limit import UserLimit
+from oqtopus_cloud.common.pauli import (
+    OperatorFormatError,
+    compile_operator,
+    encode_operator,
+)
+from oqtopus_cloud.common.task_feed import (
+    GAP_GRACE,
+    RETENTION,
+    prune_events,
+    record_queued_tasks,
+)
 from oqtopus_cloud.provider.routers.tasks import (
+    claim_tasks,
     get_task,
+    get_task_code,
+    get_task_feed,
     get_tasks,
+    recreate_task_action,
+    requeue_expired_tasks,
     update_task,
 )
 from oqtopus_cloud.provider.schemas.tasks import (
     Action,
     InternalTaskStatus,
     SamplingAction,
+    TaskClaimRequest,
+    TaskCodeInfo,
     TaskId,
     TaskInfo,
     TaskStatusUpdate,
     TaskStatusUpdateResponse,
 )
+from sqlalchemy import select
 from zoneinfo import ZoneInfo
 
 # sqlite does not support jst timezone
@@ -100,6 +125,7 @@ def test_get_tasks(test_db):
         TaskInfo(
             taskId=TaskId(root=uuid.UUID("e8a60c14-8838-46c9-816a-30191d6ab517")),
             code='OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[2];\nh q[0];\ncx q[0], q[1];\nmeasure q[0] -> c[0];\nmeasure q[1] -> c[1];',
+            codeHash="044cc7bedf30b4e6daf5b1e8da9b8fbd32822a5f36d66bbe94f413bbe33ae9d5",
             device="SC2",
             nQubits=64,
             nNodes=112,
@@ -111,6 +137,7 @@ def test_get_tasks(test_db):
             roErrorMitigation=None,
             nPerNode=None,
             simulationOpt=None,
+            priority=0,
             status=InternalTaskStatus("QUEUED"),
             createdAt=datetime(2024, 3, 4, 12, 34, 56, tzinfo=jst),
         )
@@ -130,6 +157,7 @@ def test_get_task(test_db):
     expected = TaskInfo(
         taskId=TaskId(root=uuid.UUID("e8a60c14-8838-46c9-816a-30191d6ab517")),
         code='OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[2];\nh q[0];\ncx q[0], q[1];\nmeasure q[0] -> c[0];\nmeasure q[1] -> c[1];',
+        codeHash="044cc7bedf30b4e6daf5b1e8da9b8fbd32822a5f36d66bbe94f413bbe33ae9d5",
         device="SC2",
         nQubits=64,
         nNodes=112,
@@ -141,6 +169,7 @@ def test_get_task(test_db):
         roErrorMitigation=None,
         nPerNode=None,
         simulationOpt=None,
+        priority=0,
         status=InternalTaskStatus("QUEUED"),
         createdAt=datetime(2024, 3, 4, 12, 34, 56, tzinfo=jst),
     )
@@ -148,6 +177,56 @@ def test_get_task(test_db):
     assert actual == expected
 
 
+def test_get_task_fields(test_db):
+    # Arrange
+    test_db.add(_get_task_model(task_dict=None))
+    test_db.add(_get_device_model())
+    test_db.commit()
+    test_db.expire_all()
+    taskId = "e8a60c14-8838-46c9-816a-30191d6ab517"
+
+    # Act
+    actual = get_task(taskId=taskId, fields="action,status", db=test_db)
+    tasks = get_tasks(deviceId="SC2", fields="status", db=test_db)
+
+    # Assert
+    assert json.loads(actual.body) == {
+        "taskId": taskId,
+        "action": {"name": "sampling", "nShots": 1024},
+        "status": "QUEUED",
+    }
+    assert json.loads(tasks.body) == [{"taskId": taskId, "status": "QUEUED"}]
+
+
+def test_recreate_task_action_measurement_bases():
+    # Arrange
+    operator = '[["X 0 X 1", [1.5, 2.8]], ["Z 0", [1.0, 0.0]], ["X 1", [0.5, 0.0]]]'
+
+    def task(method: str, operator: str) -> Task:
+        return Task(action="estimation", method=method, shots=1000, operator=operator)
+
+    packed = task("sampling", None)
+    packed.packed_operator = encode_operator(
+        compile_operator([["Y 0", [1.0, 0.0]], ["Y 0 X 1", [0.5, 0.0]]])
+    )
+
+    # Act
+    sampling = recreate_task_action(task("sampling", operator))
+    state_vector = recreate_task_action(task("state_vector", operator))
+    packed_action = recreate_task_action(packed)
+
+    # Assert
+    assert sampling.measurementBases == ["X 0 X 1", "Z 0"]
+    assert state_vector.measurementBases is None
+    assert packed_action.operator.model_dump() == [
+        ["Y 0", [1.0, 0.0]],
+        ["Y 0 X 1", [0.5, 0.0]],
+    ]
+    assert packed_action.measurementBases == ["Y 0 X 1"]
+    with pytest.raises(OperatorFormatError):
+        recreate_task_action(task("sampling", '[["W 0", [1.0, 0.0]]]'))
+
+
 def test_update_task(test_db):
     task_dict = {
         "id": uuid.UUID("e8a60c14-8838-46c9-816a-30191d6ab517").bytes,
@@ -182,5 +261,456 @@ def test_update_task(test_db):
     assert actual == expected
 
 
+def _get_queued_task_models():
+    return [
+        _get_task_model(
+            task_dict={
+                "id": uuid.UUID(int=i).bytes,
+                "owner": "admin",
+                "code": "OPENQASM 2.0;",
+                "action": "sampling",
+                "shots": 1024,
+                "device": "SC2",
+                "qubit_allocation": None,
+                "simulation_opt": None,
+                "status": "QUEUED",
+                "created_at": datetime(2024, 3, 4, 12, 34, 50 + i),
+            }
+        )
+        for i in range(3)
+    ]
+
+
+def test_claim_tasks(test_db):
+    # Arrange
+    test_db.add(_get_device_model())
+    test_db.add_all(_get_queued_task_models())
+    test_db.commit()
+
+    # Act
+    first = claim_tasks(
+        request=TaskClaimRequest(deviceId="SC2", maxTasks=2, leaseSeconds=60),
+        db=test_db,
+    )
+    second = claim_tasks(
+        request=TaskClaimRequest(deviceId="SC2", maxTasks=2, leaseSeconds=60),
+        db=test_db,
+    )
+
+    # Assert
+    assert [task.taskId.root for task in first] == [uuid.UUID(int=0), uuid.UUID(int=1)]
+    assert [task.taskId.root for task in second] == [uuid.UUID(int=2)]
+    assert all(task.status.root == "RUNNING" for task in first + second)
+    claimed = test_db.get(Task, uuid.UUID(int=0).bytes)
+    assert claimed.status == "RUNNING"
+    assert claimed.lease_expires_at is not None
+    assert claim_tasks(request=TaskClaimRequest(deviceId="SC2"), db=test_db) == []
+
+
+def test_claim_tasks_fair_share(test_db):
+    # Arrange
+    tasks = [
+        _get_task_model(
+            task_dict={
+                "id": uuid.UUID(int=i).bytes,
+                "owner": owner,
+                "code": "OPENQASM 2.0;",
+                "action": "sampling",
+                "shots": 1024,
+                "device": "SC2",
+                "qubit_allocation": None,
+                "simulation_opt": None,
+                "priority": priority,
+                "status": "QUEUED",
+                "created_at": datetime(2024, 3, 4, 12, 34, i),
+            }
+        )
+        for i, (owner, priority) in enumerate(
+            [("alice", 0)] * 6 + [("bob", 0), ("bob", 5), ("carol", 0)]
+        )
+    ]
+    test_db.add_all(tasks)
+    test_db.add(FairShare(device="SC2", owner="alice", weight=2.0, virtual_time=0.0))
+    test_db.add(FairShare(device="SC2", owner="carol", weight=0.0, virtual_time=0.0))
+    # created by a concurrent claim that has not dispatched any task of bob yet
+    test_db.add(FairShare(device="SC2", owner="bob", weight=1.0))
+    test_db.commit()
+
+    # Act
+    preview = get_tasks(deviceId="SC2", status="QUEUED", maxResults=5, db=test_db)
+    first = claim_tasks(
+        request=TaskClaimRequest(deviceId="SC2", maxTasks=3), db=test_db
+    )
+    second = claim_tasks(
+        request=TaskClaimRequest(deviceId="SC2", maxTasks=3), db=test_db
+    )
+
+    # Assert
+    # alice gets two tasks for each task of bob, whose task with the higher priority
+    # goes first, and carol is suspended
+    expected = [uuid.UUID(int=i) for i in [7, 0, 1, 6, 2, 3]]
+    assert [task.taskId.root for task in preview] == expected[:5]
+    assert [task.taskId.root for task in first + second] == expected
+    share = test_db.get(FairShare, ("SC2", "bob"))
+    assert share.weight == 1.0
+    assert share.virtual_time == 1.5
+
+
+def test_claim_tasks_without_code(test_db):
+    # Arrange
+    test_db.add(_get_device_model())
+    tasks = _get_queued_task_models()
+    store_task_codes(test_db, tasks)
+    test_db.add_all(tasks)
+    test_db.commit()
+
+    # Act
+    claimed = claim_tasks(
+        request=TaskClaimRequest(deviceId="SC2", maxTasks=3, includeCode=False),
+        db=test_db,
+    )
+    code = get_task_code(codeHash=claimed[0].codeHash, db=test_db)
+    not_found = get_task_code(codeHash="00" * 32, db=test_db)
+    invalid = get_task_code(codeHash="invalid", db=test_db)
+
+    # Assert
+    assert [task.code for task in claimed] == [None, None, None]
+    assert len({task.codeHash for task in claimed}) == 1
+    assert code == TaskCodeInfo(codeHash=claimed[0].codeHash, code="OPENQASM 2.0;")
+    assert not_found.status_code == 404
+    assert invalid.status_code == 400
+
+
+def test_claim_tasks_requeues_expired_lease(test_db):
+    # Arrange
+    tasks = _get_queued_task_models()
+    tasks[0].status = "RUNNING"
+    tasks[0].lease_expires_at = datetime.now() - timedelta(seconds=1)
+    tasks[1].status = "RUNNING"
+    tasks[1].lease_expires_at = datetime.now() + timedelta(hours=1)
+    test_db.add(_get_device_model())
+    test_db.add_all(tasks)
+    test_db.commit()
+
+    # Act
+    actual = claim_tasks(
+        request=TaskClaimRequest(deviceId="SC2", maxTasks=10), db=test_db
+    )
+
+    # Assert
+    assert [task.taskId.root for task in actual] == [uuid.UUID(int=0), uuid.UUID(int=2)]
+
+
+def test_update_task_renews_lease(test_db):
+    # Arrange
+    test_db.add(_get_device_model())
+    test_db.add_all(_get_queued_task_models())
+    test_db.commit()
+    claimed = claim_tasks(
+        request=TaskClaimRequest(deviceId="SC2", maxTasks=2, leaseSeconds=1),
+        db=test_db,
+    )
+
+    # Act
+    renewed = update_task(
+        taskId=str(uuid.UUID(int=0)),
+        request=TaskStatusUpdate(
+            status="RUNNING", leaseSeconds=600, leaseToken=claimed[0].leaseToken
+        ),
+        db=test_db,
+    )
+    requeued = requeue_expired_tasks(
+        test_db, "SC2", datetime.now() + timedelta(seconds=60)
+    )
+    test_db.commit()
+
+    # Assert
+    assert renewed.message == "Task status updated"
+    assert requeued == 1
+    assert test_db.get(Task, uuid.UUID(int=0).bytes).status == "RUNNING"
+    assert test_db.get(Task, uuid.UUID(int=1).bytes).status == "QUEUED"
+    # a task that was not claimed has no lease to renew
+    update_task(
+        taskId=str(uuid.UUID(int=2)),
+        request=TaskStatusUpdate(status="RUNNING"),
+        db=test_db,
+    )
+    assert test_db.get(Task, uuid.UUID(int=2).bytes).lease_expires_at is None
+
+
+def test_update_task_rejects_stale_lease(test_db):
+    # Arrange
+    test_db.add(_get_device_model())
+    test_db.add_all(_get_queued_task_models())
+    test_db.commit()
+    task_id = str(uuid.UUID(int=0))
+    stale = claim_tasks(
+        request=TaskClaimRequest(deviceId="SC2", maxTasks=1, leaseSeconds=60),
+        db=test_db,
+    )[0]
+    task = test_db.get(Task, uuid.UUID(int=0).bytes)
+    task.lease_expires_at = datetime.now() - timedelta(seconds=1)
+    test_db.commit()
+
+    # Act
+    expired = update_task(
+        taskId=task_id,
+        request=TaskStatusUpdate(status="RUNNING", leaseToken=stale.leaseToken),
+        db=test_db,
+    )
+    # the task is requeued and claimed by another worker
+    current = claim_tasks(
+        request=TaskClaimRequest(deviceId="SC2", maxTasks=1, leaseSeconds=60),
+        db=test_db,
+    )[0]
+    lease_expires_at = test_db.get(Task, uuid.UUID(int=0).bytes).lease_expires_at
+    foreign = update_task(
+        taskId=task_id,
+        request=TaskStatusUpdate(
+            status="RUNNING", leaseSeconds=3600, leaseToken=stale.leaseToken
+        ),
+        db=test_db,
+    )
+    missing = update_task(
+        taskId=task_id, request=TaskStatusUpdate(status="RUNNING"), db=test_db
+    )
+
+    # Assert
+    assert expired.status_code == 409
+    assert current.taskId.root == uuid.UUID(int=0)
+    assert current.leaseToken != stale.leaseToken
+    assert foreign.status_code == 409
+    assert missing.status_code == 409
+    assert test_db.get(Task, uuid.UUID(int=0).bytes).lease_expires_at == (
+        lease_expires_at
+    )
+
+
+def test_requeue_expired_tasks(test_db):
+    # Arrange
+    tasks = _get_queued_task_models()
+    for task in tasks:
+        task.status = "RUNNING"
+        task.lease_expires_at = datetime(2024, 3, 4, 13, 0, 0)
+    tasks[2].lease_expires_at = None
+    test_db.add(_get_device_model())
+    test_db.add_all(tasks)
+    test_db.commit()
+
+    # Act
+    actual = requeue_expired_tasks(test_db, "SC2", datetime(2024, 3, 4, 14, 0, 0))
+    test_db.commit()
+
+    # Assert
+    assert actual == 2
+    assert test_db.get(Task, uuid.UUID(int=0).bytes).status == "QUEUED"
+    assert test_db.get(Task, uuid.UUID(int=0).bytes).lease_expires_at is None
+    assert test_db.get(Task, uuid.UUID(int=2).bytes).status == "RUNNING"
+    assert test_db.scalars(select(TaskEvent.task_id)).all() == [
+        uuid.UUID(int=0).bytes,
+        uuid.UUID(int=1).bytes,
+    ]
+
+
+def test_task_counters(test_db):
+    # Arrange
+    test_db.add(_get_device_model())
+    test_db.add_all(_get_queued_task_models())
+    test_db.add(UserLimit(owner="admin", queued_tasks=3))
+    test_db.commit()
+    limit = test_db.get(UserLimit, "admin")
+
+    # Act
+    claim_tasks(request=TaskClaimRequest(deviceId="SC2", maxTasks=2), db=test_db)
+    claimed = (limit.queued_tasks, limit.running_tasks)
+    update_task(
+        taskId=str(uuid.UUID(int=2)),
+        request=TaskStatusUpdate(status="RUNNING"),
+        db=test_db,
+    )
+    updated = (limit.queued_tasks, limit.running_tasks)
+    requeue_expired_tasks(test_db, "SC2", datetime.now() + timedelta(days=1))
+    test_db.commit()
+
+    # Assert
+    assert claimed == (1, 2)
+    assert updated == (0, 3)
+    # the task updated without a lease is not requeued
+    assert (limit.queued_tasks, limit.running_tasks) == (2, 1)
+
+
+def test_update_finished_task(test_db):
+    # Arrange
+    tasks = _get_queued_task_models()
+    tasks[0].status = "COMPLETED"
+    tasks[1].status = "CANCELLING"
+    test_db.add(_get_device_model())
+    test_db.add_all(tasks)
+    test_db.add(UserLimit(owner="admin", queued_tasks=1, running_tasks=1))
+    test_db.commit()
+    limit = test_db.get(UserLimit, "admin")
+
+    # Act
+    completed = update_task(
+        taskId=str(uuid.UUID(int=0)),
+        request=TaskStatusUpdate(status="RUNNING"),
+        db=test_db,
+    )
+    cancelling = update_task(
+        taskId=str(uuid.UUID(int=1)),
+        request=TaskStatusUpdate(status="RUNNING"),
+        db=test_db,
+    )
+
+    # Assert
+    assert completed.status_code == 409
+    assert cancelling.status_code == 409
+    assert test_db.get(Task, uuid.UUID(int=0).bytes).status == "COMPLETED"
+    assert test_db.get(Task, uuid.UUID(int=1).bytes).status == "CANCELLING"
+    assert (limit.queued_tasks, limit.running_tasks) == (1, 1)
+
+
+def test_get_task_feed(test_db, monkeypatch):
+    # Arrange
+    monkeypatch.setattr(long_poll.time, "sleep", lambda seconds: None)
+    head = get_task_feed(deviceId="SC2", db=test_db)
+    tasks = _get_queued_task_models()
+    test_db.add(_get_device_model())
+    test_db.add_all(tasks)
+    record_queued_tasks(test_db, tasks[:1])
+    test_db.add(
+        TaskEvent(
+            task_id=uuid.UUID(int=9).bytes,
+            device="Kawasaki",
+            created_at=datetime(2024, 3, 4, 12, 34, 50),
+        )
+    )
+    record_queued_tasks(test_db, tasks[1:])
+    test_db.commit()
+
+    # Act
+    first = get_task_feed(
+        deviceId="SC2", cursor=head.cursor, timeout=0, maxResults=2, db=test_db
+    )
+    second = get_task_feed(deviceId="SC2", cursor=first.cursor, timeout=0, db=test_db)
+    empty = get_task_feed(deviceId="SC2", cursor=second.cursor, timeout=0, db=test_db)
+    invalid = get_task_feed(deviceId="SC2", cursor=0, timeout=60, db=test_db)
+
+    # Assert
+    assert head.events == []
+    assert [event.taskId.root for event in first.events] == [
+        uuid.UUID(int=0),
+        uuid.UUID(int=1),
+    ]
+    assert first.cursor == first.events[-1].seq
+    assert [event.taskId.root for event in second.events] == [uuid.UUID(int=2)]
+    assert empty.events == []
+    assert empty.cursor == second.cursor
+    assert invalid.status_code == 400
+
+
+def test_get_task_feed_out_of_order_commit(test_db, monkeypatch):
+    # Arrange
+    monkeypatch.setattr(long_poll.time, "sleep", lambda seconds: None)
+    now = datetime.now()
+    old = now - GAP_GRACE - timedelta(seconds=1)
+
+    def add_events(*events):
+        test_db.add_all(
+            [
+                TaskEvent(
+                    seq=seq,
+                    task_id=uuid.UUID(int=seq).bytes,
+                    device=device,
+                    created_at=created_at,
+                )
+                for seq, device, created_at in events
+            ]
+        )
+        test_db.commit()
+
+    # seq 3 is allocated to a transaction that has not committed yet
+    add_events(
+        (1, "SC2", old), (2, "Kawasaki", old), (4, "SC2", now), (5, "Kawasaki", now)
+    )
+
+    # Act
+    first = get_task_feed(deviceId="SC2", cursor=0, timeout=0, db=test_db)
+    other = get_task_feed(deviceId="Kawasaki", cursor=0, timeout=0, db=test_db)
+    add_events((3, "SC2", now))
+    second = get_task_feed(deviceId="SC2", cursor=first.cursor, timeout=0, db=test_db)
+    # seq 6 is left by a rolled back transaction
+    add_events((7, "SC2", old))
+    third = get_task_feed(deviceId="SC2", cursor=second.cursor, timeout=0, db=test_db)
+
+    # Assert
+    assert [event.seq for event in first.events] == [1]
+    assert first.cursor == 1
+    assert [event.seq for event in other.events] == [2]
+    assert [event.seq for event in second.events] == [3, 4]
+    assert second.cursor == 4
+    assert [event.seq for event in third.events] == [7]
+
+
+def test_prune_events(test_db):
+    # Arrange
+    now = datetime.now()
+    test_db.add_all(
+        [
+            TaskEvent(
+                task_id=uuid.UUID(int=i).bytes,
+                device="SC2",
+                created_at=created_at,
+            )
+            for i, created_at in enumerate(
+                [now - RETENTION - timedelta(hours=1)] * 2 + [now]
+            )
+        ]
+    )
+    test_db.commit()
+
+    # Act
+    pruned = prune_events(test_db, now)
+    test_db.commit()
+
+    # Assert
+    assert pruned == 2
+    assert [
+        uuid.UUID(bytes=event.task_id) for event in test_db.scalars(select(TaskEvent))
+    ] == [uuid.UUID(int=2)]
+
+
+def test_get_tasks_uses_index(test_db, explain_task_queries):
+    # Act
+    plans = explain_task_queries(
+        lambda: get_tasks(
+            deviceId="Kawasaki",
+            status="QUEUED",
+            maxResults=10,
+            timestamp="2024-01-01T00:00:00+09:00",
+            db=test_db,
+        ),
+    )
+
+    # Assert
+    # the owners with queued tasks, then the tasks of each owner
+    assert len(plans) == 2
+    for plan in plans:
+        assert not any(detail.startswith("SCAN tasks") for detail in plan), plan
+
+
+def test_requeue_expired_tasks_uses_index(test_db, explain_task_queries):
+    # Act
+    plans = explain_task_queries(
+        lambda: requeue_expired_tasks(test_db, "SC2", datetime.now())
+    )
+
+    # Assert
+    assert len(plans) == 1
+    assert any(
+        "idx_tasks_device_status_lease_expires_at" in detail for detail in plans[0]
+    ), plans[0]
+
+
 # TODO: add invalid test cases
 # TODO: add test cases for handler
@@ -0,0 +1,62 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import oqtopus_cloud
+import pytest
+
+# The budget of a cold start of the entry points outside of Lambda. The module
+# count is the stable guard, the time only catches large regressions as it depends
+# on the machine running the tests.
+MAX_MODULES = 800
+MAX_IMPORT_SECONDS = 3.0
+
+# loaded lazily, only when they are used
+LAZY_MODULES = ["setuptools", "boto3", "aws_xray_sdk", "numpy"]
+
+SCRIPT = """
+import json
+import sys
+import time
+
+before = set(sys.modules)
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "modules": sorted(set(sys.modules) - before)}}))
+"""
+
+
+def import_entry_point(module: str) -> dict:
+    env = dict(os.environ)
+    env["ENV"] = "local"
+    env.pop("LAMBDA_TASK_ROOT", None)
+    completed = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(module=module)],
+        cwd=Path(oqtopus_cloud.__file__).parents[1],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "oqtopus_cloud.user.lambda_function",
+        "oqtopus_cloud.provider.lambda_function",
+    ],
+)
+def test_entry_point_startup_budget(module: str):
+    # Act
+    actual = import_entry_point(module)
+
+    # Assert
+    assert len(actual["modules"]) <= MAX_MODULES
+    assert actual["elapsed"] <= MAX_IMPORT_SECONDS
+    for lazy in LAZY_MODULES:
+        assert lazy not in actual["modules"]
@@ -6,6 +6,7 @@ from typing import (
 )
 
 import pytest
+from oqtopus_cloud.common.device_cache import device_cache
 from oqtopus_cloud.common.models.base import (
     Base,
 )
@@ -162,6 +163,7 @@ def test_db() -> (
 
     app.dependency_overrides[get_db] = get_db_for_testing
     insert_initial_data(db)
+    device_cache.invalidate()
 
     yield db
 
@@ -0,0 +1,202 @@
+import asyncio
+import json
+import threading
+import uuid
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import AsyncIterator
+
+import pytest
+from fastapi import Response
+from oqtopus_cloud.common.device_cache import device_cache
+from oqtopus_cloud.common.histogram import encode_histogram
+from oqtopus_cloud.common.models.base import Base
+from oqtopus_cloud.common.models.result import Result as ResultModel
+
+pytest.importorskip("greenlet")
+
+from oqtopus_cloud.user.routers import async_reads  # noqa: E402
+from oqtopus_cloud.user.routers.async_reads import (  # noqa: E402
+    get_device,
+    get_estimation_task_status,
+    get_sampling_result,
+    get_sampling_task_status,
+    list_devices,
+)
+from sqlalchemy.ext.asyncio import (  # noqa: E402
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from tests.oqtopus_cloud.user.conftest import insert_initial_data  # noqa: E402
+
+TASK_ID = "7af020f6-2e38-4d70-8cf0-4349650ea08c"
+
+
+@asynccontextmanager
+async def async_test_db() -> AsyncIterator[AsyncSession]:
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db = async_sessionmaker(bind=engine, expire_on_commit=False)()
+    await db.run_sync(insert_initial_data)
+    device_cache.invalidate()
+    try:
+        yield db
+    finally:
+        await db.close()
+        await engine.dispose()
+        device_cache.invalidate()
+
+
+def test_list_devices():
+    # Arrange
+    async def scenario():
+        async with async_test_db() as db:
+            response = Response()
+            devices = await list_devices(response, db)
+            etag = response.headers["ETag"]
+            not_modified = await list_devices(Response(), db, if_none_match=etag)
+            return devices, not_modified
+
+    # Act
+    devices, not_modified = asyncio.run(scenario())
+
+    # Assert
+    assert [device.deviceId for device in devices] == ["Kawasaki"]
+    assert devices[0].basisGates == ["sx", "rx", "rzx90", "id"]
+    assert not_modified.status_code == 304
+
+
+def test_get_device():
+    # Arrange
+    async def scenario():
+        async with async_test_db() as db:
+            found = await get_device("Kawasaki", Response(), db)
+            not_found = await get_device("Unknown", Response(), db)
+            return found, not_found
+
+    # Act
+    found, not_found = asyncio.run(scenario())
+
+    # Assert
+    assert found.deviceId == "Kawasaki"
+    assert not_found.status_code == 404
+
+
+def test_get_task_status():
+    # Arrange
+    event = SimpleNamespace(state=SimpleNamespace(owner="admin"))
+    other = SimpleNamespace(state=SimpleNamespace(owner="other"))
+
+    async def scenario():
+        async with async_test_db() as db:
+            return (
+                await get_sampling_task_status(event, TASK_ID, Response(), db),
+                await get_estimation_task_status(event, TASK_ID, Response(), db),
+                await get_sampling_task_status(other, TASK_ID, Response(), db),
+                await get_sampling_task_status(event, "invalid", Response(), db),
+            )
+
+    # Act
+    status, wrong_action, wrong_owner, invalid = asyncio.run(scenario())
+
+    # Assert
+    assert str(status.taskId.root) == TASK_ID
+    assert status.status.root == "COMPLETED"
+    assert wrong_action.status_code == 404
+    assert wrong_owner.status_code == 404
+    assert invalid.status_code == 400
+
+
+def test_get_task_status_error():
+    # Arrange
+    event = SimpleNamespace(state=SimpleNamespace(owner="admin"))
+
+    async def fail(*args, **kwargs):
+        raise RuntimeError("connection lost")
+
+    async def scenario():
+        async with async_test_db() as db:
+            db.scalars = fail
+            return (
+                await get_sampling_task_status(event, TASK_ID, Response(), db),
+                await get_estimation_task_status(event, TASK_ID, Response(), db),
+            )
+
+    # Act
+    sampling, estimation = asyncio.run(scenario())
+
+    # Assert
+    assert sampling.status_code == 500
+    assert json.loads(sampling.body)["detail"] == "connection lost"
+    assert estimation.status_code == 500
+
+
+def test_get_sampling_result():
+    # Arrange
+    event = SimpleNamespace(state=SimpleNamespace(owner="admin"))
+
+    async def scenario():
+        async with async_test_db() as db:
+            db.add(
+                ResultModel(
+                    task_id=uuid.UUID(TASK_ID).bytes,
+                    status="SUCCESS",
+                    packed_result=encode_histogram({"00": 5020, "11": 4980}),
+                    transpiled_code="OPENQASM 3;",
+                )
+            )
+            await db.commit()
+            response = Response()
+            result = await get_sampling_result(event, TASK_ID, response, db)
+            etag = response.headers["ETag"]
+            not_modified = await get_sampling_result(
+                event, TASK_ID, Response(), db, if_none_match=etag
+            )
+            return result, not_modified
+
+    # Act
+    result, not_modified = asyncio.run(scenario())
+
+    # Assert
+    assert result.result == {"00": 5020, "11": 4980}
+    assert not_modified.status_code == 304
+
+
+def test_get_sampling_result_in_threadpool(monkeypatch):
+    # Arrange
+    event = SimpleNamespace(state=SimpleNamespace(owner="admin"))
+    threads = []
+    create_sampling_result = async_reads.create_sampling_result
+
+    def record_thread(*args, **kwargs):
+        threads.append(threading.get_ident())
+        return create_sampling_result(*args, **kwargs)
+
+    monkeypatch.setattr(async_reads, "create_sampling_result", record_thread)
+
+    async def scenario():
+        async with async_test_db() as db:
+            db.add(
+                ResultModel(
+                    task_id=uuid.UUID(TASK_ID).bytes,
+                    status="SUCCESS",
+                    packed_result=encode_histogram({"00": 5020, "11": 4980}),
+                    transpiled_code="OPENQASM 3;",
+                )
+            )
+            await db.commit()
+            result = await get_sampling_result(event, TASK_ID, Response(), db)
+            return result, threading.get_ident()
+
+    # Act
+    result, loop_thread = asyncio.run(scenario())
+
+    # Assert
+    # the result is not decoded on the thread of the event loop
+    assert result.result == {"00": 5020, "11": 4980}
+    assert len(threads) == 1
+    assert threads[0] != loop_thread
@@ -2,12 +2,18 @@ import json
 from datetime import datetime
 from typing import Dict
 
+from fastapi import Response
 from fastapi.testclient import TestClient
+from oqtopus_cloud.common.device_cache import DeviceCatalogCache, device_cache
 from oqtopus_cloud.common.models.device import (
     Device,
 )
 from oqtopus_cloud.user.lambda_function import app
-from oqtopus_cloud.user.routers.devices import get_device, model_to_schema
+from oqtopus_cloud.user.routers.devices import (
+    get_device,
+    list_devices,
+    model_to_schema,
+)
 from oqtopus_cloud.user.schemas.devices import CalibrationData, DeviceInfo
 from zoneinfo import ZoneInfo
 
@@ -71,7 +77,7 @@ def test_get_device(test_db):
     test_db.commit()
 
     # Act
-    actual = get_device("SVSim", test_db)
+    actual = get_device("SVSim", Response(), test_db)
 
     # Assert
     expected = DeviceInfo(
@@ -142,6 +148,114 @@ def test_get_device_hadler(test_db):
     assert actual.json() == expected
 
 
+def test_list_devices(test_db):
+    # Arrange
+    test_db.add(_get_model())
+    test_db.commit()
+
+    # Act
+    actual = list_devices(Response(), test_db)
+
+    # Assert
+    assert [device.deviceId for device in actual] == ["Kawasaki", "SVSim"]
+    assert actual[1] == model_to_schema(_get_model())
+
+
+def test_get_devices_not_modified(test_db):
+    # Arrange
+    test_db.add(_get_model())
+    test_db.commit()
+    etag = client.get("/devices").headers["ETag"]
+    device_etag = client.get("/devices/SVSim").headers["ETag"]
+
+    # Act
+    not_modified = client.get("/devices", headers={"If-None-Match": etag})
+    device_not_modified = client.get(
+        "/devices/SVSim", headers={"If-None-Match": device_etag}
+    )
+    device = test_db.get(Device, "SVSim")
+    device.version = device.version + 1
+    test_db.commit()
+    device_cache.invalidate("SVSim")
+    modified = client.get("/devices", headers={"If-None-Match": etag})
+
+    # Assert
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == etag
+    assert not_modified.content == b""
+    assert device_not_modified.status_code == 304
+    assert etag != device_etag
+    assert modified.status_code == 200
+    assert modified.headers["ETag"] != etag
+    assert len(modified.json()) == 2
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_device_catalog_cache(test_db):
+    # Arrange
+    clock = FakeClock()
+    cache = DeviceCatalogCache(ttl=5, clock=clock)
+    built = []
+
+    def build(device):
+        built.append(device.id)
+        return model_to_schema(device)
+
+    test_db.add(_get_model())
+    test_db.commit()
+    cache.list(test_db, build)
+    built.clear()
+
+    # Act: cached within the TTL
+    test_db.get(Device, "SVSim").pending_tasks = 3
+    test_db.commit()
+    clock.now = 4
+    cached = cache.get(test_db, "SVSim", build)
+
+    # Act: revalidated after the TTL, nothing is rebuilt until the version changes
+    clock.now = 6
+    unchanged = cache.get(test_db, "SVSim", build)
+    built_unchanged = list(built)
+    device = test_db.get(Device, "SVSim")
+    device.version = device.version + 1
+    test_db.commit()
+    clock.now = 12
+    changed = cache.list(test_db, build)
+
+    # Assert
+    assert cached.nPendingTasks == 8
+    assert unchanged.nPendingTasks == 8
+    assert built_unchanged == []
+    assert built == ["SVSim"]
+    assert changed[1].nPendingTasks == 3
+    assert cache.get(test_db, "unknown", build) is None
+
+
+def test_device_catalog_cache_invalidate(test_db):
+    # Arrange
+    clock = FakeClock()
+    cache = DeviceCatalogCache(ttl=5, clock=clock)
+    cache.list(test_db, model_to_schema)
+    test_db.add(_get_model())
+    test_db.commit()
+
+    # Act
+    cached = cache.list(test_db, model_to_schema)
+    cache.invalidate("SVSim")
+    invalidated = cache.list(test_db, model_to_schema)
+
+    # Assert
+    assert [device.deviceId for device in cached] == ["Kawasaki"]
+    assert [device.deviceId for device in invalidated] == ["Kawasaki", "SVSim"]
+
+
 """
 def test_get_task_404(
     test_db,
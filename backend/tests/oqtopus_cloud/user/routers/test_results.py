@@ -0,0 +1,211 @@
+import asyncio
+import json
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Response
+from oqtopus_cloud.common.device_cache import device_cache
+from oqtopus_cloud.common.histogram import encode_histogram
+from oqtopus_cloud.common.models.device import Device
+from oqtopus_cloud.common.models.result import Result as ResultModel
+from oqtopus_cloud.common.models.task import Task
+from oqtopus_cloud.user.routers.results import (
+    create_sampling_result,
+    get_sampling_result,
+    get_sampling_result_stream,
+    iter_sampling_result_entries,
+)
+from oqtopus_cloud.user.schemas.results import ResultStatus, SamplingResultDef
+from oqtopus_cloud.user.schemas.tasks import TaskId
+
+
+def _get_result_model(**kwargs):
+    result_dict = {
+        "task_id": uuid.UUID("7af020f6-2e38-4d70-8cf0-4349650ea08c").bytes,
+        "status": "SUCCESS",
+        "result": None,
+        "packed_result": None,
+        "reason": None,
+        "transpiled_code": "OPENQASM 3;",
+        "qubit_allocation": '{"0": 0, "1": 4}',
+    }
+    result_dict.update(kwargs)
+    return ResultModel(**result_dict)
+
+
+def test_create_sampling_result():
+    # Arrange
+    expected = SamplingResultDef(
+        taskId=TaskId(uuid.UUID("7af020f6-2e38-4d70-8cf0-4349650ea08c")),
+        status=ResultStatus(root="SUCCESS"),
+        result={"00": 5020, "11": 4980},
+        reason=None,
+        transpiledCode="OPENQASM 3;",
+        qubitAllocation={"0": 0, "1": 4},
+    )
+
+    # Act
+    packed = create_sampling_result(
+        _get_result_model(packed_result=encode_histogram({"11": 4980, "00": 5020}))
+    )
+    text = create_sampling_result(_get_result_model(result='{"00": 5020, "11": 4980}'))
+
+    # Assert
+    assert packed == expected
+    assert text == expected
+
+
+def test_iter_sampling_result_entries():
+    # Arrange
+    counts = {"000": 10, "001": 500, "010": 3, "011": 250, "111": 237}
+    packed = _get_result_model(packed_result=encode_histogram(counts))
+    text = _get_result_model(result=json.dumps(counts))
+
+    # Act & Assert
+    for result in [packed, text]:
+        assert dict(iter_sampling_result_entries(result)) == counts
+        assert list(iter_sampling_result_entries(result, top_k=2)) == [
+            ("001", 500),
+            ("011", 250),
+        ]
+        assert dict(iter_sampling_result_entries(result, min_count=237)) == {
+            "001": 500,
+            "011": 250,
+            "111": 237,
+        }
+    assert list(iter_sampling_result_entries(_get_result_model(status="FAILURE"))) == []
+
+
+async def _read_body(response) -> bytes:
+    return b"".join([chunk async for chunk in response.body_iterator])
+
+
+def test_get_sampling_result_stream(test_db):
+    # Arrange
+    test_db.add(
+        _get_result_model(packed_result=encode_histogram({"00": 5020, "11": 4980}))
+    )
+    test_db.commit()
+    event = SimpleNamespace(state=SimpleNamespace(owner="admin"))
+
+    # Act
+    response = get_sampling_result_stream(
+        event=event, taskId="7af020f6-2e38-4d70-8cf0-4349650ea08c", db=test_db
+    )
+    lines = asyncio.run(_read_body(response)).decode().splitlines()
+
+    # Assert
+    assert response.media_type == "application/x-ndjson"
+    assert json.loads(lines[0]) == {
+        "taskId": "7af020f6-2e38-4d70-8cf0-4349650ea08c",
+        "status": "SUCCESS",
+        "reason": None,
+        "transpiledCode": "OPENQASM 3;",
+        "qubitAllocation": {"0": 0, "1": 4},
+    }
+    assert [json.loads(line) for line in lines[1:]] == [["00", 5020], ["11", 4980]]
+
+
+def test_get_sampling_result_stream_invalid_params(test_db):
+    # Arrange
+    event = SimpleNamespace(state=SimpleNamespace(owner="admin"))
+    task_id = "7af020f6-2e38-4d70-8cf0-4349650ea08c"
+
+    # Act & Assert
+    assert (
+        get_sampling_result_stream(event=event, taskId="x", db=test_db).status_code
+        == 400
+    )
+    assert (
+        get_sampling_result_stream(
+            event=event, taskId=task_id, topK=0, db=test_db
+        ).status_code
+        == 400
+    )
+    assert (
+        get_sampling_result_stream(event=event, taskId=task_id, db=test_db).status_code
+        == 404
+    )
+
+
+def test_get_sampling_result_not_modified(test_db):
+    # Arrange
+    test_db.add(_get_result_model(packed_result=encode_histogram({"00": 5020})))
+    test_db.commit()
+    event = SimpleNamespace(state=SimpleNamespace(owner="admin"))
+    task_id = "7af020f6-2e38-4d70-8cf0-4349650ea08c"
+    response = Response()
+    result = get_sampling_result(event, task_id, response, test_db)
+    etag = response.headers["ETag"]
+
+    # Act
+    not_modified = get_sampling_result(
+        event, task_id, Response(), test_db, if_none_match=etag
+    )
+    modified = get_sampling_result(
+        event, task_id, Response(), test_db, if_none_match='"other"'
+    )
+
+    # Assert
+    assert result.result == {"00": 5020}
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == etag
+    assert modified == result
+
+
+def test_get_sampling_result_mitigated(test_db):
+    # Arrange
+    device = test_db.get(Device, "Kawasaki")
+    device.calibration_data = json.dumps(
+        {
+            "measProb0As1": {"0": 0.01, "4": 0.02},
+            "measProb1As0": {"0": 0.03, "4": 0.05},
+        }
+    )
+    device.version = 1
+    task = test_db.get(Task, uuid.UUID("7af020f6-2e38-4d70-8cf0-4349650ea08c").bytes)
+    task.ro_error_mitigation = "least_square"
+    test_db.add(_get_result_model(result='{"00": 5020, "01": 30, "11": 4950}'))
+    test_db.commit()
+    device_cache.invalidate()
+    event = SimpleNamespace(state=SimpleNamespace(owner="admin"))
+    task_id = "7af020f6-2e38-4d70-8cf0-4349650ea08c"
+    response = Response()
+
+    # Act
+    result = get_sampling_result(event, task_id, response, test_db)
+
+    # Assert
+    assert result.result == {"00": 5020, "01": 30, "11": 4950}
+    assert set(result.mitigatedResult) <= {"00", "01", "10", "11"}
+    assert result.mitigatedResult["11"] > 4950
+    assert min(result.mitigatedResult.values()) > 0
+    assert sum(result.mitigatedResult.values()) == pytest.approx(10000)
+
+    # the ETag changes with the calibration data
+    device.version = 2
+    test_db.commit()
+    device_cache.invalidate()
+    etag = response.headers["ETag"]
+    assert get_sampling_result(
+        event, task_id, Response(), test_db, if_none_match=etag
+    ).mitigatedResult
+
+
+def test_get_sampling_result_not_mitigated_without_calibration(test_db):
+    # Arrange
+    task = test_db.get(Task, uuid.UUID("7af020f6-2e38-4d70-8cf0-4349650ea08c").bytes)
+    task.ro_error_mitigation = "pseudo_inverse"
+    test_db.add(_get_result_model(result='{"00": 5020, "11": 4980}'))
+    test_db.commit()
+    event = SimpleNamespace(state=SimpleNamespace(owner="admin"))
+
+    # Act
+    result = get_sampling_result(
+        event, "7af020f6-2e38-4d70-8cf0-4349650ea08c", Response(), test_db
+    )
+
+    # Assert
+    assert result.result == {"00": 5020, "11": 4980}
+    assert result.mitigatedResult is None
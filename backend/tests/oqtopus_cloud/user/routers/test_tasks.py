@@ -1,3 +1,44 @@
+import json
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from fastapi import Response
+from sqlalchemy import event, select
+from sqlalchemy.dialects import mysql
+from oqtopus_cloud.common import long_poll
+from oqtopus_cloud.common.histogram import encode_histogram
+from oqtopus_cloud.common.models.device import Device
+from oqtopus_cloud.common.models.result import Result
+from oqtopus_cloud.common.models.task import Task
+from oqtopus_cloud.common.models.task_code import TaskCode
+from oqtopus_cloud.common.models.user_limit import UserLimit
+from oqtopus_cloud.user.routers import tasks as tasks_router
+from oqtopus_cloud.user.routers.tasks import (
+    NEXT_CURSOR_HEADER,
+    batch_get_task_status,
+    cancel_sampling_task,
+    create_estimation_task_info,
+    get_sampling_task,
+    get_sampling_task_status,
+    get_sampling_tasks,
+    parse_timestamp,
+    submit_estimation_tasks,
+    submit_estimation_tasks_batch,
+    serialize_operator,
+    submit_sampling_tasks,
+    submit_sampling_tasks_batch,
+    wait_sampling_task,
+)
+from oqtopus_cloud.user.schemas.tasks import (
+    EstimationTaskBatchDef,
+    EstimationTaskDef,
+    Operator,
+    SamplingTaskBatchDef,
+    SamplingTaskDef,
+    TaskStatusBatchGetRequest,
+)
+
 # from api.common.models.device import (
 #     Device,
 # )
@@ -124,3 +165,613 @@
 #     )
 #     response = client.post("/tasks", content=body.model_dump_json())
 #     assert response.status_code == 201
+
+
+def _get_event(owner="admin"):
+    return SimpleNamespace(state=SimpleNamespace(owner=owner))
+
+
+def test_get_sampling_tasks_pagination(test_db):
+    # Arrange
+    first_response = Response()
+    second_response = Response()
+
+    # Act
+    first = get_sampling_tasks(
+        event=_get_event(), response=first_response, limit=1, db=test_db
+    )
+    cursor = first_response.headers[NEXT_CURSOR_HEADER]
+    second = get_sampling_tasks(
+        event=_get_event(),
+        response=second_response,
+        limit=1,
+        cursor=cursor,
+        db=test_db,
+    )
+
+    # Assert
+    assert [task.taskId.root for task in first] == [
+        uuid.UUID("7af020f6-2e38-4d70-8cf0-4349650ea08c")
+    ]
+    assert [task.taskId.root for task in second] == [
+        uuid.UUID("7af020f6-2e38-4d70-8cf0-4349650ea08d")
+    ]
+    assert NEXT_CURSOR_HEADER not in second_response.headers
+
+
+def test_get_sampling_tasks_status_filter(test_db):
+    # Act
+    actual = get_sampling_tasks(
+        event=_get_event(), response=Response(), status="QUEUED", db=test_db
+    )
+
+    # Assert
+    assert [task.status.root for task in actual] == ["QUEUED"]
+
+
+def test_get_sampling_tasks_time_filter(test_db):
+    # Act
+    # the tasks were created at 2024-03-04T12:34:56 JST
+    naive = get_sampling_tasks(
+        event=_get_event(),
+        response=Response(),
+        since="2024-03-04T12:34:56",
+        until="2024-03-04T12:34:57",
+        db=test_db,
+    )
+    utc = get_sampling_tasks(
+        event=_get_event(),
+        response=Response(),
+        since="2024-03-04T03:34:57+00:00",
+        db=test_db,
+    )
+
+    # Assert
+    assert len(naive) == 2
+    assert utc == []
+
+
+def test_parse_timestamp():
+    # Act & Assert
+    assert parse_timestamp("2024-03-04T12:34:56") == datetime(
+        2024, 3, 4, 12, 34, 56, tzinfo=tasks_router.jst
+    )
+    assert parse_timestamp("2024-03-04T03:34:56Z") == datetime(
+        2024, 3, 4, 12, 34, 56, tzinfo=tasks_router.jst
+    )
+    assert parse_timestamp("2024-03-04T03:34:56Z").tzinfo is tasks_router.jst
+
+
+def test_get_sampling_tasks_invalid_cursor(test_db):
+    # Act
+    actual = get_sampling_tasks(
+        event=_get_event(), response=Response(), cursor="invalid", db=test_db
+    )
+
+    # Assert
+    assert actual.status_code == 400
+
+
+def test_get_sampling_task_status_not_modified(test_db):
+    # Arrange
+    task_id = "7af020f6-2e38-4d70-8cf0-4349650ea08d"
+    response = Response()
+    get_sampling_task_status(_get_event(), task_id, response, test_db)
+    etag = response.headers["ETag"]
+
+    # Act
+    not_modified = get_sampling_task_status(
+        _get_event(), task_id, Response(), test_db, if_none_match=etag
+    )
+    test_db.get(Task, uuid.UUID(task_id).bytes).status = "RUNNING"
+    test_db.commit()
+    modified_response = Response()
+    modified = get_sampling_task_status(
+        _get_event(), task_id, modified_response, test_db, if_none_match=etag
+    )
+
+    # Assert
+    assert not_modified.status_code == 304
+    assert modified.status.root == "RUNNING"
+    assert modified_response.headers["ETag"] != etag
+
+
+def test_get_sampling_task_status_error(test_db, monkeypatch):
+    # Arrange
+    def fail(*args, **kwargs):
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(test_db, "scalars", fail)
+
+    # Act
+    actual = get_sampling_task_status(
+        _get_event(), "7af020f6-2e38-4d70-8cf0-4349650ea08d", Response(), test_db
+    )
+
+    # Assert
+    assert actual.status_code == 500
+    assert json.loads(actual.body)["detail"] == "connection lost"
+
+
+def test_batch_get_task_status(test_db):
+    # Arrange
+    test_db.add(
+        Task(
+            id=uuid.UUID("7af020f6-2e38-4d70-8cf0-4349650ea08e").bytes,
+            owner="other",
+            device="Kawasaki",
+            code="OPENQASM 3;",
+            action="estimation",
+            shots=1024,
+            status="RUNNING",
+            qubit_allocation=None,
+            simulation_opt=None,
+            created_at=datetime(2024, 3, 4, 12, 34, 56),
+        )
+    )
+    test_db.commit()
+    request = TaskStatusBatchGetRequest(
+        taskIds=[
+            "7af020f6-2e38-4d70-8cf0-4349650ea08c",
+            "7af020f6-2e38-4d70-8cf0-4349650ea08d",
+            "7af020f6-2e38-4d70-8cf0-4349650ea08e",
+            "7af020f6-2e38-4d70-8cf0-4349650ea08f",
+        ]
+    )
+
+    # Act
+    actual = batch_get_task_status(_get_event(), request, test_db)
+
+    # Assert
+    assert actual.model_dump(mode="json") == {
+        "statuses": {
+            "7af020f6-2e38-4d70-8cf0-4349650ea08c": "COMPLETED",
+            "7af020f6-2e38-4d70-8cf0-4349650ea08d": "QUEUED",
+        }
+    }
+
+
+def test_wait_sampling_task(test_db, monkeypatch):
+    # Arrange
+    task_id = "7af020f6-2e38-4d70-8cf0-4349650ea08d"
+    sleeps = []
+
+    def complete_task(seconds):
+        # the provider completes the task while the user waits
+        sleeps.append(seconds)
+        test_db.get(Task, uuid.UUID(task_id).bytes).status = "COMPLETED"
+        test_db.add(
+            Result(
+                task_id=uuid.UUID(task_id).bytes,
+                status="SUCCESS",
+                result=None,
+                packed_result=encode_histogram({"00": 5020, "11": 4980}),
+                reason=None,
+                transpiled_code="",
+                qubit_allocation=None,
+            )
+        )
+        test_db.commit()
+
+    monkeypatch.setattr(long_poll.time, "sleep", complete_task)
+
+    # Act
+    actual = wait_sampling_task(_get_event(), task_id, timeout=10, db=test_db)
+
+    # Assert
+    assert sleeps == [long_poll.INITIAL_INTERVAL]
+    assert actual.status.root == "COMPLETED"
+    assert actual.result.result == {"00": 5020, "11": 4980}
+
+
+def test_wait_sampling_task_timeout(test_db, monkeypatch):
+    # Arrange
+    monkeypatch.setattr(long_poll.time, "sleep", lambda seconds: None)
+    task_id = "7af020f6-2e38-4d70-8cf0-4349650ea08d"
+
+    # Act
+    actual = wait_sampling_task(_get_event(), task_id, timeout=0, db=test_db)
+    invalid = wait_sampling_task(_get_event(), task_id, timeout=60, db=test_db)
+    not_found = wait_sampling_task(_get_event("other"), task_id, timeout=0, db=test_db)
+
+    # Assert
+    assert actual.status.root == "QUEUED"
+    assert actual.result is None
+    assert invalid.status_code == 400
+    assert not_found.status_code == 404
+
+
+def test_get_sampling_tasks_uses_index(test_db, explain_task_queries):
+    # Arrange
+    first_response = Response()
+    get_sampling_tasks(event=_get_event(), response=first_response, limit=1, db=test_db)
+    cursor = first_response.headers[NEXT_CURSOR_HEADER]
+
+    # Act
+    plans = explain_task_queries(
+        lambda: get_sampling_tasks(
+            event=_get_event(),
+            response=Response(),
+            limit=1,
+            cursor=cursor,
+            status="QUEUED",
+            device="Kawasaki",
+            since="2024-01-01T00:00:00+09:00",
+            db=test_db,
+        ),
+    )
+
+    # Assert
+    assert len(plans) == 1
+    for plan in plans:
+        assert not any(detail.startswith("SCAN tasks") for detail in plan), plan
+
+
+def test_get_sampling_tasks_fields(test_db):
+    # Arrange
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = test_db.get_bind()
+    test_db.expire_all()
+
+    # Act
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        actual = get_sampling_tasks(
+            event=_get_event(),
+            response=Response(),
+            fields="status, createdAt",
+            db=test_db,
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    # Assert
+    tasks = json.loads(actual.body)
+    assert [task["taskId"] for task in tasks] == [
+        "7af020f6-2e38-4d70-8cf0-4349650ea08c",
+        "7af020f6-2e38-4d70-8cf0-4349650ea08d",
+    ]
+    assert all(task.keys() == {"taskId", "status", "createdAt"} for task in tasks)
+    assert len(statements) == 1
+    assert "tasks.code" not in statements[0]
+    assert "tasks.simulation_opt" not in statements[0]
+
+
+def test_get_sampling_task_fields(test_db):
+    # Act
+    actual = get_sampling_task(
+        event=_get_event(),
+        taskId="7af020f6-2e38-4d70-8cf0-4349650ea08c",
+        fields="codeHash",
+        db=test_db,
+    )
+    invalid = get_sampling_task(
+        event=_get_event(),
+        taskId="7af020f6-2e38-4d70-8cf0-4349650ea08c",
+        fields="status,unknown",
+        db=test_db,
+    )
+
+    # Assert
+    assert json.loads(actual.body).keys() == {"taskId", "codeHash"}
+    assert invalid.status_code == 400
+
+
+def _get_simulator_model():
+    return Device(
+        id="SVSim",
+        device_type="simulator",
+        status="AVAILABLE",
+        restart_at=datetime(2024, 3, 4, 12, 34, 56),
+        pending_tasks=0,
+        n_qubits=39,
+        n_nodes=512,
+        basis_gates='["x", "sx", "rz", "cx"]',
+        instructions='["measure", "barrier", "reset"]',
+        calibration_data="{}",
+        calibrated_at=datetime(2024, 3, 4, 12, 34, 56),
+        description="State vector-based quantum circuit simulator",
+    )
+
+
+def test_submit_sampling_tasks_batch(test_db):
+    # Arrange
+    test_db.add(_get_simulator_model())
+    test_db.commit()
+    request = SamplingTaskBatchDef(
+        tasks=[
+            SamplingTaskDef(code="OPENQASM 3;", device="SVSim", nShots=1000),
+            SamplingTaskDef(code="OPENQASM 3;", device="SVSim", nShots=2000),
+            SamplingTaskDef(code="OPENQASM 3;", device="Kawasaki", nShots=1000),
+            SamplingTaskDef(code="OPENQASM 3;", device="Unknown", nShots=1000),
+            SamplingTaskDef(
+                code="OPENQASM 3;", device="SVSim", nShots=1000, nQubits=64
+            ),
+        ]
+    )
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    # Act
+    engine = test_db.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        actual = submit_sampling_tasks_batch(
+            event=_get_event(), request=request, db=test_db
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    # Assert
+    assert [item.status is not None for item in actual.results] == [
+        True,
+        True,
+        False,
+        False,
+        False,
+    ]
+    assert [item.detail for item in actual.results[2:]] == [
+        "device Kawasaki is not available",
+        "device not found",
+        "Requested nQubits: 64 exceeds limit for device SVSim (limit = 39)",
+    ]
+    assert len([s for s in statements if s.startswith("INSERT INTO tasks")]) == 1
+    assert not any(s.startswith("SELECT") and "FROM tasks" in s for s in statements)
+    created = test_db.get(Task, actual.results[1].taskId.root.bytes)
+    assert created.owner == "admin"
+    assert created.shots == 2000
+    assert created.status == "QUEUED"
+
+
+def test_submitted_code_is_deduplicated(test_db):
+    # Arrange
+    test_db.add(_get_simulator_model())
+    test_db.commit()
+    code = "OPENQASM 3; qubit[2] q; h q[0]; cnot q[0], q[1];"
+    sweep = SamplingTaskBatchDef(
+        tasks=[
+            SamplingTaskDef(code=code, device="SVSim", nShots=shots)
+            for shots in (1000, 2000, 3000)
+        ]
+    )
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "task_codes" in statement:
+            statements.append((statement, str(parameters)))
+
+    # Act
+    engine = test_db.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        submit_sampling_tasks_batch(event=_get_event(), request=sweep, db=test_db)
+        submit_sampling_tasks_batch(event=_get_event(), request=sweep, db=test_db)
+        with_code = get_sampling_tasks(
+            event=_get_event(), response=Response(), device="SVSim", db=test_db
+        )
+        without_code = get_sampling_tasks(
+            event=_get_event(),
+            response=Response(),
+            device="SVSim",
+            includeCode=False,
+            db=test_db,
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    # Assert
+    inserts = [
+        parameters for statement, parameters in statements if "INSERT" in statement
+    ]
+    # the code is sent once, and not again with the second sweep
+    assert len(inserts) == 1
+    assert len(test_db.scalars(select(TaskCode)).all()) == 1
+    assert len(with_code) == 6
+    assert {task.code for task in with_code} == {code}
+    assert len({task.codeHash for task in with_code}) == 1
+    assert {task.code for task in without_code} == {None}
+    assert [task.codeHash for task in without_code] == [
+        task.codeHash for task in with_code
+    ]
+    created = test_db.get(Task, with_code[0].taskId.root.bytes)
+    assert created.code is None
+
+
+def test_submit_sampling_tasks_over_limits(test_db):
+    # Arrange
+    test_db.add(_get_simulator_model())
+    test_db.add(UserLimit(owner="admin", max_queued_tasks=3, rate=0.001, burst=2.0))
+    test_db.add(UserLimit(owner="other", max_queued_tasks=3))
+    test_db.commit()
+    task = SamplingTaskDef(code="OPENQASM 3;", device="SVSim", nShots=1000)
+
+    # Act
+    too_large = submit_sampling_tasks_batch(
+        event=_get_event(), request=SamplingTaskBatchDef(tasks=[task] * 3), db=test_db
+    )
+    accepted = submit_sampling_tasks_batch(
+        event=_get_event(), request=SamplingTaskBatchDef(tasks=[task] * 2), db=test_db
+    )
+    rate_limited = submit_sampling_tasks(event=_get_event(), request=task, db=test_db)
+    queued = submit_sampling_tasks_batch(
+        event=_get_event("other"),
+        request=SamplingTaskBatchDef(tasks=[task] * 3),
+        db=test_db,
+    )
+    queue_limited = submit_sampling_tasks(
+        event=_get_event("other"), request=task, db=test_db
+    )
+
+    # Assert
+    assert too_large.status_code == 400
+    assert all(item.taskId is not None for item in accepted.results)
+    assert rate_limited.status_code == 429
+    # one token is refilled in 1000 seconds
+    assert rate_limited.headers["Retry-After"] == "1000"
+    assert all(item.taskId is not None for item in queued.results)
+    assert queue_limited.status_code == 429
+    assert queue_limited.headers["Retry-After"] == "60"
+    assert test_db.get(UserLimit, "admin").queued_tasks == 2
+    assert test_db.get(UserLimit, "other").queued_tasks == 3
+
+
+def test_submit_estimation_tasks_over_limits(test_db):
+    # Arrange
+    test_db.add(_get_simulator_model())
+    test_db.add(UserLimit(owner="admin", max_active_tasks=2, running_tasks=1))
+    test_db.commit()
+    task = EstimationTaskDef(
+        code="OPENQASM 3;",
+        device="SVSim",
+        method="state_vector",
+        operator=[["X 0 X 1", [1.5, 2.8]]],
+    )
+
+    # Act
+    accepted = submit_estimation_tasks(event=_get_event(), request=task, db=test_db)
+    rejected = submit_estimation_tasks(event=_get_event(), request=task, db=test_db)
+
+    # Assert
+    assert accepted.taskId is not None
+    assert rejected.status_code == 429
+    assert rejected.headers["Retry-After"] == "60"
+    assert test_db.get(UserLimit, "admin").queued_tasks == 1
+
+
+def test_cancel_sampling_task_counters(test_db):
+    # Arrange
+    test_db.add(UserLimit(owner="admin", queued_tasks=1, running_tasks=1))
+    test_db.commit()
+    limit = test_db.get(UserLimit, "admin")
+    running = test_db.get(Task, uuid.UUID("7af020f6-2e38-4d70-8cf0-4349650ea08c").bytes)
+    running.status = "RUNNING"
+    test_db.commit()
+
+    # Act
+    cancelled = cancel_sampling_task(
+        event=_get_event(), taskId="7af020f6-2e38-4d70-8cf0-4349650ea08d", db=test_db
+    )
+    counters = (limit.queued_tasks, limit.running_tasks)
+    cancelling = cancel_sampling_task(
+        event=_get_event(), taskId="7af020f6-2e38-4d70-8cf0-4349650ea08c", db=test_db
+    )
+
+    # Assert
+    assert cancelled.message == "cancel request accepted"
+    assert counters == (0, 1)
+    assert cancelling.message == "cancel request accepted"
+    # a CANCELLING task still runs, and is counted until its result is registered
+    assert (limit.queued_tasks, limit.running_tasks) == (0, 1)
+
+
+def test_submit_sampling_tasks_locks_user_limit(test_db):
+    # Arrange
+    test_db.add(_get_simulator_model())
+    test_db.commit()
+    statements = []
+
+    def capture(conn, clauseelement, multiparams, params, execution_options):
+        statements.append(clauseelement)
+
+    engine = test_db.get_bind()
+    event.listen(engine, "before_execute", capture)
+
+    # Act
+    try:
+        submit_sampling_tasks(
+            event=_get_event(),
+            request=SamplingTaskDef(code="OPENQASM 3;", device="SVSim", nShots=1000),
+            db=test_db,
+        )
+    finally:
+        event.remove(engine, "before_execute", capture)
+
+    # Assert
+    # SQLite ignores FOR UPDATE, so the statements are checked as compiled for
+    # MySQL: the row of the owner is locked before its counters are read, which
+    # serializes the concurrent submissions of an owner
+    compiled = [
+        str(statement.compile(dialect=mysql.dialect()))
+        for statement in statements
+        if "user_limits" in str(statement)
+    ]
+    assert compiled[0].startswith("SELECT")
+    assert compiled[0].endswith("FOR UPDATE")
+
+
+def test_submit_estimation_tasks_batch(test_db):
+    # Arrange
+    test_db.add(_get_simulator_model())
+    test_db.commit()
+    request = EstimationTaskBatchDef(
+        tasks=[
+            EstimationTaskDef(
+                code="OPENQASM 3;",
+                device="SVSim",
+                method="state_vector",
+                operator=[["X 0 X 1", [1.5, 2.8]]],
+            ),
+            EstimationTaskDef(
+                code="OPENQASM 3;",
+                device="SVSim",
+                method="sampling",
+                operator=[["X 0 X 1", [1.5, 2.8]]],
+            ),
+        ]
+    )
+
+    # Act
+    actual = submit_estimation_tasks_batch(
+        event=_get_event(), request=request, db=test_db
+    )
+
+    # Assert
+    assert actual.results[0].status.root == "QUEUED"
+    assert actual.results[1].taskId is None
+    assert actual.results[1].detail == "nShots is mandatory for sampling method"
+    created = test_db.get(Task, actual.results[0].taskId.root.bytes)
+    assert created.action == "estimation"
+    assert created.method == "state_vector"
+    assert created.operator is None
+    info = create_estimation_task_info(created)
+    assert info.operator.model_dump() == [["X 0 X 1", [1.5, 2.8]]]
+
+
+def test_serialize_operator():
+    # Arrange
+    operator = Operator(
+        [
+            ["X 0 X 1", [1.5, 2.8]],
+            ["Z 2 Y 1", [1.2, -2e-8]],
+            ["X 1 X 0", [0.5, 0.2]],
+            ["I 0", [0.25, 0.0]],
+        ]
+    )
+    task = Task(
+        id=uuid.UUID(int=1).bytes,
+        code="OPENQASM 3;",
+        device="SVSim",
+        action="estimation",
+        method="state_vector",
+        skip_transpilation=False,
+        status="QUEUED",
+        created_at=datetime(2024, 3, 4, 12, 34, 56),
+    )
+
+    # Act
+    task.packed_operator = serialize_operator(operator)
+    malformed = serialize_operator(Operator([["X 0 W 1", [1.0, 0.0]]]))
+
+    # Assert
+    assert create_estimation_task_info(task).operator.model_dump() == [
+        ["X 0 X 1", [2.0, 3.0]],
+        ["Y 1 Z 2", [1.2, -2e-8]],
+        ["I 0", [0.25, 0.0]],
+    ]
+    assert malformed.status_code == 400
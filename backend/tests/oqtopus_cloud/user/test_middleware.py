@@ -0,0 +1,70 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from oqtopus_cloud.user import middleware
+from oqtopus_cloud.user.middleware import CustomMiddleware
+
+
+def _call(app, scope):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return messages
+
+
+def _get_scope(**kwargs):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/devices",
+        "headers": [],
+        "aws.context": SimpleNamespace(aws_request_id="request-id"),
+    }
+    scope.update(kwargs)
+    return scope
+
+
+async def _app(scope, receive, send):
+    body = json.dumps(scope["state"]).encode()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": body})
+
+
+def test_custom_middleware(monkeypatch):
+    # Arrange
+    monkeypatch.setattr(middleware, "IS_LOCAL", False)
+    event = {
+        "requestContext": {"authorizer": {"claims": {"cognito:username": "alice"}}}
+    }
+    scope = _get_scope(
+        headers=[(b"x-correlation-id", b"correlation-id")], **{"aws.event": event}
+    )
+
+    # Act
+    messages = _call(CustomMiddleware(_app), scope)
+
+    # Assert
+    assert messages[0]["status"] == 200
+    assert (b"x-correlation-id", b"correlation-id") in messages[0]["headers"]
+    assert json.loads(messages[1]["body"]) == {"owner": "alice"}
+
+
+def test_custom_middleware_without_event(monkeypatch):
+    # Arrange
+    monkeypatch.setattr(middleware, "IS_LOCAL", False)
+
+    # Act
+    messages = _call(CustomMiddleware(_app), _get_scope())
+
+    # Assert
+    assert messages[0]["status"] == 500
+    assert json.loads(messages[1]["body"]) == {
+        "detail": "No AWS event found in request scope"
+    }
@@ -1,5 +1,9 @@
 DROP TABLE IF EXISTS main.results;
+DROP TABLE IF EXISTS main.task_events;
+DROP TABLE IF EXISTS main.fair_shares;
+DROP TABLE IF EXISTS main.user_limits;
 DROP TABLE IF EXISTS main.tasks;
+DROP TABLE IF EXISTS main.task_codes;
 DROP TABLE IF EXISTS main.devices;
 
 DROP TRIGGER IF EXISTS main.update_tasks_status_trigger;
@@ -16,7 +20,13 @@ CREATE TABLE IF NOT EXISTS main.devices (
   instructions VARCHAR(64) NOT NULL,
   calibration_data TEXT,
   calibrated_at DATETIME,
-  description VARCHAR(128) NOT NULL
+  description VARCHAR(128) NOT NULL,
+  version INT DEFAULT 0 NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS main.task_codes (
+  hash VARBINARY(32) PRIMARY KEY,
+  code TEXT NOT NULL
 );
 
 CREATE TABLE IF NOT EXISTS main.tasks (
@@ -26,11 +36,13 @@ CREATE TABLE IF NOT EXISTS main.tasks (
   device VARCHAR(64) NOT NULL,
   n_qubits INT,
   n_nodes INT,
-  code TEXT NOT NULL,
+  code TEXT,
+  code_hash VARBINARY(32),
   action ENUM ('sampling', 'estimation') NOT NULL,
   method ENUM ('state_vector', 'sampling'),
   shots INT,
   operator VARCHAR(1024),
+  packed_operator LONGBLOB,
   qubit_allocation TEXT,
   skip_transpilation BOOLEAN DEFAULT false NOT NULL,
   seed_transpilation INT,
@@ -39,15 +51,53 @@ CREATE TABLE IF NOT EXISTS main.tasks (
   simulation_opt text,
   ro_error_mitigation enum('none', 'pseudo_inverse', 'least_square'),
   note VARCHAR(1024),
+  priority INT DEFAULT 0 NOT NULL,
   status ENUM ('QUEUED', 'QUEUED_FETCHED', 'RUNNING', 'COMPLETED', 'FAILED', 'CANCELLING', 'CANCELLING_FETCHED', 'CANCELLED') NOT NULL DEFAULT 'QUEUED',
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-  FOREIGN KEY (device) REFERENCES devices(id)
+  lease_expires_at TIMESTAMP NULL,
+  lease_token VARBINARY(16) NULL,
+  FOREIGN KEY (device) REFERENCES devices(id),
+  FOREIGN KEY (code_hash) REFERENCES task_codes(hash),
+  INDEX idx_tasks_owner_action_created_at (owner, action, created_at),
+  INDEX idx_tasks_device_status_created_at (device, status, created_at),
+  INDEX idx_tasks_device_status_lease_expires_at (device, status, lease_expires_at),
+  INDEX idx_tasks_device_status_owner_priority (device, status, owner, priority DESC, created_at, id)
+);
+
+CREATE TABLE IF NOT EXISTS main.task_events (
+  seq BIGINT AUTO_INCREMENT PRIMARY KEY,
+  task_id VARBINARY(16) NOT NULL,
+  device VARCHAR(64) NOT NULL,
+  created_at TIMESTAMP NOT NULL,
+  INDEX idx_task_events_device_seq (device, seq)
+);
+
+CREATE TABLE IF NOT EXISTS main.fair_shares (
+  device VARCHAR(64) NOT NULL,
+  owner VARCHAR(64) NOT NULL,
+  weight DOUBLE DEFAULT 1 NOT NULL,
+  virtual_time DOUBLE,
+  PRIMARY KEY (device, owner)
+);
+
+CREATE TABLE IF NOT EXISTS main.user_limits (
+  owner VARCHAR(64) PRIMARY KEY,
+  max_queued_tasks INT,
+  max_active_tasks INT,
+  rate DOUBLE,
+  burst DOUBLE,
+  tokens DOUBLE,
+  refilled_at TIMESTAMP NULL,
+  queued_tasks INT DEFAULT 0 NOT NULL,
+  running_tasks INT DEFAULT 0 NOT NULL
 );
 
 CREATE TABLE IF NOT EXISTS main.results (
   task_id VARBINARY(16) PRIMARY KEY,
   status ENUM('SUCCESS', 'FAILURE', 'CANCELLED') NOT NULL,
   result TEXT,
+  packed_result LONGBLOB,
+  basis_counts LONGTEXT,
   reason TEXT,
   transpiled_code TEXT,
   qubit_allocation TEXT,